@@ -8,14 +8,20 @@ from typing import TypedDict, List, Dict, Any, Optional
 import logging
 
 from langgraph.graph import StateGraph, END, START
+from langchain_core.exceptions import OutputParserException
 from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.runnables import RunnableLambda
 from pydantic import BaseModel, Field, ValidationError
 
 from app.models.bedrock_client import invoke_claude
 from app.agent.tools.s3_fetcher import LoadRuFilesTool
 from app.agent.tools.convert_node import convert_node_flow
-from app.agent.tools.viz_node import viz_node as _vz_tool
+from app.agent.tools.viz_node import viz_node as _vz_tool, render_chart, _guess_tag_id
 from app.agent.tools.fallback_node import fallback_node as _fb_tool
+from app.utils.dataset_store import get_dataset_store
+from app.utils.interpret_cache import get_interpret_cache
+from app.utils.query_parser import parse_structured_query
+from app.utils.ru_utils import load_ru_many, requested_columns
 from app.utils.country_resolver import (
     resolve_country_name,
     find_tag_ids_by_country,
@@ -32,6 +38,8 @@ class FlowState(TypedDict, total=False):
     input:     str
     parsed:    Dict[str, Any]
     files:     List[str]
+    columns:   Optional[List[str]]   # RU デコード対象の変数コード（None = 全列）
+    dataset:   Optional[str]         # decode ノードがデコードした DataFrame のハンドル（DatasetStore）
     converted: List[str]
     images:    List[str]
     error:     Optional[str]
@@ -75,10 +83,8 @@ def _extract_json(payload: Any) -> Optional[Dict[str, Any]]:
     return None
 
 # ---------- 4. interpret_node ------------------------------------------
-def interpret_node(state: FlowState) -> Dict[str, Any]:
-    logger.debug(f"interpret_node input state: {state}")
-    user_input = state["input"]
-
+def _interpret_llm(user_input: str) -> Dict[str, Any]:
+    """Claude に ParsedParams を抽出させる（interpret_node の LLM 往復部分）"""
     prompt = (
         "You are a JSON extraction agent.\n"
         "Return ONLY a JSON object matching this schema:\n"
@@ -88,11 +94,22 @@ def interpret_node(state: FlowState) -> Dict[str, Any]:
     raw = invoke_claude(prompt)
 
     try:
-        parsed: Dict[str, Any] = json_parser.parse(raw).model_dump()
-    except ValidationError:
+        # JsonOutputParser.parse は dict を返すので ParsedParams で検証する
+        parsed: Dict[str, Any] = ParsedParams.model_validate(json_parser.parse(raw)).model_dump(exclude_none=True)
+    except (ValidationError, OutputParserException):
         parsed = _extract_json(raw) or {}
 
-    parsed = {KEY_MAP.get(k, k): v for k, v in parsed.items()}
+    return {KEY_MAP.get(k, k): v for k, v in parsed.items()}
+
+def interpret_node(state: FlowState) -> Dict[str, Any]:
+    logger.debug(f"interpret_node input state: {state}")
+    user_input = state["input"]
+
+    # 構造化された入力は規則で解釈（ネットワーク無し）。確信が無いときだけ LLM へ
+    parsed = parse_structured_query(user_input)
+    if parsed is None:
+        # 日時・TagID だけが違う定型文は LLM を呼ばずに前回の解釈を埋め直す
+        parsed = get_interpret_cache().get_or_interpret(user_input, _interpret_llm)
 
     # country から TagID 補完 ---------------------------------
     if "tag_id" not in parsed and "country" in parsed:
@@ -107,25 +124,75 @@ def interpret_node(state: FlowState) -> Dict[str, Any]:
 # ---------- 5. fetch_node ---------------------------------------------
 s3_tool = LoadRuFilesTool()
 
-def fetch_node(state: FlowState) -> Dict[str, List[str]]:
-    logger.debug(f"fetch_node input state: {state}")
+def _fetch_request(state: FlowState) -> Optional[Dict[str, Any]]:
+    """parsed から LoadRuFilesTool の引数を作る（キー不足なら None）"""
     p = state["parsed"]
     if not (p.get("tag_id") and p.get("start_dt")):
+        return None
+    return {
+        "tag_id": p["tag_id"],
+        "start_dt": p["start_dt"],
+        "end_dt": p.get("end_dt"),
+        # メモリ取得時は s3:// URI が返り、デコード済みフレームは convert / viz がキャッシュから使う
+        "columns": requested_columns(p),
+    }
+
+def fetch_node(state: FlowState) -> Dict[str, List[str]]:
+    logger.debug(f"fetch_node input state: {state}")
+    request = _fetch_request(state)
+    if request is None:
         return {"files": ["Error: insufficient keys"]}
 
     try:
-        files = s3_tool._run(
-            tag_id=p["tag_id"],
-            start_dt=p["start_dt"],
-            end_dt=p.get("end_dt"),
-        )
+        files = s3_tool._run(**request)
         logger.debug(f"fetch_node result: {files}")
-        return {"files": files}
+        return {"files": files, "columns": request["columns"]}
     except Exception as e:
         logger.error(f"Fetch error: {e}")
         return {"files": [f"Error: {e}"]}
 
-# ---------- 6. convert_node ラッパー ----------------------------------
+async def afetch_node(state: FlowState) -> Dict[str, List[str]]:
+    """
+    fetch_node の非同期版（ainvoke / langserve 用）
+    実行中のイベントループ上で _arun を直接 await する（ブロッキング処理は s3_loader がスレッドプールへ）
+    """
+    logger.debug(f"afetch_node input state: {state}")
+    request = _fetch_request(state)
+    if request is None:
+        return {"files": ["Error: insufficient keys"]}
+
+    try:
+        files = await s3_tool._arun(**request)
+        logger.debug(f"afetch_node result: {files}")
+        return {"files": files, "columns": request["columns"]}
+    except Exception as e:
+        logger.error(f"Fetch error: {e}")
+        return {"files": [f"Error: {e}"]}
+
+# ---------- 6. decode_node --------------------------------------------
+def _decoded(state: FlowState):
+    """共有データセット（無い・手放された場合は None）"""
+    return get_dataset_store().get(state.get("dataset"))
+
+def decode_node(state: FlowState) -> Dict[str, Any]:
+    """
+    取得済み RU を 1 回だけデコードし、ハンドルを state に載せる
+    convert / viz / fallback は同じ DataFrame を使い、各自でデコードしない
+    """
+    logger.debug(f"decode_node input state: {state}")
+    files = state.get("files", [])
+    if not files or any(str(f).startswith("Error") for f in files):
+        return {}
+    columns = state.get("columns") or requested_columns(state.get("parsed"))
+    try:
+        df = load_ru_many(files, columns=columns)
+    except Exception as e:
+        # ここでは止めない（下流のノードが従来どおりエラーを返し fallback へ分岐する）
+        logger.error(f"Decode error: {e}")
+        return {}
+    return {"dataset": get_dataset_store().put(df), "columns": columns}
+
+# ---------- 7. convert_node ラッパー ----------------------------------
 def run_convert_node(state: FlowState) -> Dict[str, Any]:
     logger.debug(f"run_convert_node input state: {state}")
     fmt = state["parsed"].get("format") or state.get("format")
@@ -134,14 +201,17 @@ def run_convert_node(state: FlowState) -> Dict[str, Any]:
         logger.warning("No format specified, returning empty result")
         return {"files": []}
     try:
-        result = convert_node_flow({"parsed": state["parsed"], "files": files, "ru_files": files})
+        result = convert_node_flow({
+            "parsed": state["parsed"], "files": files, "ru_files": files,
+            "columns": state.get("columns"), "dataset": state.get("dataset"),
+        })
         logger.debug(f"convert_node_flow result: {result}")
         return result
     except Exception as e:
         logger.error(f"Conversion error: {e}")
         return {"error": str(e)}
 
-# ---------- 7. viz_node ラッパー --------------------------------------
+# ---------- 8. viz_node ラッパー --------------------------------------
 def run_viz_node(state: FlowState) -> Dict[str, Any]:
     logger.debug(f"run_viz_node input state: {state}")
     if "parsed" not in state or not state["parsed"].get("chart"):
@@ -149,33 +219,71 @@ def run_viz_node(state: FlowState) -> Dict[str, Any]:
         return {"files": state.get("files", [])}
 
     try:
-        img = viz_node(
-            state["files"],
-            chart=state["parsed"].get("chart"),
-            tag_id=state["parsed"].get("tag_id"),
-            variables=state["parsed"].get("vars"),
-            x=state["parsed"].get("x"),
-            y=state["parsed"].get("y"),
-        )
+        parsed = state["parsed"]
+        df = _decoded(state)
+        files = state.get("files") or []
+        if df is None:
+            img = viz_node(
+                state["files"],
+                chart=parsed.get("chart"),
+                tag_id=parsed.get("tag_id"),
+                variables=parsed.get("vars"),
+                x=parsed.get("x"),
+                y=parsed.get("y"),
+            )
+        else:
+            img = render_chart(
+                df,
+                chart=parsed.get("chart"),
+                tag_id=parsed.get("tag_id") or (_guess_tag_id(files[0]) if files else None),
+                variables=parsed.get("vars"),
+                x=parsed.get("x"),
+                y=parsed.get("y"),
+            )
         logger.debug(f"viz_node result: {img}")
         return {"images": [img], "files": state.get("files", [])}
     except Exception as e:
         logger.error(f"Viz error: {e}")
         return {"error": str(e)}
 
-# ---------- 8. グラフ構築 ---------------------------------------------
+# ---------- 9. fallback_node ラッパー ---------------------------------
+def run_fallback_node(state: FlowState) -> Dict[str, Any]:
+    """fallback_node は ctx["df"] を前提にするので共有データセットを渡す"""
+    logger.debug(f"run_fallback_node input state: {state}")
+    df = _decoded(state)
+    if df is None:
+        return {"error": state.get("error") or "No decoded dataset for fallback"}
+    parsed = state.get("parsed", {})
+    # CodeAct の生成コードが書き換えても共有データセットを汚さないようにコピーを渡す
+    ctx: Dict[str, Any] = {"df": df.copy(), "task_id": state.get("task_id")}
+    if fmt := parsed.get("format") or state.get("format"):
+        ctx["format"] = fmt
+    if chart := parsed.get("chart"):
+        ctx["chart"] = chart
+    return fallback_node(ctx)
+
+# ---------- 10. finish_node ------------------------------------------
+def finish_node(state: FlowState) -> Dict[str, Any]:
+    """実行の終わりに共有データセットを手放す（長時間動くサーバでリクエスト毎に残さない）"""
+    if handle := state.get("dataset"):
+        get_dataset_store().release(handle)
+    return {"files": state.get("files", []), "dataset": None}
+
+# ---------- 11. グラフ構築 --------------------------------------------
 graph = StateGraph(FlowState)
 
 graph.add_node("interpret", interpret_node)
-graph.add_node("fetch",     fetch_node)
+# invoke は fetch_node、ainvoke（langserve / uvicorn）は afetch_node をイベントループ上で実行
+graph.add_node("fetch",     RunnableLambda(fetch_node, afunc=afetch_node, name="fetch"))
+graph.add_node("decode",    decode_node)       # 1 回だけデコードして下流で共有
 graph.add_node("convert",   run_convert_node)  # convert_node_flow をラッパーで呼ぶ
 graph.add_node("viz",       run_viz_node)
-graph.add_node("fallback",  fallback_node)
-graph.add_node("finish",    lambda s: {"files": s.get("files", [])})
+graph.add_node("fallback",  run_fallback_node)
+graph.add_node("finish",    finish_node)
 
 graph.add_edge("interpret", "fetch")
-graph.add_edge("fetch",     "convert")
-graph.add_edge("fetch",     "viz")      # 変換不要でも viz 可
+graph.add_edge("fetch",     "decode")
+graph.add_edge("decode",    "convert")  # 変換不要なら convert は素通りして viz へ
 
 # ----- convert 結果で分岐 ---------------------------------------
 def after_convert(state):
@@ -196,8 +304,18 @@ graph.add_conditional_edges("viz", after_viz)
 # ----- fallback から finish へ抜ける ---------------------------
 graph.add_edge("fallback", "finish")
 
-graph.set_entry_point("convert")
+# ----- 入口: 途中の結果を持ち込んだ呼び出しはその先から ---------
+def route_start(state):
+    """files があれば decode、parsed があれば fetch、それ以外は interpret から"""
+    if state.get("files"):
+        return "decode"
+    if state.get("parsed"):
+        return "fetch"
+    return "interpret"
+graph.add_conditional_edges(START, route_start)
+
 graph.set_finish_point("finish")
 
 # --- ここでコンパイルして "実行グラフ" をエクスポート -------------
 graph = graph.compile()
+workflow = graph    # app.main が langserve にマウントする名前
@@ -12,7 +12,9 @@
 #
 import copy
 import datetime
+import functools
 import io
+import os
 import re
 import struct
 
@@ -35,6 +37,50 @@ HEADER_KEYS = [
 HEADER_OPTIONAL_KEYS = [
     "compress_type",
 ]
+HEADER_READ_SIZE	= 4096
+
+def find_bytes(data, sub, start = 0):
+    """
+    Find sub in the buffer (bytes, bytearray, mmap or memoryview).
+    The memoryview is searched by the growing window without copying
+    the whole buffer. Return -1 if not found.
+    """
+    if hasattr(data, "find"):
+        return data.find(sub, start)
+    size = HEADER_READ_SIZE
+    while True:
+        end = min(start + size, len(data))
+        pos = bytes(data[start:end]).find(sub)
+        if pos >= 0:
+            return start + pos
+        if end >= len(data):
+            return -1
+        size *= 2
+
+def parse_header(data, strict = True):
+    """
+    Parse the RU header from the buffer.
+    Return (header, offset of the body).
+    """
+    header = Header()
+    offset = header.parse(data, strict)
+    return header, offset
+
+#
+# 例外クラス
+#
+class TruncatedError(RuntimeError):
+    "Unexpected end of the RU data."
+    pass
+
+#
+# NumPy 列指向デコード用の型定数群
+#
+NUMPY_SCALAR_FORMAT = {
+    "FLOAT32" : ">f4", "FLOAT64" : ">f8",
+    "INT8" : "i1", "INT16" : ">i2", "INT32" : ">i4",
+    "UINT8" : "u1", "UINT16" : ">u2", "UINT32" : ">u4",
+}
 
 #
 # RUヘッダクラス
@@ -154,25 +200,67 @@ class Header(object):
         self._keys[name] = value
 
     def load(self, io_obj, strict = True):
-        "Load from the IO object."
+        """
+        Load from the IO object.
+        The seekable IO object is read by HEADER_READ_SIZE, and positioned
+        at the beginning of the body after loading.
+        """
+        end_signature = HEADER_END_SIGNATURE.encode(self.encoding)
+        seekable = getattr(io_obj, "seekable", None)
+        if seekable is not None and seekable():
+            start = io_obj.tell()
+            data = b""
+            while True:
+                chunk = io_obj.read(HEADER_READ_SIZE)
+                if len(chunk) == 0:
+                    if len(data) < len(HEADER_SIGNATURE) or \
+                            not data.startswith(HEADER_SIGNATURE):
+                        raise RuntimeError("no RU header")
+                    raise RuntimeError("no end of RU header")
+                search_from = max(len(data) - len(end_signature) + 1, 0)
+                data += chunk
+                if len(data) >= len(HEADER_SIGNATURE) and \
+                        not data.startswith(HEADER_SIGNATURE):
+                    raise RuntimeError("no RU header")
+                if data.find(end_signature, search_from) >= 0:
+                    break
+            offset = self.parse(data, strict)
+            io_obj.seek(start + offset)
+            return
+
         signature = io_obj.read(len(HEADER_SIGNATURE))
         if len(signature) != len(HEADER_SIGNATURE) or \
                 signature != HEADER_SIGNATURE:
             raise RuntimeError("no RU header")
-        lines = b""
-        end_signature = HEADER_END_SIGNATURE.encode(self.encoding)
+        lines = bytearray()
         while True:
             c = io_obj.read(1)
             if len(c) != 1:
                 raise RuntimeError("no end of RU header")
             lines += c
-            if len(lines) >= len(end_signature) and \
-                    lines[len(lines) - 2:len(lines)] == end_signature:
+            if lines.endswith(end_signature):
                 break
         # Remove the end of signature
-        lines = lines[0:len(lines) - len(end_signature)]
+        self._parse_lines(bytes(lines[0:len(lines) - len(end_signature)]),
+                          strict)
 
-        #
+    def parse(self, data, strict = True):
+        """
+        Parse from the buffer (bytes, bytearray, mmap or memoryview).
+        The end of the header is found by a single search.
+        Return the offset of the body.
+        """
+        if bytes(data[0:len(HEADER_SIGNATURE)]) != HEADER_SIGNATURE:
+            raise RuntimeError("no RU header")
+        end_signature = HEADER_END_SIGNATURE.encode(self.encoding)
+        end = find_bytes(data, end_signature, len(HEADER_SIGNATURE))
+        if end < 0:
+            raise RuntimeError("no end of RU header")
+        self._parse_lines(bytes(data[len(HEADER_SIGNATURE):end]), strict)
+        return end + len(end_signature)
+
+    def _parse_lines(self, lines, strict):
+        "Parse the header lines."
         self._keys = {}
         iter_ = iter(lines.splitlines())
         while True:
@@ -295,6 +383,10 @@ class Type(object):
         "Return the size."
         return self.size
 
+    def get_numpy_format(self):
+        "Return the NumPy dtype format, or None if not fixed-size."
+        return None
+
     def is_array(self):
         "Is array type ?"
         return False
@@ -325,7 +417,7 @@ class Type(object):
             raise RuntimeError("%s no pack format" % self.type)
         data = io_obj.read(self.size)
         if len(data) != self.size:
-            raise RuntimeError("unexpected EOF at %s" % self.name)
+            raise TruncatedError("unexpected EOF at %s" % self.name)
         self.value = struct.unpack(self.format, data)[0]
         if self.is_integer():
             ru._set_array_size(self.name, self.value)
@@ -352,6 +444,10 @@ class ScalarType(Type):
         "Get the value."
         return self.value
 
+    def get_numpy_format(self):
+        "Return the NumPy dtype format."
+        return NUMPY_SCALAR_FORMAT.get(self.type)
+
     def is_scalar(self):
         "Is scalar type ?"
         return True
@@ -446,6 +542,12 @@ class StringType(Type):
         "Get the value."
         return self.value
 
+    def get_numpy_format(self):
+        "Return the NumPy dtype format, or None if not fixed-size."
+        if self.size is None:
+            return None
+        return "S%d" % self.size
+
     def is_string(self):
         "Is string type ?"
         return True
@@ -461,17 +563,17 @@ class StringType(Type):
             while True:
                 c = io_obj.read(1)
                 if len(c) == 0:
-                    raise RuntimeError("unexpected EOF at %s" % self.name)
+                    raise TruncatedError("unexpected EOF at %s" % self.name)
                 if c == b"\x00":
                     break
                 s += c
         else:
             s = io_obj.read(self.size)
             if len(s) != self.size:
-                raise RuntimeError("unexpected EOF at %s" % self.name)
+                raise TruncatedError("unexpected EOF at %s" % self.name)
 
         encoding = self.get_encoding(ru)
-        self.value = s.decode(encoding)
+        self.value = str(s, encoding)
 
     def write(self, ru, io_obj):
         "Write the RU string type value to I/O object."
@@ -640,9 +742,13 @@ class ArrayType(Type):
         super(ArrayType, self).__init__(name, "Array", size)
         self.member = member
         self.value = []
+        self.columns = None
+        self._length = 0
 
     def __len__(self):
         "Return the length."
+        if self.columns is not None:
+            return self._length
         return len(self.value)
 
     def __iter__(self):
@@ -703,6 +809,27 @@ class ArrayType(Type):
 
         return r
 
+    def get_numpy_format(self):
+        "Return the NumPy dtype format of the member, or None."
+        if type(self.size) is not int:
+            return None
+        return self.member.get_numpy_format()
+
+    def get_columns(self):
+        "Return the struct member's values as columns."
+        if self.columns is not None:
+            return self.columns
+        if not self.member.is_struct():
+            raise RuntimeError("%s is not struct array" % self.name)
+        columns = {}
+        for obj in self.value:
+            obj._append_row(columns, "")
+        return columns
+
+    def is_columnar(self):
+        "Is decoded as columns ?"
+        return self.columns is not None
+
     def get_ref(self, key):
         "Return the reference."
         if not type(key) is int:
@@ -734,12 +861,27 @@ class ArrayType(Type):
     def read(self, ru, io_obj):
         "Read the array values from I/O."
         self.value = []
+        self.columns = None
+        if ru.columnar and self.member.is_struct():
+            fmt = self.member.get_numpy_format()
+            if fmt is not None:
+                self._read_columnar(ru, io_obj, fmt)
+                return
         if self.size is None:
             # unlimit array size for '+'
-            array = io_obj.read()
-            array_io = io.BytesIO(array)
+            seekable = getattr(io_obj, "seekable", None)
+            if seekable is not None and seekable():
+                # 末尾位置だけ求めて I/O から直接読む（残り全体をコピーしない）
+                pos = io_obj.tell()
+                end = io_obj.seek(0, io.SEEK_END)
+                io_obj.seek(pos)
+                array_io = io_obj
+            else:
+                array = io_obj.read()
+                array_io = io.BytesIO(array)
+                end = len(array)
             while True:
-                if array_io.tell() >= len(array):
+                if array_io.tell() >= end:
                     break
                 member = self.member.copy()
                 member.read(ru, array_io)
@@ -754,6 +896,30 @@ class ArrayType(Type):
                 member.read(ru, io_obj)
                 self.value.append(member)
 
+    def _read_columnar(self, ru, io_obj, fmt):
+        "Read the fixed-size struct array values as NumPy columns."
+        import numpy as np
+
+        dtype = np.dtype(fmt)
+        if self.size is None:
+            # unlimit array size for '+'
+            data = io_obj.read()
+            if len(data) % dtype.itemsize != 0:
+                raise TruncatedError("unexpected EOF at %s" % self.name)
+            size = len(data) // dtype.itemsize
+        else:
+            if type(self.size) is int:
+                size = self.size
+            else:
+                size = ru._get_array_size(self.size)
+            data = io_obj.read(size * dtype.itemsize)
+            if len(data) != size * dtype.itemsize:
+                raise TruncatedError("unexpected EOF at %s" % self.name)
+        records = np.frombuffer(data, dtype=dtype, count=size)
+        self.columns = {}
+        self.member._records_to_columns(ru, records, "", self.columns)
+        self._length = size
+
     def write(self, ru, io_obj):
         "Write the array values to I/O."
         if self.size is not None:
@@ -877,6 +1043,21 @@ class StructType(Type):
         "Is struct type ?"
         return True
 
+    def get_numpy_format(self):
+        "Return the NumPy dtype format, or None if not fixed-size."
+        if len(self.members) == 0:
+            return None
+        fields = []
+        for member in self.members:
+            fmt = member.get_numpy_format()
+            if fmt is None or member.name == "":
+                return None
+            if member.is_array():
+                fields.append((member.name, fmt, (member.size,)))
+            else:
+                fields.append((member.name, fmt))
+        return fields
+
     def keys(self):
         "Return the struct member's name."
         return self.member_by_name.keys()
@@ -946,6 +1127,39 @@ class StructType(Type):
             if self.has_member(key):
                 self.member_by_name[key].set_value(value.second)
 
+    def _append_row(self, columns, prefix):
+        "Append the member's values to the columns."
+        for member in self.members:
+            name = prefix + member.name
+            if member.is_struct():
+                member._append_row(columns, name + ".")
+            elif member.is_array():
+                columns.setdefault(name, []).append(member)
+            else:
+                columns.setdefault(name, []).append(member.get_value())
+
+    def _records_to_columns(self, ru, records, prefix, columns, wanted = None):
+        """
+        Split the NumPy records into the member's columns.
+        If wanted is given, only the members wanted(name) are split.
+        The fixed-size strings keep the NUL padding as the tree decoder.
+        """
+        for member in self.members:
+            name = prefix + member.name
+            if wanted is not None and not wanted(name):
+                continue
+            values = records[member.name]
+            if member.is_struct():
+                member._records_to_columns(ru, values, name + ".", columns,
+                                           wanted)
+            elif member.is_string():
+                encoding = member.get_encoding(ru)
+                # S<n> は末尾の NUL を落とすので、同じ幅の void で生のバイト列を取り出す
+                raw = values.view("V%d" % values.dtype.itemsize)
+                columns[name] = [v.decode(encoding) for v in raw.tolist()]
+            else:
+                columns[name] = values.astype(values.dtype.newbyteorder("="))
+
     def read(self, ru, io_obj):
         "Read the struct member's value from I/O."
         if self.name != "/":
@@ -1266,6 +1480,624 @@ class FormatParser(object):
         if self._ptr > 0:
             self._ptr -= 1
 
+#
+# フォーマットコンパイラ
+#
+COMPILED_FORMAT_CACHE_SIZE	= 64
+
+@functools.lru_cache(maxsize=COMPILED_FORMAT_CACHE_SIZE)
+def parse_format(format_):
+    """
+    Parse the format string (memoized by format string).
+    The returned root is a template, so copy it before reading values.
+    """
+    parser = FormatParser()
+    return parser.parse(format_)
+
+@functools.lru_cache(maxsize=COMPILED_FORMAT_CACHE_SIZE)
+def compile_format(format_, encoding = (("STR", "euc_jp"),), columnar = False,
+                   columns = None):
+    """
+    Compile the format string into the decoder (memoized by format string).
+    encoding is the items of RU.encoding as tuple.
+    columns is the projection (tuple of names) of the root array records.
+    """
+    compiler = FormatCompiler(encoding, columnar, columns)
+    return compiler.compile(format_)
+
+@functools.lru_cache(maxsize=COMPILED_FORMAT_CACHE_SIZE)
+def compile_records(format_, path, encoding = (("STR", "euc_jp"),),
+                    columnar = False, columns = None):
+    """
+    Compile the format string into the readers of the array records
+    (memoized by format string and path). See FormatCompiler.compile_records().
+    """
+    compiler = FormatCompiler(encoding, columnar, columns)
+    return compiler.compile_records(format_, path)
+
+def values_to_time(values):
+    "Return the datetime of the time struct values (dict)."
+    month = values["mon"] if "mon" in values else values["month"]
+    minute = values.get("min", values.get("minute", 0))
+    second = values.get("sec", values.get("second", 0))
+    return datetime.datetime(values["year"], month, values["day"],
+                             values.get("hour", 0), minute, second)
+
+class FormatCompiler(object):
+    """
+    Reusable format compiler.
+    Compile the format string into the decoder, the plan of precompiled
+    struct.Struct objects, instead of walking the Type tree.
+    The decoder returns the plain values:
+        struct -> dict, array of struct -> columns (dict of list),
+        array of scalar/string -> list.
+    The nested struct in the array member is flattened as "name.member".
+    If columns is given, the members of the root array records out of it
+    are skipped by offset without decoding (the size members are kept).
+    """
+    def __init__(self, encoding = None, columnar = False, columns = None):
+        "Initialize this instance."
+        self.ru = RU()
+        if encoding is not None:
+            self.ru.encoding = dict(encoding)
+        self.columnar = columnar
+        self.columns = None
+        if columns is not None:
+            self.columns = frozenset(columns)
+        self.size_members = {}
+
+    def compile(self, format_):
+        """
+        Compile the format string and return the decoder.
+        The decoder reads the buffer (bytes, mmap or memoryview) by offsets.
+        """
+        root, self.size_members = parse_format(format_)
+        self.variable_strings = False
+        read = self._compile_struct(root, True)
+        variable_strings = self.variable_strings
+
+        def decode(data):
+            "Decode the RU body."
+            if variable_strings and not hasattr(data, "find"):
+                # NUL 終端文字列の検索に find() が要るので memoryview はコピー
+                data = bytes(data)
+            values, pos = read(data, 0, {})
+            return values
+
+        return decode
+
+    def _sets_size(self, node):
+        "Does the struct set any size member ?"
+        for member in node.members:
+            if member.is_integer() and member.name in self.size_members:
+                return True
+        return False
+
+    def _wanted(self, name):
+        "Is the member name in the projection ?"
+        if self.columns is None or name in self.columns:
+            return True
+        for column in self.columns:
+            if column.startswith(name + ".") or name.startswith(column + "."):
+                return True
+        return False
+
+    def _fixed_size(self, node):
+        "Return the byte size of the fixed-size member, or None."
+        if node.is_scalar() or node.is_string():
+            return node.size
+        if node.is_array():
+            if type(node.size) is not int:
+                return None
+            size = self._fixed_size(node.member)
+            if size is None:
+                return None
+            return size * node.size
+        total = 0
+        for member in node.members:
+            size = self._fixed_size(member)
+            if size is None:
+                return None
+            total += size
+        return total
+
+    def _compile_struct(self, node, top = False):
+        """
+        Compile the struct into the reader which returns dict.
+        If top is True, the projection is applied to the array members.
+        """
+        steps, names = self._compile_steps(node, "", False, False, top)
+        scoped = self._sets_size(node)
+
+        def read(buf, pos, sizes):
+            if scoped:
+                sizes = dict(sizes)
+            out = []
+            for step in steps:
+                pos = step(buf, pos, sizes, out)
+            return dict(zip(names, out)), pos
+
+        return read
+
+    def _compile_steps(self, node, prefix, flatten, project = False,
+                       project_arrays = False):
+        """
+        Compile the struct members into the read steps.
+        If project is True, the members out of the projection are skipped;
+        the fixed-size ones become the pad bytes of the struct.Struct run.
+        If project_arrays is True, the array members apply the projection.
+        """
+        steps = []
+        names = []
+        codes = []
+        run_names = []
+        size_index = []
+        for member in node.members:
+            name = prefix + member.name
+            is_size = member.is_integer() and member.name in self.size_members
+            skip = project and not is_size and not self._wanted(name)
+            if skip and self._fixed_size(member) is not None:
+                codes.append("%dx" % self._fixed_size(member))
+                continue
+            if member.is_scalar():
+                if is_size:
+                    size_index.append((len(run_names), member.name))
+                codes.append(member.format.lstrip("!"))
+                run_names.append(name)
+                continue
+            if len(codes) > 0:
+                steps.append(self._fixed_step(codes, run_names, size_index,
+                                              name))
+                names.extend(run_names)
+                codes, run_names, size_index = [], [], []
+            if member.is_string():
+                steps.append(self._string_step(member, skip))
+                if not skip:
+                    names.append(name)
+            elif member.is_array():
+                step = self._value_step(self._compile_array(member,
+                                                            project_arrays))
+                if skip:
+                    steps.append(self._skip_step(step))
+                else:
+                    steps.append(step)
+                    names.append(name)
+            elif flatten:
+                sub_steps, sub_names = self._compile_steps(member, name + ".",
+                                                           True, project)
+                if self._sets_size(member):
+                    steps.append(self._scope_step(sub_steps))
+                else:
+                    steps.extend(sub_steps)
+                names.extend(sub_names)
+            else:
+                steps.append(self._value_step(self._compile_struct(member)))
+                names.append(name)
+        if len(codes) > 0:
+            steps.append(self._fixed_step(codes, run_names, size_index,
+                                          prefix + node.name))
+            names.extend(run_names)
+
+        return steps, names
+
+    def _fixed_step(self, codes, names, size_index, label):
+        """
+        Return the step to read the fixed-size scalar members at once.
+        codes may contain the pad bytes ("%dx") of the skipped members.
+        """
+        packer = struct.Struct("!" + "".join(codes))
+        size = packer.size
+        unpack_from = packer.unpack_from
+
+        def step(buf, pos, sizes, out):
+            if pos + size > len(buf):
+                raise TruncatedError("unexpected EOF at %s" % label)
+            values = unpack_from(buf, pos)
+            out.extend(values)
+            for i, name in size_index:
+                sizes[name] = values[i]
+            return pos + size
+
+        return step
+
+    def _string_step(self, member, skip = False):
+        """
+        Return the step to read the string member.
+        If skip is True, the string is skipped without decoding.
+        """
+        encoding = member.get_encoding(self.ru)
+        name = member.name
+        size = member.size
+        if size is None:
+            self.variable_strings = True
+        if size is None and skip:
+            def step(buf, pos, sizes, out):
+                end = buf.find(b"\x00", pos)
+                if end < 0:
+                    raise TruncatedError("unexpected EOF at %s" % name)
+                return end + 1
+        elif size is None:
+            def step(buf, pos, sizes, out):
+                end = buf.find(b"\x00", pos)
+                if end < 0:
+                    raise TruncatedError("unexpected EOF at %s" % name)
+                out.append(buf[pos:end].decode(encoding))
+                return end + 1
+        else:
+            def step(buf, pos, sizes, out):
+                end = pos + size
+                if end > len(buf):
+                    raise TruncatedError("unexpected EOF at %s" % name)
+                out.append(str(buf[pos:end], encoding))
+                return end
+
+        return step
+
+    def _value_step(self, read):
+        "Return the step to append the reader's value."
+        def step(buf, pos, sizes, out):
+            value, pos = read(buf, pos, sizes)
+            out.append(value)
+            return pos
+
+        return step
+
+    def _skip_step(self, step):
+        "Return the step to read and drop the value."
+        def skip(buf, pos, sizes, out):
+            return step(buf, pos, sizes, [])
+
+        return skip
+
+    def _scope_step(self, steps):
+        "Return the step to read the flattened struct which sets the size."
+        def step(buf, pos, sizes, out):
+            sizes = dict(sizes)
+            for s in steps:
+                pos = s(buf, pos, sizes, out)
+            return pos
+
+        return step
+
+    def compile_records(self, format_, path):
+        """
+        Compile the format string into the readers for RU.iter_records().
+        Return (read_head, read_record, read_block, names, array_node):
+            read_head   : reader of the root members before the array
+            read_record : reader of one record (list of the values)
+            read_block  : reader of count records at once (columns),
+                          or None if the record is not fixed-size
+            names       : column names, or None if the member is not struct
+        """
+        root, self.size_members = parse_format(format_)
+        if not root.has_member(path) or not root.get_ref(path).is_array():
+            raise RuntimeError("%s is not array" % path)
+        node = root.get_ref(path)
+        if self._has_unbounded(node.member):
+            raise RuntimeError("%s has '+' array member" % path)
+        head = StructType("/", root.members[0:root.members.index(node)])
+        read_head = self._compile_struct(head)
+        read_record, names = self._compile_record(node.member, True)
+        read_block = self._compile_block(node, True)
+
+        return read_head, read_record, read_block, names, node
+
+    def _has_unbounded(self, node):
+        "Has '+' array ?"
+        if node.is_array():
+            return node.size is None or self._has_unbounded(node.member)
+        if node.is_struct():
+            for member in node.members:
+                if self._has_unbounded(member):
+                    return True
+        return False
+
+    def _compile_record(self, member, project = False):
+        """
+        Compile the array member into the reader of one record.
+        Return (reader, names); names is None if the member is not struct.
+        """
+        if member.is_struct():
+            steps, names = self._compile_steps(member, "", True, project)
+            scoped = self._sets_size(member)
+        elif member.is_string():
+            steps, names = [self._string_step(member)], None
+            scoped = False
+        else:
+            steps = [self._fixed_step([member.format.lstrip("!")],
+                                      [member.name], [], member.name)]
+            names = None
+            scoped = False
+
+        def read(buf, pos, sizes):
+            if scoped:
+                sizes = dict(sizes)
+            out = []
+            for step in steps:
+                pos = step(buf, pos, sizes, out)
+            return out, pos
+
+        return read, names
+
+    def _compile_block(self, node, project = False):
+        """
+        Compile the array of the fixed-size member into the reader of
+        count records at once. Return None if the member is variable size.
+        If project is True, the struct members out of the projection are
+        skipped by offset.
+        """
+        member = node.member
+        if member.is_struct() and self.columnar:
+            fmt = member.get_numpy_format()
+            if fmt is not None:
+                return self._numpy_block(node, fmt, project)
+        if member.is_scalar():
+            code = member.format.lstrip("!")
+            return self._fixed_block(node, struct.Struct("!" + code), None)
+        if member.is_struct():
+            for m in member.members:
+                if not m.is_scalar():
+                    return None
+            codes = []
+            names = []
+            for m in member.members:
+                if project and not self._wanted(m.name) and \
+                        not m.name in self.size_members:
+                    codes.append("%dx" % m.size)
+                else:
+                    codes.append(m.format.lstrip("!"))
+                    names.append(m.name)
+            return self._fixed_block(node, struct.Struct("!" + "".join(codes)),
+                                     names)
+        return None
+
+    def _compile_array(self, node, project = False):
+        "Compile the array into the reader."
+        read_block = self._compile_block(node, project)
+        if read_block is not None:
+            get_count = self._count_getter(node, read_block.itemsize)
+
+            def read(buf, pos, sizes):
+                return read_block(buf, pos, get_count(buf, pos, sizes))
+
+            return read
+
+        read_record, names = self._compile_record(node.member, project)
+        get_count = self._count_getter(node, None)
+
+        def read(buf, pos, sizes):
+            count = get_count(buf, pos, sizes)
+            rows = []
+            while pos < len(buf) if count is None else len(rows) < count:
+                out, pos = read_record(buf, pos, sizes)
+                rows.append(out)
+            if names is None:
+                return [out[0] for out in rows], pos
+            return self._rows_to_columns(names, rows), pos
+
+        return read
+
+    def _fixed_block(self, node, packer, names):
+        "Return the block reader of the fixed-size member by struct."
+        size = packer.size
+        iter_unpack = packer.iter_unpack
+        array_name = node.name
+
+        def read(buf, pos, count):
+            end = pos + count * size
+            if end > len(buf):
+                raise TruncatedError("unexpected EOF at %s" % array_name)
+            rows = iter_unpack(memoryview(buf)[pos:end])
+            if names is None:
+                return [row[0] for row in rows], end
+            return self._rows_to_columns(names, list(rows)), end
+
+        read.itemsize = size
+        return read
+
+    def _numpy_block(self, node, fmt, project = False):
+        """
+        Return the block reader of the fixed-size struct by NumPy.
+        If project is True, the dtype has only the fields in the projection
+        (with their offsets), so the other fields are never copied.
+        """
+        import numpy as np
+
+        dtype = np.dtype(fmt)
+        size = dtype.itemsize
+        member = node.member
+        ru = self.ru
+        array_name = node.name
+        wanted = None
+        if project and self.columns is not None:
+            wanted = self._wanted
+            names = [name for name in dtype.names if wanted(name)]
+            dtype = np.dtype({
+                "names" : names,
+                "formats" : [dtype.fields[name][0] for name in names],
+                "offsets" : [dtype.fields[name][1] for name in names],
+                "itemsize" : size,
+            })
+
+        def read(buf, pos, count):
+            end = pos + count * size
+            if end > len(buf):
+                raise TruncatedError("unexpected EOF at %s" % array_name)
+            records = np.frombuffer(buf, dtype=dtype, count=count, offset=pos)
+            columns = {}
+            member._records_to_columns(ru, records, "", columns, wanted)
+            return columns, end
+
+        read.itemsize = size
+        return read
+
+    def _count_getter(self, node, itemsize):
+        """
+        Return the function which returns the array size.
+        For '+' array, it returns None when the member is variable size.
+        """
+        size = node.size
+        name = node.name
+        if type(size) is int:
+            return lambda buf, pos, sizes: size
+        if size is None:
+            if itemsize is None:
+                return lambda buf, pos, sizes: None
+
+            def get_count(buf, pos, sizes):
+                if (len(buf) - pos) % itemsize != 0:
+                    raise TruncatedError("unexpected EOF at %s" % name)
+                return (len(buf) - pos) // itemsize
+
+            return get_count
+
+        def get_count(buf, pos, sizes):
+            if not size in sizes:
+                raise RuntimeError("size member %s value is unknown" % size)
+            return sizes[size]
+
+        return get_count
+
+    @staticmethod
+    def _rows_to_columns(names, rows):
+        "Transpose the rows into the columns."
+        if len(rows) == 0:
+            return dict((name, []) for name in names)
+        return dict(zip(names, map(list, zip(*rows))))
+
+#
+# 逐次展開ボディのバッファ
+#
+STREAM_CHUNK_SIZE	= 65536
+
+class BodyBuffer(object):
+    """
+    Buffer of the incrementally uncompressed body for RU.iter_records().
+    The consumed bytes are dropped on fill(), so the buffer holds at most
+    one partial record plus one chunk.
+    """
+    def __init__(self, chunks):
+        "Initialize this instance."
+        self.chunks = chunks
+        self.buf = b""
+        self.pos = 0
+
+    def available(self):
+        "Return the size of the unread bytes."
+        return len(self.buf) - self.pos
+
+    def at_end(self):
+        "Is the end of the body ?"
+        while self.available() == 0:
+            if not self.fill():
+                return True
+        return False
+
+    def fill(self):
+        "Append the next chunk. Return False at the end of the body."
+        chunk = next(self.chunks, None)
+        if chunk is None:
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def read(self, reader, arg):
+        "Read by the compiled reader, filling the buffer as needed."
+        while True:
+            try:
+                value, self.pos = reader(self.buf, self.pos, arg)
+                return value
+            except TruncatedError:
+                if not self.fill():
+                    raise
+
+#
+# ゼロコピー入力
+#
+class BufferIO(object):
+    """
+    Read-only I/O over the buffer (bytes, mmap, ...).
+    read() returns the memoryview slices of the buffer, so the body is
+    decoded by offsets without the intermediate BytesIO copies.
+    """
+    def __init__(self, buffer):
+        "Initialize this instance."
+        self.view = memoryview(buffer)
+        self.pos = 0
+
+    def readable(self):
+        "Is readable ?"
+        return True
+
+    def seekable(self):
+        "Is seekable ?"
+        return True
+
+    def tell(self):
+        "Return the current position."
+        return self.pos
+
+    def seek(self, offset, whence = io.SEEK_SET):
+        "Change the position and return it."
+        if whence == io.SEEK_CUR:
+            offset += self.pos
+        elif whence == io.SEEK_END:
+            offset += len(self.view)
+        if offset < 0:
+            raise ValueError("negative seek position %d" % offset)
+        self.pos = offset
+        return self.pos
+
+    def read(self, size = -1):
+        "Read up to size bytes as the memoryview."
+        start = min(self.pos, len(self.view))
+        if size is None or size < 0:
+            end = len(self.view)
+        else:
+            end = min(start + size, len(self.view))
+        self.pos = end
+        return self.view[start:end]
+
+class MappedFile(BufferIO):
+    """
+    Read-only memory-mapped file for RU.load() / load_values() /
+    iter_records(). The file costs one page-cache mapping instead of
+    the heap copies of its contents.
+    """
+    def __init__(self, path):
+        "Map the file."
+        import mmap
+
+        self.mmap = None
+        with open(path, "rb") as fp:
+            # 空ファイルは mmap できない
+            if os.fstat(fp.fileno()).st_size > 0:
+                self.mmap = mmap.mmap(fp.fileno(), 0, access = mmap.ACCESS_READ)
+        super(MappedFile, self).__init__(self.mmap if self.mmap is not None
+                                         else b"")
+
+    def close(self):
+        "Unmap the file."
+        if self.mmap is None:
+            return
+        try:
+            self.view.release()
+            self.mmap.close()
+        except BufferError:
+            # 参照中の memoryview が残っていれば解放は GC に任せる
+            pass
+        self.mmap = None
+
+    def __enter__(self):
+        "Enter the runtime context."
+        return self
+
+    def __exit__(self, *exc_info):
+        "Exit the runtime context."
+        self.close()
+        return False
+
 #
 # RUクラス
 #
@@ -1300,6 +2132,8 @@ class RU(object):
         self.header = None
         self.root = None
         self.encoding = { "STR" : "euc_jp" }
+        self.columnar = False
+        self.values = None
         if header is not None:
             self.create(header)
 
@@ -1315,8 +2149,8 @@ class RU(object):
         "Create the Reusable."
         if header is not None:
             self.header = header
-        parser = FormatParser()
-        self.root, size_members = parser.parse(self.header.format)
+        root, size_members = parse_format(self.header.format)
+        self.root = root.copy()
         self.level = 0
         self.size_members = {}
         for name in size_members.keys():
@@ -1355,22 +2189,202 @@ class RU(object):
         else:
             self.encoding.pop(native_str_type, None)
 
-    def load(self, io_obj, strict = True):
-        "Load the Reusable from I/O."
+    def load(self, io_obj, strict = True, columnar = False):
+        """
+        Load the Reusable from I/O.
+        If columnar is True, the arrays of fixed-size struct are decoded
+        at once into NumPy columns (see ArrayType.get_columns()).
+        The uncompressed body of MappedFile is read in place.
+        """
+        self.columnar = columnar
+        body_io = BufferIO(self._load_body(io_obj, strict))
+        root, size_members = parse_format(self.header["format"])
+        self.root = root.copy()
+        self.level = 0
+        self.size_members = {}
+        for name in size_members.keys():
+            self.size_members[name] = {}
+
+        self.root.read(self, body_io)
+
+        return self.root
+
+    def load_values(self, io_obj, strict = True, columnar = False,
+                    columns = None):
+        """
+        Load the Reusable from I/O as the plain values.
+        The body is decoded by the compiled decoder (see compile_format()),
+        and the Type tree is not built (get_root() returns None).
+        If columns is given, only these members of the root array records
+        are decoded.
+        """
+        data_part = self._load_body(io_obj, strict)
+        encoding = tuple(sorted(self.encoding.items()))
+        decode = compile_format(self.header["format"], encoding, columnar,
+                                self._projection(columns))
+        self.root = None
+        self.values = decode(data_part)
+
+        return self.values
+
+    def get_values(self):
+        """
+        Return the values loaded by load_values(), or the members before
+        the array by iter_records().
+        """
+        return self.values
+
+    def iter_records(self, io_obj, path = "point_data", batch_size = None,
+                     strict = True, columnar = False,
+                     chunk_size = STREAM_CHUNK_SIZE, columns = None):
+        """
+        Iterate the records of the root array member from I/O.
+        The body is decompressed and decoded incrementally, so the memory
+        is bounded by chunk_size and batch_size instead of the file size.
+        Yield the record (dict for struct member), or if batch_size is
+        given, the columns (dict of list) of up to batch_size records.
+        The root members before the array are set to get_values().
+        If columns is given, only these record members are decoded.
+        """
+        self._load_header(io_obj, strict)
+        encoding = tuple(sorted(self.encoding.items()))
+        read_head, read_record, read_block, names, node = \
+            compile_records(self.header["format"], path, encoding, columnar,
+                            self._projection(columns))
+        body = BodyBuffer(self._iter_body(io_obj, chunk_size))
+        self.root = None
+        self.values = body.read(read_head, {})
+        sizes = dict(self.values)
+        if type(node.size) is int:
+            count = node.size
+        elif node.size is None:
+            count = None
+        elif node.size in self.values:
+            count = self.values[node.size]
+        else:
+            raise RuntimeError("size member %s value is unknown" % node.size)
+
+        if batch_size is not None and read_block is not None:
+            itemsize = read_block.itemsize
+            while count is None or count > 0:
+                if count is None:
+                    n = min(batch_size, body.available() // itemsize)
+                    if n == 0:
+                        if body.fill():
+                            continue
+                        if body.available() > 0:
+                            raise TruncatedError("unexpected EOF at %s" % path)
+                        break
+                else:
+                    n = min(batch_size, count)
+                    count -= n
+                yield body.read(read_block, n)
+            return
+
+        rows = []
+        i = 0
+        while (count is None and not body.at_end()) or \
+                (count is not None and i < count):
+            out = body.read(read_record, sizes)
+            i += 1
+            if batch_size is None:
+                yield out[0] if names is None else dict(zip(names, out))
+                continue
+            rows.append(out)
+            if len(rows) >= batch_size:
+                yield self._rows_to_batch(names, rows)
+                rows = []
+        if len(rows) > 0:
+            yield self._rows_to_batch(names, rows)
+
+    @staticmethod
+    def _projection(columns):
+        "Normalize the projection as the cache key."
+        if columns is None:
+            return None
+        return tuple(sorted(set(columns)))
+
+    @staticmethod
+    def _rows_to_batch(names, rows):
+        "Convert the record rows into the batch."
+        if names is None:
+            return [out[0] for out in rows]
+        return FormatCompiler._rows_to_columns(names, rows)
+
+    def _load_header(self, io_obj, strict):
+        "Load the header."
         if self.header is None:
             self.header = Header()
         self.header.load(io_obj, strict)
+
+    def _iter_body(self, io_obj, chunk_size):
+        "Yield the uncompressed body incrementally."
+        remain = self.header["data_size"]
+        compress_type = self.header["compress_type"]
+        if compress_type is None or compress_type == "":
+            new_decompressor = None
+        elif compress_type == "gzip":
+            import zlib
+
+            new_decompressor = lambda: zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif compress_type == "bzip2":
+            import bz2
+
+            new_decompressor = bz2.BZ2Decompressor
+        else:
+            raise RuntimeError("no support compress_type %s" % compress_type)
+
+        decompressor = None
+        while remain > 0:
+            data = io_obj.read(min(chunk_size, remain))
+            if len(data) == 0:
+                raise TruncatedError("unexpected EOF")
+            remain -= len(data)
+            if new_decompressor is None:
+                yield data
+                continue
+            while len(data) > 0:
+                # gzip の複数メンバ / bzip2 の複数ストリームに対応
+                if decompressor is None or decompressor.eof:
+                    decompressor = new_decompressor()
+                out = decompressor.decompress(data, chunk_size)
+                if compress_type == "gzip":
+                    data = decompressor.unconsumed_tail
+                else:
+                    data = b""
+                    while not decompressor.needs_input and \
+                            not decompressor.eof:
+                        yield out
+                        out = decompressor.decompress(b"", chunk_size)
+                if decompressor.eof:
+                    data = decompressor.unused_data + data
+                yield out
+        if decompressor is not None and not decompressor.eof:
+            raise TruncatedError("unexpected EOF")
+
+    def _load_body(self, io_obj, strict):
+        "Load the header and return the uncompressed body."
+        self._load_header(io_obj, strict)
         data_size = self.header["data_size"]
         data_part = io_obj.read(data_size)
         if len(data_part) != data_size:
-            raise RuntimeError("unexpected EOF")
+            raise TruncatedError("unexpected EOF")
         compress_type = self.header["compress_type"]
         if compress_type is not None and compress_type != "":
             if compress_type == "gzip":
-                import gzip
+                import zlib
 
+                # gzip.decompress() は入力を BytesIO にコピーするので
+                # メンバ毎に decompressobj で直接展開する
                 compressed_data_part = data_part
-                data_part = gzip.decompress(compressed_data_part)
+                members = []
+                while len(compressed_data_part) > 0:
+                    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                    members.append(decompressor.decompress(compressed_data_part))
+                    if not decompressor.eof:
+                        raise TruncatedError("unexpected EOF")
+                    compressed_data_part = decompressor.unused_data
+                data_part = b"".join(members)
             elif compress_type == "bzip2":
                 import bz2
 
@@ -1380,17 +2394,7 @@ class RU(object):
                 raise RuntimeError("no support compress_type %s" %
                                    compress_type)
 
-        body_io = io.BytesIO(data_part)
-        parser = FormatParser()
-        self.root, size_members = parser.parse(self.header["format"])
-        self.level = 0
-        self.size_members = {}
-        for name in size_members.keys():
-            self.size_members[name] = {}
-
-        self.root.read(self, body_io)
-
-        return self.root
+        return data_part
 
     def save(self, io_obj):
         "Save the Reuable to I/O."
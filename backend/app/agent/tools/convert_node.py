@@ -1,8 +1,9 @@
 # app/agent/tools/convert_node.py
 import logging
 from langchain_core.tools import tool
-from typing import List, Dict
-from app.utils.ru_utils import load_ru
+from typing import Iterable, List, Dict
+from app.utils.dataset_store import get_dataset_store
+from app.utils.ru_utils import iter_ru_many, load_ru_many, requested_columns
 import pandas as pd, uuid, os, tempfile
 from pathlib import Path
 
@@ -17,14 +18,22 @@ class UnsupportedFormatError(ValueError):
 from app.agent.tools.fallback_node import fallback_node as _fallback_tool
 
 # --- 共通実装 -----------------------------------------------------
-def _convert_impl(files: List[str], fmt: str) -> List[str]:
+def _convert_impl(
+    files: List[str], fmt: str, columns: List[str] | None = None, df: pd.DataFrame | None = None,
+) -> List[str]:
+    """df（グラフでデコード済みのデータセット）があればそれを書き出し、無ければ files をデコード"""
     import pandas as pd, uuid, os, tempfile
 
-    df = pd.concat([load_ru(p) for p in files], ignore_index=True)
     out_dir = tempfile.gettempdir()
     uid = uuid.uuid4().hex
     out_path = os.path.join(out_dir, f"output_{uid}.{fmt}")
+    if fmt == "csv" and df is None:
+        # デコードが終わったファイルから順に書き出す（デコードと書き込みを重ねる）
+        _write_csv_stream(iter_ru_many(files, columns=columns), out_path)
+        return [out_path]
 
+    if df is None:
+        df = load_ru_many(files, columns=columns)
     match fmt:
         case "csv":
             df.to_csv(out_path, index=False)
@@ -36,11 +45,31 @@ def _convert_impl(files: List[str], fmt: str) -> List[str]:
             raise UnsupportedFormatError(fmt)
     return [out_path]
 
+def _write_csv_stream(frames: Iterable[pd.DataFrame], out_path: str) -> None:
+    """
+    DataFrame を届いた順に CSV へ追記（結果は連結してから書いた場合と同じ）
+    途中で列構成・型が変わったら、連結時の列合わせ・型の統一に合わせて全体を書き直す
+    """
+    written: List[pd.DataFrame] = []
+    frames = iter(frames)
+    with open(out_path, "w", newline="") as f:
+        for df in frames:
+            if written and not df.dtypes.equals(written[0].dtypes):
+                rest = [df, *frames]
+                break
+            df.to_csv(f, index=False, header=not written)
+            written.append(df)
+        else:
+            if written:
+                return
+            rest = []
+    pd.concat(written + rest, ignore_index=True).to_csv(out_path, index=False)
+
 # --- LangChain/LangGraph ツール（従来シグネチャ） -----------------
 @tool("convert_ru")
-def convert_node(files: List[str], fmt: str) -> List[str]:
-    """RU → csv/json/xml 変換。pytest から直接呼べる。"""
-    return _convert_impl(files, fmt)
+def convert_node(files: List[str], fmt: str, columns: List[str] | None = None) -> List[str]:
+    """RU → csv/json/xml 変換。columns 指定時はその変数だけデコード。pytest から直接呼べる。"""
+    return _convert_impl(files, fmt, columns)
 
 # --- Flow 用ラッパー（state dict を受ける） -----------------------
 def convert_node_flow(state: Dict) -> Dict:
@@ -49,8 +78,9 @@ def convert_node_flow(state: Dict) -> Dict:
     parsed = state.get("parsed", {})
     fmt = parsed.get("format") or state.get("format")
     ru_files = state.get("files", state.get("ru_files", []))
+    columns = state.get("columns") or requested_columns(parsed)
     
-    logger.debug(f"Format: {fmt}, RU files: {ru_files}")
+    logger.debug(f"Format: {fmt}, RU files: {ru_files}, columns: {columns}")
     
     if not fmt:
         logger.warning("No format specified, returning empty result")
@@ -70,7 +100,9 @@ def convert_node_flow(state: Dict) -> Dict:
         return {"files": [out_path]}
     
     try:
-        files = _convert_impl(ru_files, fmt)
+        # decode ノードが共有したデータセットがあれば再デコードしない
+        df = get_dataset_store().get(state.get("dataset"))
+        files = _convert_impl(ru_files, fmt, columns, df)
         logger.debug(f"Converted files: {files}")
         return {"files": files}
     except Exception as exc:
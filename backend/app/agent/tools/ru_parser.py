@@ -1,6 +1,6 @@
 from pathlib import Path
 from typing import Any, Dict, Union
-from .RU import RU
+from .RU import RU, parse_header
 import os
 import json
 import pandas as pd
@@ -152,15 +152,15 @@ class RUParser:
         if self._parsed is None:
             # 位置情報を RU ファイル（GeoJSON）としてロードし、GeoJSON 部分を抽出
             try:
-                with self._loc_path.open("rb") as fp:
-                    content = fp.read()
-                    # RU ヘッダーの終端（\x04\x1a）を探す
-                    end_of_header = content.find(b'\x04\x1a') + 2
-                    if end_of_header <= 2:
-                        raise ValueError(f"No RU header end found in {self._loc_path}")
-                    # GeoJSON 部分を抽出
-                    geojson_data = content[end_of_header:].decode('utf-8', errors='ignore')
-                    location = json.loads(geojson_data)
+                content = self._loc_path.read_bytes()
+                # RU ヘッダーを 1 回の検索で解析し、本体オフセットを得る
+                try:
+                    _, end_of_header = parse_header(content, strict=False)
+                except RuntimeError as e:
+                    raise ValueError(f"No RU header end found in {self._loc_path}") from e
+                # GeoJSON 部分を抽出
+                geojson_data = content[end_of_header:].decode('utf-8', errors='ignore')
+                location = json.loads(geojson_data)
             except json.JSONDecodeError as e:
                 raise ValueError(f"Failed to parse GeoJSON data in {self._loc_path}: {e}") from e
             except Exception as e:
@@ -1,11 +1,14 @@
 # backend/app/agent/tools/s3_fetcher.py
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from typing import ClassVar, List
 from datetime import datetime
 from langchain.tools import BaseTool
-from .s3_loader import load_from_s3
+from .s3_loader import S3FetchError, day_prefixes, fetch_frames_from_s3, load_from_s3
 from app.config import get_settings
 from pathlib import Path, PurePosixPath
-import json, botocore, boto3
+import json, botocore
+from app.utils.object_store import get_object_store
 
 settings = get_settings()
 
@@ -21,7 +24,7 @@ def download_location_json(bucket: str, key: str) -> dict:
     if local.exists():
         return json.loads(local.read_text(encoding="utf-8"))
 
-    s3 = boto3.client("s3")
+    s3 = get_object_store()
     try:
         obj = s3.get_object(Bucket=bucket, Key=key)
         return json.load(obj["Body"])
@@ -39,19 +42,54 @@ class LoadRuFilesTool(BaseTool):
 
     # ---- 同期用 ---------------------------------------------------
     def _run(self, **kwargs) -> List[str]:
-        import asyncio
-        return asyncio.run(self._arun(**kwargs))
+        """
+        同期用（非同期の呼び出し元は _arun を直接 await すること）
+        実行中のイベントループ内から呼ばれた場合は asyncio.run を入れ子にできないので別スレッドで回す
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self._arun(**kwargs))
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            return pool.submit(asyncio.run, self._arun(**kwargs)).result()
 
     # ---- 非同期用 -------------------------------------------------
-    async def _arun(self, tag_id: str, start_dt: str, end_dt: str | None = None) -> List[str]:
+    async def _arun(
+        self,
+        tag_id: str,
+        start_dt: str,
+        end_dt: str | None = None,
+        columns: List[str] | None = None,
+        in_memory: bool | None = None,
+    ) -> List[str]:
+        """
+        in_memory（既定は Settings.s3_fetch_in_memory）なら一時ファイルを作らずにデコードまで済ませ、
+        s3://bucket/key を返す（デコード結果はメモリキャッシュ経由で load_ru / load_ru_many が再利用）
+        """
         start = datetime.fromisoformat(start_dt)
         end = datetime.fromisoformat(end_dt) if end_dt else None
 
-        prefix = f"{tag_id}/{start.year:04d}/{start.month:02d}/{start.day:02d}/"
+        # 範囲が掛かる日毎のプレフィックスを全て一覧する（日付跨ぎ対応）
+        prefixes = day_prefixes(tag_id, start, end)
+
+        if in_memory if in_memory is not None else settings.s3_fetch_in_memory:
+            try:
+                frames = await fetch_frames_from_s3(
+                    bucket=settings.s3_bucket,
+                    prefix=prefixes,
+                    start_dt=start,
+                    end_dt=end,
+                    columns=columns,
+                )
+            except S3FetchError as e:
+                return [str(e)]
+            except Exception as e:
+                return [f"Error loading from S3: {str(e)}"]
+            return list(frames)
 
         return await load_from_s3(
             bucket=settings.s3_bucket,
-            prefix=prefix,
+            prefix=prefixes,
             start_dt=start,
             end_dt=end,
         )
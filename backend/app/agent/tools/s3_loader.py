@@ -1,58 +1,378 @@
-import boto3
+import asyncio
+import bisect
+from collections import OrderedDict, deque
+from concurrent.futures import Executor, ThreadPoolExecutor
 from datetime import datetime, timedelta
-import os
+import logging
 import re
+import threading
+import time
+from typing import AsyncIterator, Dict
 
-async def load_from_s3(bucket: str, prefix: str, start_dt: datetime, end_dt: datetime = None) -> list:
+import pandas as pd
+
+from app.config import get_settings
+from app.utils.download_cache import get_download_cache
+from app.utils.object_store import get_object_store
+from app.utils.parquet_cache import register_s3_object
+from app.utils.single_flight import SingleFlight
+from app.utils.ru_utils import (
+    decode_executor, decode_s3_ru, decode_workers, fetch_s3_ru, register_s3_etag, s3_uri,
+)
+
+logger = logging.getLogger(__name__)
+
+# 単一時刻指定で許容する前後の幅（秒）
+NEAREST_WINDOW_SEC = 1800
+
+
+def day_prefixes(tag_id: str, start_dt: datetime, end_dt: datetime = None) -> list:
+    """
+    時間範囲が掛かる日毎のプレフィックス {tag_id}/yyyy/mm/dd/ を列挙
+    単一時刻の場合は前後 30 分の窓で判定する（日付を跨ぐと 2 日分）
+    """
+    if end_dt is None:
+        window = timedelta(seconds=NEAREST_WINDOW_SEC)
+        start_dt, end_dt = start_dt - window, start_dt + window
+    prefixes = []
+    day = start_dt.date()
+    while day <= end_dt.date():
+        prefixes.append(f"{tag_id}/{day.year:04d}/{day.month:02d}/{day.day:02d}/")
+        day += timedelta(days=1)
+    return prefixes
+
+
+class S3FetchError(RuntimeError):
+    """一覧・取得の失敗（メッセージは load_from_s3 が返す "Error: ..." と同じ）"""
+
+
+async def load_from_s3(
+    bucket: str,
+    prefix: str | list,
+    start_dt: datetime,
+    end_dt: datetime = None,
+    concurrency: int | None = None,
+) -> list:
     """
     S3からファイルをロードする関数
     ファイルはyyyymmddHHMMSS.{uuid}の形式で保存されている
+    prefix は 1 つ、または日毎プレフィックスのリスト（day_prefixes）。各プレフィックスは
+    ContinuationToken を辿って全件を並行に一覧し、日毎の一覧（DayManifest）としてキャッシュする
+    （過去日は無期限、当日は Settings.s3_manifest_ttl_sec）
+    ダウンロードはスレッドプールで並行に行い（上限 concurrency、既定は Settings）、
+    結果は一覧の順序を保つ。失敗したオブジェクトだけをスキップする
+    """
+    try:
+        results = await _fetch_each(bucket, prefix, start_dt, end_dt, concurrency, _download)
+    except S3FetchError as e:
+        return [str(e)]
+    except Exception as e:
+        return [f"Error loading from S3: {str(e)}"]
+    return [path for _, path in results]
+
+
+async def fetch_frames_from_s3(
+    bucket: str,
+    prefix: str | list,
+    start_dt: datetime,
+    end_dt: datetime = None,
+    columns: list | None = None,
+    concurrency: int | None = None,
+    persist: bool | None = None,
+    executor: Executor | None = None,
+) -> Dict[str, pd.DataFrame]:
+    """
+    load_from_s3 のメモリ版: get_object の本体をそのままデコードし、
+    {s3://bucket/key: DataFrame} を時刻順で返す（ローカルファイルは作らない）
+    取得とデコードは stream_frames_from_s3 のパイプラインで重ねて行う
+    persist=True（既定は Settings.s3_persist_downloads）ならダウンロードキャッシュにも保存
+    一覧できない・全件失敗した場合は S3FetchError
+    """
+    results = {}
+    errors = []
+    async for i, uri, df in stream_frames_from_s3(
+        bucket, prefix, start_dt, end_dt, columns, concurrency, persist, executor
+    ):
+        if isinstance(df, BaseException):
+            logger.warning(f"Failed to fetch {uri}: {df}")
+            errors.append(df)
+        else:
+            results[i] = (uri, df)
+
+    if not results:
+        raise S3FetchError(f"Error loading from S3: {errors[0]}")
+    return {uri: df for _, (uri, df) in sorted(results.items())}
+
+
+async def stream_frames_from_s3(
+    bucket: str,
+    prefix: str | list,
+    start_dt: datetime,
+    end_dt: datetime = None,
+    columns: list | None = None,
+    concurrency: int | None = None,
+    persist: bool | None = None,
+    executor: Executor | None = None,
+    depth: int | None = None,
+) -> AsyncIterator[tuple]:
     """
-    s3 = boto3.client('s3')
+    取得とデコードを重ねるパイプライン。(一覧上の順番, s3 URI, DataFrame) を完了順に yield する
+        取得（スレッド × concurrency）→ 有界キュー → デコード（プロセスプール）→ 有界キュー → 呼び出し側
+    ・キャッシュ済みのものはデコード段を素通りする
+    ・キュー長は depth（既定は Settings.ru_pipeline_depth）。詰まれば上流が待つので、
+      消費が遅くても取得済みで未処理の本体はキュー長程度しか溜まらない
+    ・失敗したオブジェクトは DataFrame の代わりに例外を yield する
+    一覧できない・対象が無い場合は S3FetchError
+    """
+    prefixes = [prefix] if isinstance(prefix, str) else list(prefix)
+    s3 = get_object_store()
+    settings = get_settings()
+    workers = concurrency or settings.s3_download_concurrency
+    depth = depth or settings.ru_pipeline_depth
+    loop = asyncio.get_running_loop()
+
+    # デコードは CPU バウンドなのでプロセスプール（ワーカー 1 ならデコード段のスレッドでそのまま）
+    decoder = executor or decode_executor()
+    n_decoders = decode_workers() if decoder is not None else 1
+
+    # デコード段のスレッドは decoder の完了待ちで塞がるので、その分を取得用に上乗せする
+    # with 文は使わない: 消費側が途中で抜けたときの shutdown(wait=True) がイベントループを塞ぐ
+    pool = ThreadPoolExecutor(max_workers=workers + n_decoders)
     try:
-        response = s3.list_objects_v2(Bucket=bucket, Prefix=prefix)
-        if "Contents" not in response:
-            return [f"Error: No files found in {bucket}/{prefix}"]
-
-        files = []
-        # 日時形式のパターン（yyyymmddHHMMSS）
-        datetime_pattern = re.compile(r'^(\d{14})')
-        
-        for obj in response["Contents"]:
-            key = obj["Key"]
-            filename = key.split("/")[-1]
-            
+        targets = await _list_targets(loop, pool, s3, bucket, prefixes, start_dt, end_dt)
+        # 返した s3:// URI を後で load_ru しても head_object 無しでキャッシュを引けるように
+        for obj in targets:
+            register_s3_etag(bucket, obj["Key"], obj["ETag"])
+
+        todo = deque(enumerate(targets))
+        fetched: asyncio.Queue = asyncio.Queue(maxsize=depth)
+        decoded: asyncio.Queue = asyncio.Queue(maxsize=depth)
+
+        async def fetch_stage():
+            while todo:
+                i, obj = todo.popleft()
+                uri = s3_uri(bucket, obj["Key"])
+                try:
+                    found = await loop.run_in_executor(
+                        pool, fetch_s3_ru, bucket, obj["Key"], obj["ETag"], columns, persist, s3
+                    )
+                except Exception as e:
+                    await decoded.put((i, uri, e))
+                    continue
+                if isinstance(found, pd.DataFrame):
+                    await decoded.put((i, uri, found))
+                else:
+                    await fetched.put((i, obj, found))
+
+        async def decode_stage():
+            while True:
+                item = await fetched.get()
+                if item is None:
+                    return
+                i, obj, found = item
+                uri = s3_uri(bucket, obj["Key"])
+                try:
+                    # 待ち合わせ（SingleFlight）はスレッドで行い、デコード自体は decoder に投げる
+                    df = await loop.run_in_executor(
+                        pool, decode_s3_ru, bucket, obj["Key"], obj["ETag"], found, columns, decoder
+                    )
+                except Exception as e:
+                    df = e
+                await decoded.put((i, uri, df))
+
+        async def run_fetchers():
+            await asyncio.gather(*(fetch_stage() for _ in range(min(workers, len(targets)))))
+            for _ in range(n_decoders):
+                await fetched.put(None)
+
+        tasks = [asyncio.ensure_future(run_fetchers())]
+        tasks += [asyncio.ensure_future(decode_stage()) for _ in range(n_decoders)]
+        try:
+            for _ in targets:
+                yield await decoded.get()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        # 実行中の取得・デコードは待たずに手放し、未着手のものは取り消す
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def _list_targets(loop, pool, s3, bucket: str, prefixes: list, start_dt, end_dt) -> list:
+    """日毎一覧を並行に取得し、時間範囲に合うオブジェクトを選ぶ"""
+    manifests = await asyncio.gather(
+        *(loop.run_in_executor(pool, _get_manifest, s3, bucket, p) for p in prefixes)
+    )
+    if not any(manifests):
+        raise S3FetchError(f"Error: No files found in {bucket}/{', '.join(prefixes)}")
+
+    targets = _select_objects(manifests, start_dt, end_dt)
+    if not targets:
+        raise S3FetchError("Error: No matching files")
+    return targets
+
+
+async def _fetch_each(bucket, prefix, start_dt, end_dt, concurrency, fetch) -> list:
+    """
+    一覧 → 時間範囲で選択 → fetch(s3, bucket, obj) をスレッドプールで並行実行（load_from_s3 用）
+    成功分の (obj, 結果) を一覧の順序で返す
+    """
+    prefixes = [prefix] if isinstance(prefix, str) else list(prefix)
+    s3 = get_object_store()
+    workers = concurrency or get_settings().s3_download_concurrency
+    loop = asyncio.get_running_loop()
+    # boto3 の client（と LocalObjectStore）はスレッドセーフなので共有する
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        targets = await _list_targets(loop, pool, s3, bucket, prefixes, start_dt, end_dt)
+        results = await asyncio.gather(
+            *(loop.run_in_executor(pool, fetch, s3, bucket, obj) for obj in targets),
+            return_exceptions=True,
+        )
+
+    fetched = []
+    errors = []
+    for obj, result in zip(targets, results):
+        if isinstance(result, BaseException):
+            logger.warning(f"Failed to fetch s3://{bucket}/{obj['Key']}: {result}")
+            errors.append(result)
+        else:
+            fetched.append((obj, result))
+
+    if not fetched:
+        raise S3FetchError(f"Error loading from S3: {errors[0]}")
+    return fetched
+
+
+def _list_objects(s3, bucket: str, prefix: str) -> list:
+    """プレフィックス配下を ContinuationToken で最後まで一覧（1 回 1000 件上限）"""
+    contents = []
+    kwargs = {"Bucket": bucket, "Prefix": prefix}
+    while True:
+        response = s3.list_objects_v2(**kwargs)
+        contents.extend(response.get("Contents", []))
+        if not response.get("IsTruncated"):
+            return contents
+        kwargs["ContinuationToken"] = response["NextContinuationToken"]
+
+
+class DayManifest:
+    """
+    1 日分のプレフィックスのオブジェクト一覧（ファイル名の時刻でソート済み）
+    範囲・最近傍の検索は二分探索で行う
+    """
+
+    # 日時形式のパターン（yyyymmddHHMMSS）
+    DATETIME_PATTERN = re.compile(r'^(\d{14})')
+
+    def __init__(self, contents: list, closed: bool):
+        entries = []
+        for obj in contents:
             # ファイル名から日時を抽出（例: 20250417195848.ea2008d2-4ae4-4e3f-a5ec-cb80beec37a4）
-            dt_match = datetime_pattern.match(filename)
+            dt_match = self.DATETIME_PATTERN.match(obj["Key"].split("/")[-1])
             if not dt_match:
                 continue
-                
-            dt_str = dt_match.group(1)
             try:
-                file_dt = datetime.strptime(dt_str, "%Y%m%d%H%M%S")
-                
-                # 時間範囲が指定されている場合
-                if end_dt:
-                    if start_dt <= file_dt <= end_dt:
-                        local_path = f"tmp/{filename}"
-                        os.makedirs("tmp", exist_ok=True)
-                        s3.download_file(bucket, key, local_path)
-                        files.append(local_path)
-                # 単一時刻の場合、最も近い時刻のファイルを選択
-                else:
-                    time_diff = abs((file_dt - start_dt).total_seconds())
-                    # 30分以内のファイルなら追加
-                    if time_diff < 1800:  
-                        local_path = f"tmp/{filename}"
-                        os.makedirs("tmp", exist_ok=True)
-                        s3.download_file(bucket, key, local_path)
-                        files.append(local_path)
-                        # 30分以内で最も近いファイルが見つかったら終了
-                        break
+                file_dt = datetime.strptime(dt_match.group(1), "%Y%m%d%H%M%S")
             except ValueError:
                 continue
-                
-        return files if files else ["Error: No matching files"]
-        
-    except Exception as e:
-        return [f"Error loading from S3: {str(e)}"]
\ No newline at end of file
+            entries.append((file_dt, obj["Key"], obj))
+        entries.sort(key=lambda e: (e[0], e[1]))
+        self.times = [e[0] for e in entries]
+        self.objects = [e[2] for e in entries]
+        self.closed = closed              # 過去日は内容が変わらない
+        self.fetched_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def is_fresh(self, ttl: float) -> bool:
+        return self.closed or time.monotonic() - self.fetched_at < ttl
+
+    def between(self, start_dt: datetime, end_dt: datetime) -> list:
+        """start_dt <= 時刻 <= end_dt のオブジェクト（時刻順）"""
+        lo = bisect.bisect_left(self.times, start_dt)
+        hi = bisect.bisect_right(self.times, end_dt)
+        return self.objects[lo:hi]
+
+    def nearest(self, dt: datetime):
+        """最も近い時刻の (差の秒数, オブジェクト)。空なら None"""
+        i = bisect.bisect_left(self.times, dt)
+        candidates = [j for j in (i - 1, i) if 0 <= j < len(self.times)]
+        if not candidates:
+            return None
+        j = min(candidates, key=lambda j: abs((self.times[j] - dt).total_seconds()))
+        return abs((self.times[j] - dt).total_seconds()), self.objects[j]
+
+
+# (bucket, prefix) → DayManifest（LRU、当日分は TTL で再一覧）
+_MANIFESTS: "OrderedDict[tuple, DayManifest]" = OrderedDict()
+_MANIFESTS_LOCK = threading.Lock()
+MANIFEST_CACHE_SIZE = 4096
+# (bucket, prefix) → 実行中の一覧
+_LISTINGS = SingleFlight()
+
+
+def clear_manifest_cache() -> None:
+    with _MANIFESTS_LOCK:
+        _MANIFESTS.clear()
+
+
+def _get_manifest(s3, bucket: str, prefix: str) -> DayManifest:
+    """キャッシュ済みの日毎一覧を返す。無い／期限切れなら一覧し直す（ワーカースレッドで実行）"""
+    cache_key = (bucket, prefix)
+    ttl = get_settings().s3_manifest_ttl_sec
+    with _MANIFESTS_LOCK:
+        manifest = _MANIFESTS.get(cache_key)
+        if manifest is not None and manifest.is_fresh(ttl):
+            _MANIFESTS.move_to_end(cache_key)
+            return manifest
+
+    # 同じプレフィックスを同時に一覧しに来たら 1 回の一覧を待ち合わせる
+    manifest, shared = _LISTINGS.do(cache_key, _list_manifest, s3, bucket, prefix)
+    if shared:
+        return manifest
+    with _MANIFESTS_LOCK:
+        _MANIFESTS[cache_key] = manifest
+        _MANIFESTS.move_to_end(cache_key)
+        while len(_MANIFESTS) > MANIFEST_CACHE_SIZE:
+            _MANIFESTS.popitem(last=False)
+    return manifest
+
+
+def _list_manifest(s3, bucket: str, prefix: str) -> DayManifest:
+    return DayManifest(_list_objects(s3, bucket, prefix), _is_closed_day(prefix))
+
+
+def _is_closed_day(prefix: str) -> bool:
+    """プレフィックス末尾の yyyy/mm/dd が UTC の今日より前なら True"""
+    try:
+        day = datetime.strptime("/".join(prefix.rstrip("/").split("/")[-3:]), "%Y/%m/%d")
+    except ValueError:
+        return False
+    return day.date() < datetime.utcnow().date()
+
+
+def _select_objects(manifests: list, start_dt: datetime, end_dt: datetime = None) -> list:
+    """日毎一覧から時間範囲に合うオブジェクトを選ぶ（ダウンロードはしない）"""
+    # 時間範囲が指定されている場合
+    if end_dt:
+        return [obj for m in manifests for obj in m.between(start_dt, end_dt)]
+
+    # 単一時刻の場合、30分以内で最も近い時刻のファイルを選択
+    found = [hit for hit in (m.nearest(start_dt) for m in manifests) if hit is not None]
+    if not found:
+        return []
+    time_diff, obj = min(found, key=lambda hit: hit[0])
+    return [obj] if time_diff < NEAREST_WINDOW_SEC else []
+
+
+def _download(s3, bucket: str, obj: dict) -> str:
+    """
+    1 オブジェクトをダウンロードキャッシュ経由で取得してローカルパスを返す（ワーカースレッドで実行）
+    (bucket, key, ETag) が同じならネットワークに出ない
+    """
+    key = obj["Key"]
+    local_path = get_download_cache().fetch(s3, bucket, key, obj["ETag"])
+    register_s3_object(local_path, key, obj["ETag"])
+    return str(local_path)
@@ -12,10 +12,11 @@ import cartopy.crs as ccrs
 from langchain_core.tools import tool
 
 from app.utils.ru_utils import (
-    load_ru,
+    load_ru_many,
     ensure_latlon,
     extract_columns,
     resolve_variable,
+    requested_columns,
 )
 
 # --------------------------------------------------------------------
@@ -57,9 +58,21 @@ def viz_node(
     variables : 可視化に使う気象変数コード／日本語／英語（任意）
     x, y      : 軸に使う列名（scatter / bar 用）
     """
-    # ------ 1. RU → DataFrame --------------------------------------
-    df = pd.concat([load_ru(p) for p in ru_files], ignore_index=True)
+    # ------ 1. RU → DataFrame（使う変数だけデコード） ------------------
+    columns = requested_columns({"vars": variables, "x": x, "y": y})
+    df = load_ru_many(ru_files, columns=columns)
+    return render_chart(df, chart, tag_id or _guess_tag_id(ru_files[0]), variables, x, y)
 
+
+def render_chart(
+    df: pd.DataFrame,
+    chart: str,
+    tag_id: str | None = None,
+    variables: List[str] | None = None,
+    x: str | None = None,
+    y: str | None = None,
+) -> str:
+    """デコード済みの DataFrame を可視化し PNG ファイルパスを返す（df は変更しない）"""
     # ------ 2. 変数名をコードに正規化 --------------------------------
     def _resolve(name: str | None) -> str | None:
         if not name:
@@ -81,7 +94,7 @@ def viz_node(
 
     # ------ 4. map: lat/lon を必須とし、無ければ明示エラー ----------
     if chart == "map":
-        df = ensure_latlon(df, tag_id or _guess_tag_id(ru_files[0]))
+        df = ensure_latlon(df, tag_id)
         fig = plt.figure()
         ax = plt.axes(projection=ccrs.PlateCarree())
         ax.coastlines()
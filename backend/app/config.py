@@ -13,7 +13,55 @@ class Settings(BaseSettings):
     api_port: int = Field(7000, description="FastAPI listen port")
     aws_profile: str | None = Field(None, alias="AWS_PROFILE")
     aws_default_region: str = Field("us-east-1", alias="AWS_DEFAULT_REGION")
+    aws_max_pool_connections: int = Field(
+        32, alias="AWS_MAX_POOL_CONNECTIONS",
+        description="boto3 クライアント 1 つあたりの HTTP 接続プール数",
+    )
+    aws_max_attempts: int = Field(
+        5, alias="AWS_MAX_ATTEMPTS",
+        description="boto3 adaptive リトライの最大試行回数",
+    )
     s3_bucket: str = Field("wni-wfc-stock-ane1", alias="S3_BUCKET")
+    s3_backend: str = Field(
+        "s3", alias="S3_BACKEND",
+        description="オブジェクトストアの実装（s3 = AWS、local = S3_LOCAL_ROOT 配下をバケットに見立てる）",
+    )
+    s3_local_root: Path = Field(
+        ROOT / "tmp" / "s3_local", alias="S3_LOCAL_ROOT",
+        description="local バックエンドのルート（{root}/{bucket}/{tag_id}/yyyy/mm/dd/...）",
+    )
+    s3_local_latency_ms: float = Field(
+        0, alias="S3_LOCAL_LATENCY_MS",
+        description="local バックエンドで 1 リクエストごとに注入する遅延（ミリ秒）",
+    )
+    s3_local_bandwidth_mbps: float = Field(
+        0, alias="S3_LOCAL_BANDWIDTH_MBPS",
+        description="local バックエンドの 1 リクエストあたりの帯域上限（Mbps、0 で無制限）",
+    )
+    s3_download_concurrency: int = Field(
+        16, alias="S3_DOWNLOAD_CONCURRENCY",
+        description="load_from_s3 の同時ダウンロード数",
+    )
+    s3_manifest_ttl_sec: int = Field(
+        60, alias="S3_MANIFEST_TTL_SEC",
+        description="当日分の S3 キー一覧キャッシュの有効秒数（過去日は無期限）",
+    )
+    s3_fetch_in_memory: bool = Field(
+        True, alias="S3_FETCH_IN_MEMORY",
+        description="fetch で get_object の本体をメモリ上で直接デコードする（False で従来のダウンロード）",
+    )
+    s3_persist_downloads: bool = Field(
+        False, alias="S3_PERSIST_DOWNLOADS",
+        description="メモリ取得した本体をダウンロードキャッシュにも保存する",
+    )
+    s3_download_cache_dir: Path = Field(
+        ROOT / "tmp" / "s3_cache", alias="S3_DOWNLOAD_CACHE_DIR",
+        description="S3 オブジェクトのダウンロードキャッシュ置き場",
+    )
+    s3_download_cache_bytes: int = Field(
+        4 * 1024 * 1024 * 1024, alias="S3_DOWNLOAD_CACHE_BYTES",
+        description="ダウンロードキャッシュの合計上限（バイト）",
+    )
 
     # --- LLM / Bedrock ---
     llm_provider: str = Field("bedrock")
@@ -28,6 +76,54 @@ class Settings(BaseSettings):
     openai_org_id: str | None = Field(None, validation_alias="OPENAI_ORG_ID")
     codeact_model: str = Field("openai:gpt-4o", validation_alias="CODEACT_MODEL")
 
+    # --- 問い合わせ解釈キャッシュ ---
+    interpret_cache_size: int = Field(
+        1024, alias="INTERPRET_CACHE_SIZE",
+        description="LLM 解釈結果の雛形を保持する件数（0 で無効）",
+    )
+    interpret_cache_ttl_sec: int = Field(
+        24 * 60 * 60, alias="INTERPRET_CACHE_TTL_SEC",
+        description="LLM 解釈結果の雛形の有効秒数",
+    )
+    interpret_cache_path: Path | None = Field(
+        None, alias="INTERPRET_CACHE_PATH",
+        description="LLM 解釈結果の雛形を永続化する JSON ファイル（未指定ならメモリのみ）",
+    )
+
+    # --- メタデータ ---
+    metadata_reload_sec: float = Field(
+        5.0, alias="METADATA_RELOAD_SEC",
+        description="metadata.json の更新（mtime）を確かめる最短間隔（秒、0 で毎回、負で再読み込みしない）",
+    )
+
+    # --- RU デコード ---
+    ru_decode_workers: int = Field(
+        0, alias="RU_DECODE_WORKERS",
+        description="load_ru_many の並列デコード数（0 で CPU 数、1 で直列）",
+    )
+    ru_pipeline_depth: int = Field(
+        8, alias="RU_PIPELINE_DEPTH",
+        description="取得→デコード→消費の各段の間のキュー長（先読みの上限）",
+    )
+
+    # --- RU デコードキャッシュ ---
+    ru_frame_cache_bytes: int = Field(
+        256 * 1024 * 1024, alias="RU_FRAME_CACHE_BYTES",
+        description="デコード済み DataFrame のプロセス内キャッシュ上限（バイト、0 で無効）",
+    )
+    ru_dataset_store_bytes: int = Field(
+        1024 * 1024 * 1024, alias="RU_DATASET_STORE_BYTES",
+        description="グラフ実行中に共有するデコード済みデータセットの保持上限（バイト）",
+    )
+    ru_parquet_cache_dir: Path = Field(
+        ROOT / "tmp" / "ru_cache", alias="RU_PARQUET_CACHE_DIR",
+        description="S3 由来 RU のデコード結果（Parquet）を置くディレクトリ",
+    )
+    ru_parquet_cache_bytes: int = Field(
+        2 * 1024 * 1024 * 1024, alias="RU_PARQUET_CACHE_BYTES",
+        description="Parquet ディスクキャッシュの合計上限（バイト、0 で無効）",
+    )
+
     # --- Pydantic Settings ---
     model_config = SettingsConfigDict(
         env_file=[ROOT / ".env", ROOT / ".env.docker"],
@@ -1,23 +1,25 @@
 # backend/app/models/bedrock_client.py
-from boto3 import Session, client
-from botocore.config import Config as BotoConfig
 import json
 from app.config import get_settings
+from app.utils.aws_clients import get_client
 
 settings = get_settings()
 
+
 # --- S3 用：SSO プロファイル ------------------------------
-s3_session = Session(profile_name=settings.aws_profile)
-s3_client = s3_session.client("s3")
+def get_s3_client():
+    return get_client("s3", profile_name=settings.aws_profile)
+
 
 # --- Bedrock 用：キー認証 -------------------------------
-bedrock_client = client(
-    "bedrock-runtime",
-    region_name=settings.bedrock_region,
-    aws_access_key_id=settings.bedrock_access_key_id,
-    aws_secret_access_key=settings.bedrock_secret_access_key,
-    aws_session_token=settings.bedrock_session_token,
-)
+def get_bedrock_client():
+    return get_client(
+        "bedrock-runtime",
+        region_name=settings.bedrock_region,
+        aws_access_key_id=settings.bedrock_access_key_id,
+        aws_secret_access_key=settings.bedrock_secret_access_key,
+        aws_session_token=settings.bedrock_session_token,
+    )
 
 def invoke_claude(prompt: str, max_tokens: int = 256, temp: float = 0.5) -> str:
     # Claude 3 形式メッセージ
@@ -29,7 +31,7 @@ def invoke_claude(prompt: str, max_tokens: int = 256, temp: float = 0.5) -> str:
         "max_tokens": max_tokens,
         "temperature": temp,
     }
-    resp = bedrock_client.invoke_model(
+    resp = get_bedrock_client().invoke_model(
         modelId=settings.bedrock_model_id,
         contentType="application/json",
         accept="application/json",
@@ -1,15 +1,126 @@
 # backend/app/services/data_loader.py
+"""
+data_loader.py – app/data の JSON を読む窓口
+・MetadataRegistry: metadata.json を 1 回読んで TagID / country / organization / observation_type の
+  dict 索引にする。mtime が変われば読み直し、作り終えた索引を丸ごと差し替える
+  （読み手はロック無しで古い版か新しい版のどちらか一方を見る）
+・壊れた metadata.json に書き換わったときは警告を出して直前の版を使い続ける
+"""
+from __future__ import annotations
+from dataclasses import dataclass, field
+from functools import lru_cache
 from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
 import json
-from functools import lru_cache
+import logging
+import threading
+import time
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
 
 BASE_DIR = Path(__file__).resolve().parent.parent / "data"
+META_PATH = BASE_DIR / "metadata.json"
+
+
+@dataclass(frozen=True)
+class _Snapshot:
+    """ある時点の metadata.json と索引（作った後は変更しない）"""
+
+    mtime_ns: int
+    records: Tuple[Dict[str, Any], ...] = ()
+    by_tag: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    by_country: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)
+    by_organization: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)
+    by_observation_type: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)
+
+    @classmethod
+    def build(cls, mtime_ns: int, records: List[Dict[str, Any]]) -> "_Snapshot":
+        snap = cls(mtime_ns, tuple(records))
+        for rec in records:
+            snap.by_tag.setdefault(str(rec["TagID"]), rec)
+            for index, name in (
+                (snap.by_country, "country"),
+                (snap.by_organization, "organization"),
+                (snap.by_observation_type, "observation_type"),
+            ):
+                if rec.get(name):
+                    index.setdefault(rec[name].casefold(), []).append(rec)
+        return snap
+
+
+class MetadataRegistry:
+    """
+    metadata.json の索引付きレジストリ（スレッドセーフ）
+    reload_sec: mtime を確かめる最短間隔（0 で毎回、負で初回読み込みのみ）
+    返す dict は共有しているので変更しないこと
+    """
+
+    def __init__(self, path: str | Path = META_PATH, reload_sec: float = 5.0):
+        self.path = Path(path)
+        self.reload_sec = reload_sec
+        self.reloads = 0
+        self._lock = threading.Lock()
+        self._checked_at = time.monotonic()
+        self._snapshot = self._load(self.path.stat().st_mtime_ns)
+
+    # ---- 索引 ---------------------------------------------------------
+    def records(self) -> List[Dict[str, Any]]:
+        return list(self._current().records)
+
+    def by_tag(self, tag_id: str) -> Dict[str, Any] | None:
+        return self._current().by_tag.get(str(tag_id))
+
+    def by_country(self, country: str) -> List[Dict[str, Any]]:
+        return list(self._current().by_country.get(country.casefold(), ()))
+
+    def by_organization(self, organization: str) -> List[Dict[str, Any]]:
+        return list(self._current().by_organization.get(organization.casefold(), ()))
+
+    def by_observation_type(self, observation_type: str) -> List[Dict[str, Any]]:
+        return list(self._current().by_observation_type.get(observation_type.casefold(), ()))
+
+    def tag_ids_by_country(self, country: str) -> List[str]:
+        return [rec["TagID"] for rec in self._current().by_country.get(country.casefold(), ())]
+
+    def __len__(self) -> int:
+        return len(self._current().records)
+
+    # ---- 再読み込み ---------------------------------------------------
+    def _current(self) -> _Snapshot:
+        snap = self._snapshot
+        if self.reload_sec < 0 or time.monotonic() - self._checked_at < self.reload_sec:
+            return snap
+        with self._lock:
+            self._checked_at = time.monotonic()
+            try:
+                mtime_ns = self.path.stat().st_mtime_ns
+            except OSError as e:
+                logger.warning(f"Cannot stat {self.path}: {e}")
+                return self._snapshot
+            if mtime_ns != self._snapshot.mtime_ns:
+                try:
+                    self._snapshot = self._load(mtime_ns)    # 参照の差し替え 1 回で切り替わる
+                    self.reloads += 1
+                except Exception as e:
+                    logger.warning(f"Broken metadata {self.path}, keeping previous version: {e}")
+            return self._snapshot
+
+    def _load(self, mtime_ns: int) -> _Snapshot:
+        records = json.loads(self.path.read_text(encoding="utf-8"))
+        return _Snapshot.build(mtime_ns, records)
+
+
+@lru_cache(maxsize=1)
+def get_metadata_registry() -> MetadataRegistry:
+    """プロセス共通のレジストリ"""
+    return MetadataRegistry(META_PATH, get_settings().metadata_reload_sec)
 
 
-@lru_cache
 def load_metadata() -> list[dict]:
-    with open(BASE_DIR / "metadata.json", encoding="utf-8") as f:
-        return json.load(f)
+    return get_metadata_registry().records()
 
 
 @lru_cache
@@ -20,4 +131,4 @@ def load_variable_map() -> dict:
 
 def find_by_tag(tag_id: str) -> dict | None:
     """TagID でメタデータを 1 件取得（無ければ None）"""
-    return next((row for row in load_metadata() if row["tag_id"] == tag_id), None)
+    return get_metadata_registry().by_tag(tag_id)
@@ -0,0 +1,77 @@
+# backend/app/utils/aws_clients.py
+"""
+aws_clients.py – boto3 クライアントの共有レジストリ
+・(サービス, リージョン, プロファイル, 認証キー) ごとに 1 つだけ遅延生成して使い回す
+・botocore Config で接続プール数・TCP keep-alive・adaptive リトライを設定
+・boto3 クライアントはスレッドセーフ（生成だけはロックで直列化する）
+"""
+
+from __future__ import annotations
+from typing import Dict, Tuple
+
+import threading
+
+import boto3
+from botocore.client import BaseClient
+from botocore.config import Config as BotoConfig
+
+from app.config import get_settings
+
+__all__ = ["get_client", "clear_clients"]
+
+_CLIENTS: Dict[Tuple, BaseClient] = {}
+_SESSIONS: Dict[str | None, boto3.session.Session] = {}
+_LOCK = threading.Lock()
+
+
+def _client_config() -> BotoConfig:
+    settings = get_settings()
+    return BotoConfig(
+        max_pool_connections=settings.aws_max_pool_connections,
+        tcp_keepalive=True,
+        retries={"mode": "adaptive", "max_attempts": settings.aws_max_attempts},
+    )
+
+
+def get_client(
+    service: str,
+    region_name: str | None = None,
+    profile_name: str | None = None,
+    aws_access_key_id: str | None = None,
+    aws_secret_access_key: str | None = None,
+    aws_session_token: str | None = None,
+) -> BaseClient:
+    """
+    共有クライアントを返す（初回だけ生成）
+    profile_name / 認証キーを省略すると既定の認証情報チェーンを使う
+    """
+    key = (service, region_name, profile_name, aws_access_key_id, aws_session_token)
+    client = _CLIENTS.get(key)
+    if client is not None:
+        return client
+
+    with _LOCK:
+        client = _CLIENTS.get(key)
+        if client is None:
+            # Session の生成・client() 呼び出しはスレッドセーフでないのでロック内で行う
+            session = _SESSIONS.get(profile_name)
+            if session is None:
+                session = boto3.session.Session(profile_name=profile_name)
+                _SESSIONS[profile_name] = session
+            client = session.client(
+                service,
+                region_name=region_name,
+                aws_access_key_id=aws_access_key_id,
+                aws_secret_access_key=aws_secret_access_key,
+                aws_session_token=aws_session_token,
+                config=_client_config(),
+            )
+            _CLIENTS[key] = client
+    return client
+
+
+def clear_clients() -> None:
+    """登録済みクライアントを破棄（認証情報の切り替え・テスト用）"""
+    with _LOCK:
+        _CLIENTS.clear()
+        _SESSIONS.clear()
@@ -1,14 +1,84 @@
 # app/utils/country_resolver.py
+"""
+country_resolver.py – 国名の表記ゆらぎ → ISO 英語名 → TagID
+・app/data/country_aliases.json（英語名・ISO コード・漢字略称・カナ表記）の別名索引で
+  ネットワーク無しに解決する（正規化一致 → 「国」などの接尾辞を外して一致 → 近い綴り）
+・索引に無いときだけ Claude に尋ね、答えはプロセス内で覚える
+・country → TagID は MetadataRegistry（metadata.json の索引）で引く
+"""
 from __future__ import annotations
 
+import difflib
 import json
+import logging
+import re
+import unicodedata
+from functools import lru_cache
 from pathlib import Path
-from typing import List
+from typing import Dict, List
 
 from app.models.bedrock_client import invoke_claude
+from app.services.data_loader import get_metadata_registry
+
+logger = logging.getLogger(__name__)
 
 BASE_DIR = Path(__file__).resolve().parents[2]
-META_PATH = BASE_DIR / "app" / "data" / "metadata.json"
+ALIASES_PATH = BASE_DIR / "app" / "data" / "country_aliases.json"
+
+# 近い綴りとみなす類似度（difflib）。短い別名（略称・コード）は完全一致のみ
+FUZZY_CUTOFF = 0.85
+FUZZY_MIN_LEN = 4
+# 完全一致しなかったときに外してみる接尾辞（長い順）
+_SUFFIXES = ("共和国", "連邦", "王国", "国")
+_IGNORED = re.compile(r"[\s・.\-'’ー]")
+
+
+def _normalize(name: str) -> str:
+    """NFKC・大小無視・ひらがな → カタカナ・空白 / 中黒 / 長音などを除去"""
+    text = unicodedata.normalize("NFKC", name).casefold()
+    text = "".join(chr(ord(c) + 0x60) if "ぁ" <= c <= "ゖ" else c for c in text)
+    return _IGNORED.sub("", text)
+
+
+@lru_cache(maxsize=1)
+def _alias_index() -> Dict[str, str]:
+    """正規化した別名 → ISO 英語名（起動後最初の問い合わせで 1 回だけ作る）"""
+    aliases = json.loads(ALIASES_PATH.read_text(encoding="utf-8"))
+    index: Dict[str, str] = {}
+    for name, others in aliases.items():
+        for alias in (name, *others):
+            index.setdefault(_normalize(alias), name)
+    return index
+
+
+def lookup_country(raw: str) -> str | None:
+    """別名索引だけで引く（見つからなければ None）"""
+    index = _alias_index()
+    key = _normalize(raw)
+    if not key:
+        return None
+    if key in index:
+        return index[key]
+    for suffix in _SUFFIXES:
+        if key.endswith(suffix) and key[:-len(suffix)] in index:
+            return index[key[:-len(suffix)]]
+    if len(key) >= FUZZY_MIN_LEN:
+        close = difflib.get_close_matches(key, index.keys(), n=1, cutoff=FUZZY_CUTOFF)
+        if close:
+            return index[close[0]]
+    return None
+
+
+@lru_cache(maxsize=256)
+def _ask_llm(key: str, raw: str) -> str:
+    prompt = (
+        "次の国名を、ISO 英語正式名称（例: Netherlands, Germany）の 1 単語で返して下さい。\n"
+        f"国名: {raw}"
+    )
+    answer = invoke_claude(prompt).strip()
+    # 索引にある表記へ寄せる（"The Netherlands" → "Netherlands" など）
+    return lookup_country(answer) or answer
+
 
 # ------------------------------------------------
 # 1) 表記ゆらぎ → ISO 英語正式名
@@ -18,21 +88,20 @@ def resolve_country_name(raw: str) -> str:
     例:
       「ねざーらんど」,「オランダ」 → Netherlands
       「独」,「Germany」 → Germany
-    Claude 3 Sonnet に 1 クエリ投げるだけなので低コスト。
+    索引に無いときだけ Claude に 1 クエリ投げる（同じ入力は覚えておく）
     """
-    prompt = (
-        "次の国名を、ISO 英語正式名称（例: Netherlands, Germany）の 1 単語で返して下さい。\n"
-        f"国名: {raw}"
-    )
-    return invoke_claude(prompt).strip()
+    name = lookup_country(raw)
+    if name is not None:
+        return name
+    logger.debug(f"Country alias miss, asking LLM: {raw}")
+    return _ask_llm(_normalize(raw), raw)
 
 # ------------------------------------------------
 # 2) country → TagID 一覧
 # ------------------------------------------------
 def find_tag_ids_by_country(country: str) -> List[str]:
     """
-    metadata.json から一致 (大小無視) する TagID を返す。
+    metadata.json から一致 (大小無視・別名可) する TagID を返す。
     """
-    meta = json.loads(META_PATH.read_text(encoding="utf-8"))
-    norm = country.casefold()
-    return [rec["TagID"] for rec in meta if rec["country"].casefold() == norm]
+    name = lookup_country(country) or country
+    return get_metadata_registry().tag_ids_by_country(name)
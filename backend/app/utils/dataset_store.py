@@ -0,0 +1,78 @@
+# backend/app/utils/dataset_store.py
+"""
+dataset_store.py – グラフ実行中に共有するデコード済み DataFrame の置き場
+・decode ノードが 1 回だけデコードして put() し、state にはハンドル（文字列 ID）だけを載せる
+  （DataFrame 自体は langserve の応答やチェックポイントに載せない）
+・convert / viz / fallback はハンドルから同じ DataFrame を受け取る（コピーしないので変更しないこと）
+・合計バイト数の上限を超えたら古い順に手放す。消えたハンドルは get() が None
+  → 呼び出し側は load_ru_many（フレームキャッシュ経由）で読み直す
+"""
+
+from __future__ import annotations
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Tuple
+
+import threading
+import uuid
+
+import pandas as pd
+
+from app.config import get_settings
+
+__all__ = ["DatasetStore", "get_dataset_store"]
+
+
+class DatasetStore:
+    """ハンドル → DataFrame（バイト数上限付き、スレッドセーフ）"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[pd.DataFrame, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.evictions = 0
+
+    def put(self, df: pd.DataFrame) -> str:
+        handle = uuid.uuid4().hex
+        size = int(df.memory_usage(deep=True, index=True).sum())
+        with self._lock:
+            self._entries[handle] = (df, size)
+            self.bytes += size
+            # 今入れたものは上限を超えていても残す（このグラフ実行で必要）
+            while self.bytes > self.max_bytes and len(self._entries) > 1:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+        return handle
+
+    def get(self, handle: str | None) -> pd.DataFrame | None:
+        if handle is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(handle)
+        return entry[0] if entry is not None else None
+
+    def release(self, handle: str) -> None:
+        with self._lock:
+            entry = self._entries.pop(handle, None)
+            if entry is not None:
+                self.bytes -= entry[1]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+            }
+
+
+@lru_cache(maxsize=1)
+def get_dataset_store() -> DatasetStore:
+    """プロセス共通の置き場（グラフの全ノードで共有）"""
+    return DatasetStore(get_settings().ru_dataset_store_bytes)
@@ -0,0 +1,119 @@
+# backend/app/utils/disk_lru.py
+"""
+disk_lru.py – 合計サイズ上限付きのディレクトリキャッシュ（ParquetCache / DownloadCache の共通部分）
+・最終利用時刻はファイルの atime に明示的に記録（mtime は中身の同一性判定に使うので変えない）
+・上限を超えたらディレクトリを数え直し、atime の古い順に削除（複数ワーカーで共有可）
+・書き込みは一時ファイル + os.replace で原子的に行う
+"""
+
+from __future__ import annotations
+from pathlib import Path
+from typing import Dict, Hashable
+
+import os
+import tempfile
+import threading
+import time
+
+PARTIAL_DIR = ".partial"
+
+
+class DiskLRU:
+    """suffix で終わるファイルを管理対象とするディスク LRU"""
+
+    suffix = ""
+
+    def __init__(self, directory: str | Path, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # 再起動時は既存ファイルの合計から再開
+        self.bytes = sum(size for _, _, size in self._scan())
+
+    def touch(self, path: str | Path) -> None:
+        """最終利用時刻（atime）だけを更新"""
+        st = os.stat(path)
+        os.utime(path, ns=(time.time_ns(), st.st_mtime_ns))
+
+    def temp_path(self) -> Path:
+        """
+        キャッシュと同じファイルシステム上の一時ファイル（os.replace で原子的に差し替える用）
+        書き込み途中のファイルは管理対象外の .partial/ に置く
+        """
+        partial = self.directory / PARTIAL_DIR
+        partial.mkdir(exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=partial, suffix=".tmp")
+        os.close(fd)
+        return Path(tmp)
+
+    def commit(self, tmp: Path, path: Path) -> None:
+        """一時ファイルを所定の名前へ移し、サイズを計上（上限超過なら追い出し）"""
+        size = tmp.stat().st_size
+        with self._lock:
+            # 同じ名前を上書きするときは置き換わる分を差し引く
+            try:
+                size -= path.stat().st_size
+            except FileNotFoundError:
+                pass
+            os.replace(tmp, path)
+            self.bytes += size
+            if self.bytes > self.max_bytes:
+                self._evict(keep=str(path))
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _scan(self):
+        """(atime_ns, path, size) の一覧（キャッシュディレクトリの実態）"""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(self.suffix) or entry.name == PARTIAL_DIR:
+                continue
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_atime_ns, entry.path, st.st_size))
+        return entries
+
+    def _evict(self, keep: str | None = None) -> None:
+        """古い順に削除（keep = 今書き込んだファイルは上限を超えていても残す）"""
+        # 他ワーカーの書き込み・削除も反映するためディレクトリを数え直す
+        entries = sorted(self._scan())
+        self.bytes = sum(size for _, _, size in entries)
+        for _, path, size in entries:
+            if self.bytes <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self.bytes -= size
+            self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            for _, path, _ in self._scan():
+                Path(path).unlink(missing_ok=True)
+            self.bytes = 0
+
+    def stats(self) -> Dict[str, Hashable]:
+        with self._lock:
+            return {
+                "directory": str(self.directory),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
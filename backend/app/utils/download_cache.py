@@ -0,0 +1,85 @@
+# backend/app/utils/download_cache.py
+"""
+download_cache.py – S3 オブジェクトのローカルダウンロードキャッシュ
+・ファイル名は (bucket, key, ETag) のハッシュ + 元のファイル名 → 内容が同じなら同じパス
+・ヒット時はネットワークに一切出ない。ミス時は一時ファイルへ落としてから os.replace
+・同じオブジェクトの同時ミスは 1 回のダウンロードにまとめる（SingleFlight）
+・合計サイズ上限を超えたら最終利用の古い順に削除（DiskLRU）
+"""
+
+from __future__ import annotations
+from functools import lru_cache
+from pathlib import Path
+
+import hashlib
+import logging
+
+from app.config import get_settings
+from app.utils.disk_lru import DiskLRU
+from app.utils.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["DownloadCache", "get_download_cache"]
+
+# キャッシュ上のパス → 実行中のダウンロード
+_IN_FLIGHT = SingleFlight()
+
+
+class DownloadCache(DiskLRU):
+    """(bucket, key, ETag) で内容を特定する S3 オブジェクトのキャッシュ"""
+
+    def path_for(self, bucket: str, key: str, etag: str) -> Path:
+        digest = hashlib.sha256(f"{bucket}\0{key}\0{etag.strip(chr(34))}".encode("utf-8")).hexdigest()
+        return self.directory / f"{digest[:32]}-{key.split('/')[-1]}"
+
+    def get(self, bucket: str, key: str, etag: str) -> Path | None:
+        """キャッシュにあればそのパス（最終利用時刻を更新）、無ければ None"""
+        path = self.path_for(bucket, key, etag)
+        try:
+            self.touch(path)                  # 最終利用時刻を更新（LRU）
+        except FileNotFoundError:
+            self._count(hit=False)
+            return None
+        self._count(hit=True)
+        return path
+
+    def fetch(self, s3, bucket: str, key: str, etag: str) -> Path:
+        """キャッシュにあればそのパス、無ければダウンロードしてから返す"""
+        path = self.get(bucket, key, etag)
+        if path is not None:
+            return path
+
+        path = self.path_for(bucket, key, etag)
+        # 同じオブジェクトを同時に取りに来たら 1 回のダウンロードを待ち合わせる
+        _IN_FLIGHT.do(str(path), self._download, s3, bucket, key, path)
+        return path
+
+    def _download(self, s3, bucket: str, key: str, path: Path) -> None:
+        tmp = self.temp_path()
+        try:
+            s3.download_file(bucket, key, str(tmp))
+            self.commit(tmp, path)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+        logger.debug(f"Downloaded s3://{bucket}/{key} -> {path}")
+
+    def store(self, bucket: str, key: str, etag: str, data: bytes) -> Path:
+        """取得済みの本体をキャッシュに保存してパスを返す"""
+        path = self.path_for(bucket, key, etag)
+        tmp = self.temp_path()
+        try:
+            tmp.write_bytes(data)
+            self.commit(tmp, path)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+        return path
+
+
+@lru_cache(maxsize=1)
+def get_download_cache() -> DownloadCache:
+    """プロセス共通のダウンロードキャッシュ"""
+    settings = get_settings()
+    return DownloadCache(settings.s3_download_cache_dir, settings.s3_download_cache_bytes)
@@ -0,0 +1,108 @@
+# backend/app/utils/frame_cache.py
+"""
+frame_cache.py – デコード済み RU DataFrame のプロセス内 LRU キャッシュ
+・キーは (絶対パス, mtime_ns, size, 射影列) → ファイルが更新されれば自動的に別キー
+  S3 から直接デコードしたものは ("s3", bucket, key, ETag, 射影列)
+・DataFrame.memory_usage(deep=True) でバイト数を計上し、上限を超えたら古い順に追い出す
+・hit / miss / eviction のカウンタを stats() で参照できる
+"""
+
+from __future__ import annotations
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Hashable, Iterable, Tuple
+
+import logging
+import os
+import threading
+
+import pandas as pd
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["FrameCache", "frame_key", "object_key", "get_frame_cache"]
+
+
+def frame_key(path: str | Path, columns: Iterable[str] | None = None) -> Tuple[Hashable, ...]:
+    """ファイルの同一性（パス + mtime + サイズ）と射影列からキャッシュキーを作る"""
+    real = os.path.realpath(path)
+    st = os.stat(real)
+    cols = tuple(sorted(set(columns))) if columns is not None else None
+    return (real, st.st_mtime_ns, st.st_size, cols)
+
+
+def object_key(bucket: str, key: str, etag: str, columns: Iterable[str] | None = None) -> Tuple[Hashable, ...]:
+    """S3 オブジェクト（ETag で内容を特定）と射影列からキャッシュキーを作る"""
+    cols = tuple(sorted(set(columns))) if columns is not None else None
+    return ("s3", bucket, key, etag, cols)
+
+
+class FrameCache:
+    """
+    バイト数上限付きの DataFrame LRU キャッシュ（スレッドセーフ）
+    get() / put() はコピーを受け渡すので、呼び出し側で列を追加しても汚れない
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, Tuple[pd.DataFrame, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> pd.DataFrame | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return entry[0].copy()
+
+    def put(self, key: Hashable, df: pd.DataFrame) -> None:
+        size = int(df.memory_usage(deep=True, index=True).sum())
+        if size > self.max_bytes:
+            # 上限を超える単体フレームは保持しない（0 でキャッシュ無効）
+            return
+        df = df.copy()
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._entries[key] = (df, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+@lru_cache(maxsize=1)
+def get_frame_cache() -> FrameCache:
+    """プロセス共通のキャッシュ（load_ru の全呼び出し元で共有）"""
+    return FrameCache(get_settings().ru_frame_cache_bytes)
@@ -0,0 +1,260 @@
+# backend/app/utils/interpret_cache.py
+"""
+interpret_cache.py – interpret_node の LLM 解釈結果を定型文単位で再利用するキャッシュ
+・入力を正規化（NFKC・空白・大小文字）し、日時リテラルと TagID をスロット <dt0> / <tag0> に置き換えてキーにする
+・LLM の結果（ParsedParams 相当の dict）はスロット由来の値をスロット参照に置き換えた雛形として保存し、
+  ヒット時は今回の入力のスロット値で埋め直す（日時は LLM が返した書式・スロットからのずれを保つ）
+・入力に無い日時（「昨日」などを LLM が現在時刻から解決したもの）を含む結果は保存しない
+・TTL + 件数上限の LRU。Settings.interpret_cache_path を指定すると JSON で永続化（再起動後も使える）
+・hit / miss / uncacheable / eviction のカウンタを stats() で参照できる
+"""
+
+from __future__ import annotations
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+import copy
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+import unicodedata
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["InterpretCache", "normalize_query", "get_interpret_cache"]
+
+# 入力中の日時リテラル（書式ごとに年〜秒のグループを持つ）
+_DT_PATTERNS = [
+    re.compile(r"(?<!\d)(\d{4})[-/](\d{1,2})[-/](\d{1,2})(?:[ t](\d{1,2}):(\d{2})(?::(\d{2}))?)?(?!\d)"),
+    re.compile(r"(?<!\d)(\d{4})年(\d{1,2})月(\d{1,2})日(?:\s*(\d{1,2})時(?:(\d{1,2})分)?(?:(\d{1,2})秒)?)?"),
+    re.compile(r"(?<!\d)(\d{4})(\d{2})(\d{2})(\d{2})(\d{2})(\d{2})(?!\d)"),    # yyyymmddHHMMSS
+]
+_TAG_PATTERN = re.compile(r"(?<!\d)\d{9}(?!\d)")
+
+# LLM が返す日時文字列の書式（一致した書式で埋め直す）
+_OUTPUT_FORMATS = [
+    "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M", "%Y-%m-%d %H:%M",
+    "%Y-%m-%dT%H:%M:%SZ", "%Y-%m-%d", "%Y/%m/%d %H:%M:%S", "%Y/%m/%d %H:%M", "%Y/%m/%d",
+    "%Y%m%d%H%M%S",
+]
+
+SLOT = "$slot"
+# スロット（TagID / 日時）から埋め直す項目。文字列以外（数値の TagID・TagID のリストなど）は雛形にしない
+_SLOT_FIELDS = ("tag_id", "start_dt", "end_dt")
+
+
+def normalize_query(text: str) -> Tuple[str, List[datetime], List[str]]:
+    """(スロット化したキー, 日時スロット, TagID スロット) を返す"""
+    key = unicodedata.normalize("NFKC", text)
+    key = " ".join(key.split()).lower()
+    datetimes: List[datetime] = []
+
+    def dt_slot(m: re.Match) -> str:
+        parts = [int(g) if g else 0 for g in m.groups()]
+        try:
+            dt = datetime(*parts)
+        except ValueError:
+            return m.group(0)                  # 日付として不正ならそのまま（キーの一部）
+        datetimes.append(dt)
+        return f"<dt{len(datetimes) - 1}>"
+
+    for pattern in _DT_PATTERNS:
+        key = pattern.sub(dt_slot, key)
+    # 日時をスロット化した後に数える（yyyymmddHHMMSS の一部を TagID と誤認しない）
+    tags = _TAG_PATTERN.findall(key)
+    for i, tag in enumerate(tags):
+        key = _TAG_PATTERN.sub(f"<tag{i}>", key, count=1)
+    return key, datetimes, tags
+
+
+def _parse_output_dt(value: str) -> Tuple[datetime, str] | None:
+    """LLM が返した日時文字列を (日時, 書式) に。書式を往復できなければ None"""
+    for fmt in _OUTPUT_FORMATS:
+        try:
+            dt = datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+        if dt.strftime(fmt) == value:
+            return dt, fmt
+    return None
+
+
+class _Uncacheable(Exception):
+    """スロットから埋め直せない値を含む"""
+
+
+def _to_template(parsed: Dict[str, Any], datetimes: List[datetime], tags: List[str]) -> Dict[str, Any]:
+    template = {}
+    for name, value in parsed.items():
+        if not isinstance(value, str):
+            if name in _SLOT_FIELDS and value is not None:
+                raise _Uncacheable(name)
+            template[name] = copy.deepcopy(value)
+            continue
+        if value in tags:
+            if tags.count(value) > 1:
+                raise _Uncacheable(name)       # 同じ値の複数スロットはどれか決められない
+            template[name] = {SLOT: "tag", "i": tags.index(value)}
+            continue
+        if _TAG_PATTERN.fullmatch(value):
+            raise _Uncacheable(name)           # 入力に無い TagID（国名などから LLM が選んだ）
+        hit = _parse_output_dt(value)
+        if hit is None:
+            template[name] = value
+            continue
+        dt, fmt = hit
+        exact = [i for i, d in enumerate(datetimes) if d == dt]
+        if len(exact) == 1:
+            template[name] = {SLOT: "dt", "i": exact[0], "delta": 0, "fmt": fmt}
+        elif not exact and len(datetimes) == 1:
+            # 「〜から 3 時間」のように入力の日時から導いた値はずれを保存
+            delta = (dt - datetimes[0]).total_seconds()
+            template[name] = {SLOT: "dt", "i": 0, "delta": delta, "fmt": fmt}
+        else:
+            raise _Uncacheable(name)
+    return template
+
+
+def _fill(template: Dict[str, Any], datetimes: List[datetime], tags: List[str]) -> Dict[str, Any]:
+    parsed = {}
+    for name, value in template.items():
+        if isinstance(value, dict) and SLOT in value:
+            if value[SLOT] == "tag":
+                parsed[name] = tags[value["i"]]
+            else:
+                dt = datetimes[value["i"]] + timedelta(seconds=value["delta"])
+                parsed[name] = dt.strftime(value["fmt"])
+        else:
+            parsed[name] = copy.deepcopy(value)
+    return parsed
+
+
+class InterpretCache:
+    """正規化キー → 解釈結果の雛形（TTL + LRU、スレッドセーフ）"""
+
+    def __init__(self, max_entries: int, ttl_sec: float, path: str | Path | None = None):
+        self.max_entries = max_entries
+        self.ttl_sec = ttl_sec
+        self.path = Path(path) if path else None
+        # key → (保存時刻 time.time(), 雛形)。永続化するので壁時計
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.uncacheable = 0
+        self.evictions = 0
+        if self.path is not None:
+            self._load()
+
+    def get(self, text: str) -> Dict[str, Any] | None:
+        key, datetimes, tags = normalize_query(text)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[0] > self.ttl_sec:
+                del self._entries[key]
+                self.evictions += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return _fill(entry[1], datetimes, tags)
+
+    def put(self, text: str, parsed: Dict[str, Any]) -> bool:
+        """雛形にできれば保存して True（空の結果 = 解釈失敗は保存しない）"""
+        if self.max_entries <= 0 or not parsed:
+            return False
+        key, datetimes, tags = normalize_query(text)
+        try:
+            template = _to_template(parsed, datetimes, tags)
+        except _Uncacheable as e:
+            logger.debug(f"Interpretation not cacheable ({e}): {text}")
+            with self._lock:
+                self.uncacheable += 1
+            return False
+        with self._lock:
+            self._entries[key] = (time.time(), template)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            if self.path is not None:
+                self._save()                    # 保存はミス時だけなのでロック内で書き切る
+        return True
+
+    def get_or_interpret(self, text: str, interpret: Callable[[str], Dict[str, Any]]) -> Dict[str, Any]:
+        """キャッシュにあれば埋め直した結果、無ければ interpret(text) を呼んで保存"""
+        parsed = self.get(text)
+        if parsed is None:
+            parsed = interpret(text)
+            self.put(text, parsed)
+        return parsed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        if self.path is not None:
+            self.path.unlink(missing_ok=True)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "uncacheable": self.uncacheable,
+                "evictions": self.evictions,
+            }
+
+    # ---- 永続化 -------------------------------------------------------
+    def _load(self) -> None:
+        try:
+            rows = json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.warning(f"Broken interpret cache {self.path}: {e}")
+            return
+        now = time.time()
+        for key, saved_at, template in rows[-self.max_entries:] if self.max_entries > 0 else []:
+            if now - saved_at <= self.ttl_sec:
+                self._entries[key] = (saved_at, template)
+
+    def _save(self) -> None:
+        """一時ファイル + os.replace で書き換える（LRU 順に保存）"""
+        rows = [[key, saved_at, template] for key, (saved_at, template) in self._entries.items()]
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(rows, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except Exception as e:
+            logger.warning(f"Cannot write interpret cache {self.path}: {e}")
+            Path(tmp).unlink(missing_ok=True)
+
+
+@lru_cache(maxsize=1)
+def get_interpret_cache() -> InterpretCache:
+    """プロセス共通のキャッシュ（件数 0 で無効）"""
+    settings = get_settings()
+    return InterpretCache(
+        settings.interpret_cache_size,
+        settings.interpret_cache_ttl_sec,
+        settings.interpret_cache_path,
+    )
@@ -0,0 +1,211 @@
+# backend/app/utils/object_store.py
+"""
+object_store.py – fetch 経路が使うオブジェクトストアの差し替え口
+・ObjectStore: s3_loader / s3_fetcher / ru_utils が呼ぶ S3 クライアントの部分集合
+  （boto3 の S3 クライアントはそのまま満たす）
+・LocalObjectStore: ローカルディレクトリ {root}/{bucket}/{key} を S3 に見立てる実装
+  {tag_id}/yyyy/mm/dd/{timestamp}.{uuid} の配置をそのまま置けば実コードが動く
+  リクエスト毎の遅延・帯域を注入でき、ネットワーク無しで負荷試験・プロファイルができる
+・get_object_store(): Settings.s3_backend（"s3" | "local"）で切り替える
+"""
+
+from __future__ import annotations
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, Protocol
+
+import os
+import shutil
+import time
+
+from botocore.exceptions import ClientError
+
+from app.config import get_settings
+from app.utils.aws_clients import get_client
+
+__all__ = ["ObjectStore", "LocalObjectStore", "NoSuchKey", "get_object_store"]
+
+# ダウンロード・読み込みで帯域を計算する単位
+CHUNK_SIZE = 1 << 20
+
+
+class ObjectStore(Protocol):
+    """fetch 経路が使う S3 API（引数・戻り値は boto3 と同じ形）"""
+
+    exceptions: Any
+
+    def list_objects_v2(self, **kwargs) -> Dict[str, Any]: ...
+
+    def get_object(self, **kwargs) -> Dict[str, Any]: ...
+
+    def head_object(self, **kwargs) -> Dict[str, Any]: ...
+
+    def download_file(self, Bucket: str, Key: str, Filename: str, **kwargs) -> None: ...
+
+
+class NoSuchKey(ClientError):
+    """get_object で対象が無い（boto3 の s3.exceptions.NoSuchKey 相当）"""
+
+    def __init__(self, key: str, operation: str = "GetObject"):
+        super().__init__({"Error": {"Code": "NoSuchKey", "Message": key}}, operation)
+
+
+class LocalObjectStore:
+    """
+    ローカルディレクトリを S3 に見立てたオブジェクトストア（スレッドセーフ）
+    latency_sec: 1 リクエストあたりの遅延（一覧のページ、head、get、download ごと）
+    bandwidth_bps: 1 リクエストあたりの転送速度の上限（バイト/秒、None で無制限）
+    ETag は内容の MD5 ではなく (サイズ, mtime) から作る（ファイルが変われば変わる）
+    """
+
+    exceptions = SimpleNamespace(NoSuchKey=NoSuchKey, ClientError=ClientError)
+
+    def __init__(
+        self,
+        root: str | Path,
+        latency_sec: float = 0.0,
+        bandwidth_bps: float | None = None,
+        page_size: int = 1000,
+    ):
+        self.root = Path(root)
+        self.latency_sec = latency_sec
+        self.bandwidth_bps = bandwidth_bps
+        self.page_size = page_size
+
+    # ---- S3 API ---------------------------------------------------
+    def list_objects_v2(
+        self, Bucket: str, Prefix: str = "", ContinuationToken: str | None = None,
+        MaxKeys: int | None = None, **_,
+    ) -> Dict[str, Any]:
+        """キー順に Prefix 配下を返す（ContinuationToken は直前ページの最後のキー）"""
+        self._wait()
+        limit = min(MaxKeys or self.page_size, self.page_size)
+        keys = [
+            k for k in self._keys(Bucket, Prefix)
+            if ContinuationToken is None or k > ContinuationToken
+        ]
+        page = keys[:limit]
+        response = {
+            "Contents": [self._meta(Bucket, k) for k in page],
+            "KeyCount": len(page),
+            "IsTruncated": len(keys) > limit,
+        }
+        if response["IsTruncated"]:
+            response["NextContinuationToken"] = page[-1]
+        if not page:
+            del response["Contents"]          # S3 は 0 件だと Contents を返さない
+        return response
+
+    def head_object(self, Bucket: str, Key: str, **_) -> Dict[str, Any]:
+        self._wait()
+        if not self._path(Bucket, Key).is_file():
+            raise ClientError({"Error": {"Code": "404", "Message": "Not Found"}}, "HeadObject")
+        meta = self._meta(Bucket, Key)
+        return {"ETag": meta["ETag"], "ContentLength": meta["Size"], "LastModified": meta["LastModified"]}
+
+    def get_object(self, Bucket: str, Key: str, **_) -> Dict[str, Any]:
+        self._wait()
+        path = self._path(Bucket, Key)
+        if not path.is_file():
+            raise NoSuchKey(Key)
+        meta = self._meta(Bucket, Key)
+        return {
+            "Body": _ThrottledBody(path, self.bandwidth_bps),
+            "ETag": meta["ETag"],
+            "ContentLength": meta["Size"],
+            "LastModified": meta["LastModified"],
+        }
+
+    def download_file(self, Bucket: str, Key: str, Filename: str, **_) -> None:
+        self._wait()
+        path = self._path(Bucket, Key)
+        if not path.is_file():
+            raise ClientError({"Error": {"Code": "404", "Message": "Not Found"}}, "HeadObject")
+        if self.bandwidth_bps is None:
+            shutil.copyfile(path, Filename)
+            return
+        body = _ThrottledBody(path, self.bandwidth_bps)
+        with open(Filename, "wb") as f:
+            while chunk := body.read(CHUNK_SIZE):
+                f.write(chunk)
+        body.close()
+
+    # ---- 内部 -------------------------------------------------------
+    def _path(self, bucket: str, key: str) -> Path:
+        path = (self.root / bucket / key).resolve()
+        if not path.is_relative_to((self.root / bucket).resolve()):
+            raise ValueError(f"key escapes bucket: {key}")
+        return path
+
+    def _keys(self, bucket: str, prefix: str) -> list:
+        """Prefix に掛かるディレクトリだけを走査してキーを集める"""
+        base = self.root / bucket
+        start = base / prefix.rpartition("/")[0]
+        keys = []
+        for dirpath, _, filenames in os.walk(start):
+            rel = Path(dirpath).relative_to(base).as_posix()
+            for name in filenames:
+                key = name if rel == "." else f"{rel}/{name}"
+                if key.startswith(prefix):
+                    keys.append(key)
+        return sorted(keys)
+
+    def _meta(self, bucket: str, key: str) -> Dict[str, Any]:
+        st = self._path(bucket, key).stat()
+        return {
+            "Key": key,
+            "Size": st.st_size,
+            "ETag": f'"{st.st_size:x}-{st.st_mtime_ns:x}"',
+            "LastModified": datetime.fromtimestamp(st.st_mtime, tz=timezone.utc),
+        }
+
+    def _wait(self) -> None:
+        if self.latency_sec > 0:
+            time.sleep(self.latency_sec)
+
+
+class _ThrottledBody:
+    """get_object の Body（StreamingBody 相当の read / close）。帯域上限に合わせて待つ"""
+
+    def __init__(self, path: Path, bandwidth_bps: float | None):
+        self._file = open(path, "rb")
+        self._bandwidth = bandwidth_bps
+
+    def read(self, amt: int | None = None) -> bytes:
+        if self._file.closed:
+            return b""
+        data = self._file.read() if amt is None else self._file.read(amt)
+        if self._bandwidth and data:
+            time.sleep(len(data) / self._bandwidth)
+        if amt is None or not data:
+            self.close()
+        return data
+
+    def close(self) -> None:
+        self._file.close()
+
+
+@lru_cache(maxsize=1)
+def _local_store() -> LocalObjectStore:
+    settings = get_settings()
+    mbps = settings.s3_local_bandwidth_mbps
+    return LocalObjectStore(
+        settings.s3_local_root,
+        latency_sec=settings.s3_local_latency_ms / 1000,
+        bandwidth_bps=mbps * 1_000_000 / 8 if mbps > 0 else None,
+    )
+
+
+def get_object_store(**client_kwargs) -> ObjectStore:
+    """
+    Settings.s3_backend に応じたオブジェクトストア
+    "s3" は共有の boto3 クライアント（client_kwargs は get_client へ）、"local" は LocalObjectStore
+    """
+    backend = get_settings().s3_backend
+    if backend == "local":
+        return _local_store()
+    if backend == "s3":
+        return get_client("s3", **client_kwargs)
+    raise ValueError(f"unknown S3_BACKEND: {backend}")
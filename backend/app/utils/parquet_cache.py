@@ -0,0 +1,116 @@
+# backend/app/utils/parquet_cache.py
+"""
+parquet_cache.py – S3 由来 RU のデコード結果を Parquet で永続化するディスクキャッシュ
+・キーは (S3 キー, ETag, 射影列) → オブジェクトが更新されれば ETag が変わり別ファイル
+・合計サイズ上限を超えたら最終利用の古い順に削除（DiskLRU）
+・キャッシュディレクトリは再起動後もそのまま使える（複数ワーカーで共有可）
+・ローカルパス → (S3 キー, ETag) の対応は s3_loader がダウンロード時に登録する
+"""
+
+from __future__ import annotations
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, Tuple
+
+import hashlib
+import logging
+import os
+import threading
+
+import pandas as pd
+
+from app.config import get_settings
+from app.utils.disk_lru import DiskLRU
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    "ParquetCache", "get_parquet_cache", "register_s3_object", "s3_object_of",
+]
+
+SUFFIX = ".parquet"
+# デコード結果の中身が変わったら上げる（古いファイルは使われずに LRU で消える）
+# 2: 射影時も欠測行を全数値列で判定する
+# 3: 固定長文字列の末尾の NUL を落とさない（木構造のデコードと揃える）
+DECODE_VERSION = 3
+
+# ローカルパス → (S3 キー, ETag, mtime_ns, size)
+_S3_OBJECTS: Dict[str, Tuple[str, str, int, int]] = {}
+_S3_OBJECTS_LOCK = threading.Lock()
+
+
+def register_s3_object(local_path: str | Path, key: str, etag: str) -> None:
+    """ダウンロード済みファイルの取得元 S3 オブジェクトを登録"""
+    real = os.path.realpath(local_path)
+    st = os.stat(real)
+    with _S3_OBJECTS_LOCK:
+        _S3_OBJECTS[real] = (key, etag.strip('"'), st.st_mtime_ns, st.st_size)
+
+
+def s3_object_of(local_path: str | Path) -> Tuple[str, str] | None:
+    """登録済みなら (S3 キー, ETag)。登録後にファイルが書き換わっていれば None"""
+    real = os.path.realpath(local_path)
+    with _S3_OBJECTS_LOCK:
+        entry = _S3_OBJECTS.get(real)
+    if entry is None:
+        return None
+    try:
+        st = os.stat(real)
+    except FileNotFoundError:
+        return None
+    if (st.st_mtime_ns, st.st_size) != entry[2:]:
+        return None
+    return entry[0], entry[1]
+
+
+class ParquetCache(DiskLRU):
+    """合計サイズ上限付きの Parquet ディスクキャッシュ"""
+
+    suffix = SUFFIX
+
+    def path_for(self, key: Tuple[str, str], columns: Iterable[str] | None = None) -> Path:
+        s3_key, etag = key
+        cols = ",".join(sorted(set(columns))) if columns is not None else "*"
+        digest = hashlib.sha256(f"{DECODE_VERSION}\0{s3_key}\0{etag}\0{cols}".encode("utf-8")).hexdigest()
+        return self.directory / f"{digest}{SUFFIX}"
+
+    def get(self, key: Tuple[str, str], columns: Iterable[str] | None = None) -> pd.DataFrame | None:
+        path = self.path_for(key, columns)
+        try:
+            df = pd.read_parquet(path)
+            self.touch(path)                  # 最終利用時刻を更新（LRU）
+        except FileNotFoundError:
+            # 他ワーカーが追い出した場合もここ
+            self._count(hit=False)
+            return None
+        except Exception as e:
+            logger.warning(f"Broken parquet cache {path}: {e}")
+            path.unlink(missing_ok=True)
+            self._count(hit=False)
+            return None
+        self._count(hit=True)
+        return df
+
+    def put(self, key: Tuple[str, str], df: pd.DataFrame, columns: Iterable[str] | None = None) -> None:
+        tmp = self.temp_path()
+        try:
+            df.to_parquet(tmp)
+            self.commit(tmp, self.path_for(key, columns))
+        except Exception as e:
+            # 型の混在した列などは保存を諦める（デコード結果はそのまま使う）
+            logger.warning(f"Cannot write parquet cache for {key[0]}: {e}")
+            tmp.unlink(missing_ok=True)
+
+
+@lru_cache(maxsize=1)
+def get_parquet_cache() -> ParquetCache | None:
+    """プロセス共通のディスクキャッシュ（上限 0 なら無効 = None）"""
+    settings = get_settings()
+    if settings.ru_parquet_cache_bytes <= 0:
+        return None
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError as e:
+        logger.warning(f"Parquet cache disabled (pyarrow unavailable): {e}")
+        return None
+    return ParquetCache(settings.ru_parquet_cache_dir, settings.ru_parquet_cache_bytes)
@@ -0,0 +1,143 @@
+# backend/app/utils/query_parser.py
+"""
+query_parser.py – 構造化された問い合わせを LLM 無しで ParsedParams に変換する高速経路
+  例: "441000205 2025-04-17 15:00 to 16:00 csv"
+・TagID（9 桁）、日時 / 範囲（ISO・スラッシュ区切り、終了は時刻だけでも可）、出力形式、グラフ種別、
+  variables_map.json のコード / 日本語名 / 英語名、x= / y= を取り出す
+・全ての語がいずれかの規則で説明でき、TagID と開始日時が一意に決まるときだけ結果を返す
+  （それ以外は None → 呼び出し側が LLM に回す）
+"""
+
+from __future__ import annotations
+from datetime import datetime
+from typing import Any, Dict, List
+
+import re
+import unicodedata
+
+from app.utils.ru_utils import VARIABLES_MAP
+
+__all__ = ["parse_structured_query"]
+
+FORMATS = ("csv", "json", "xml", "parquet")
+CHARTS = {
+    "scatter": "scatter", "散布図": "scatter",
+    "bar": "bar", "棒グラフ": "bar",
+    "map": "map", "地図": "map",
+}
+# 規則に掛からなくても意味を変えない語
+CONNECTORS = {"to", "from", "until", "-", "–", "~", "〜", "から", "まで", "and", "の", "で"}
+
+_SEP = r"[\s,、]"
+_TAG = re.compile(r"(?<![\w:/-])(\d{9})(?![\w:/-])")
+_DATETIME = re.compile(
+    r"(?<!\d)(\d{4})[-/](\d{1,2})[-/](\d{1,2})(?:[ T](\d{1,2}):(\d{2})(?::(\d{2}))?)?(?![\d:])"
+)
+_TIME = re.compile(r"(?<![\d:])(\d{1,2}):(\d{2})(?::(\d{2}))?(?![\d:])")
+_AXIS = re.compile(rf"(?:^|(?<={_SEP}))([xy])=(\S+?)(?=$|{_SEP})")
+
+
+def _norm(text: str) -> str:
+    return unicodedata.normalize("NFKC", text).strip()
+
+
+# 変数名（コード / 日本語名 / 英語名）→ コード。長い名前から照合する
+_VARIABLE_NAMES: Dict[str, str] = {}
+for _code, _meta in VARIABLES_MAP.items():
+    for _name in (_code, _meta.get("jp", ""), _meta.get("en", "")):
+        if _name:
+            _VARIABLE_NAMES.setdefault(_norm(_name).lower(), _code)
+_VARIABLE = re.compile(
+    rf"(?:^|(?<={_SEP}))("
+    + "|".join(re.escape(n) for n in sorted(_VARIABLE_NAMES, key=len, reverse=True))
+    + rf")(?=$|{_SEP})",
+    re.IGNORECASE,
+)
+_WORD = re.compile(
+    rf"(?:^|(?<={_SEP}))("
+    + "|".join(re.escape(w) for w in (*FORMATS, *CHARTS))
+    + rf")(?=$|{_SEP})",
+    re.IGNORECASE,
+)
+
+
+def _variable_code(name: str) -> str | None:
+    return _VARIABLE_NAMES.get(_norm(name).lower())
+
+
+def parse_structured_query(text: str) -> Dict[str, Any] | None:
+    """確信を持って解釈できれば ParsedParams 相当の dict（None の項目は含めない）、できなければ None"""
+    rest = _norm(text)
+    found: Dict[str, List] = {"tag": [], "dt": [], "time": [], "word": [], "var": [], "axis": []}
+
+    def take(kind: str, pattern: re.Pattern):
+        nonlocal rest
+
+        def record(m: re.Match) -> str:
+            found[kind].append(m)
+            return " "
+        rest = pattern.sub(record, rest)
+
+    # 長い・具体的な規則から消費する（日時の数字を TagID や時刻と取り違えない）
+    take("dt", _DATETIME)
+    take("time", _TIME)
+    take("tag", _TAG)
+    take("axis", _AXIS)
+    take("word", _WORD)
+    take("var", _VARIABLE)
+
+    leftover = [w for w in re.split(rf"{_SEP}+", rest) if w]
+    if any(w.lower() not in CONNECTORS for w in leftover):
+        return None
+
+    # ---- TagID・日時 --------------------------------------------------
+    if len(found["tag"]) != 1 or not found["dt"] or len(found["dt"]) + len(found["time"]) > 2:
+        return None
+    try:
+        times = [_to_datetime(m) for m in found["dt"]]
+    except ValueError:
+        return None
+    if any(m.group(4) is None for m in found["dt"]):
+        return None                              # 日付だけ（1 日分か時刻か曖昧）は LLM に任せる
+    start = times[0]
+    end = times[1] if len(times) > 1 else None
+    if found["time"]:
+        h, mi, s = (int(g or 0) for g in found["time"][0].groups())
+        try:
+            end = start.replace(hour=h, minute=mi, second=s)
+        except ValueError:
+            return None
+    if end is not None and end < start:
+        return None
+
+    parsed: Dict[str, Any] = {
+        "tag_id": found["tag"][0].group(1),
+        "start_dt": start.isoformat(),
+    }
+    if end is not None:
+        parsed["end_dt"] = end.isoformat()
+
+    # ---- 形式・グラフ・変数 -------------------------------------------
+    words = [m.group(1).lower() for m in found["word"]]
+    formats = [w for w in words if w in FORMATS]
+    charts = [CHARTS[w] for w in words if w in CHARTS]
+    if len(formats) > 1 or len(charts) > 1:
+        return None
+    if formats:
+        parsed["format"] = formats[0]
+    if charts:
+        parsed["chart"] = charts[0]
+
+    variables = list(dict.fromkeys(_variable_code(m.group(1)) for m in found["var"]))
+    if variables:
+        parsed["vars"] = variables
+    for m in found["axis"]:
+        code = _variable_code(m.group(2))
+        if code is None or m.group(1) in parsed:
+            return None
+        parsed[m.group(1)] = code
+    return parsed
+
+
+def _to_datetime(m: re.Match) -> datetime:
+    return datetime(*(int(g or 0) for g in m.groups()))
@@ -8,19 +8,30 @@ ru_utils.py – RU ファイル（GeoJSON / gzip 観測）→ pandas.DataFrame
 """
 
 from __future__ import annotations
+from collections import OrderedDict, deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, Iterable, Iterator, List, Tuple
 
 import json
-import gzip
-import io
 import pandas as pd
-import numbers
 import numpy as np
-import boto3
 import logging
+import multiprocessing
+import os
+import threading
 
-from app.agent.tools.RU import RU, Header  # RU.py を tools 配下へ移動済み前提
+from app.agent.tools.RU import (  # RU.py を tools 配下へ移動済み前提
+    NUMPY_SCALAR_FORMAT, RU, BufferIO, Header, MappedFile, parse_format, parse_header,
+    values_to_time,
+)
+from app.config import get_settings
+from app.utils.download_cache import get_download_cache
+from app.utils.frame_cache import frame_key, get_frame_cache, object_key
+from app.utils.object_store import get_object_store
+from app.utils.parquet_cache import get_parquet_cache, s3_object_of
+from app.utils.single_flight import SingleFlight
 
 # ロギング設定
 logging.basicConfig(level=logging.DEBUG)
@@ -34,17 +45,32 @@ CLIENT_KWARGS = {}  # 必要に応じて認証情報などを設定
 # 「…/backend/app/utils/ru_utils.py」から見て 3 つ親 = backend/
 BACKEND_ROOT = Path(__file__).resolve().parents[2]   # /code/backend
 
+# point_data を逐次デコードする際の 1 バッチあたりのレコード数
+RECORD_BATCH_SIZE = 10000
+KEY_COLUMNS = ("LCLID", "LAT", "LON")     # 射影時も常にデコードする列
+
+# 欠測コードの閾値（|値| がこれ以上なら欠測）と変数毎の物理範囲（スケール補正後）
+MISSING_THRESHOLD = 32000
+PHYSICAL_RANGES: Dict[str, tuple[float, float]] = {
+    "AIRTMP": (-80, 70),
+}
+
 # 変数メタ
 VARIABLES_MAP: Dict[str, Dict] = json.loads(
     (BACKEND_ROOT / "app" / "data" / "variables_map.json").read_text(encoding="utf-8")
 )
 
-__all__ = ["load_ru", "ensure_latlon", "extract_columns", "resolve_variable", "load_geojson"]
+__all__ = [
+    "load_ru", "ensure_latlon", "extract_columns", "resolve_variable",
+    "requested_columns", "load_geojson", "load_ru_many", "iter_ru_many",
+    "load_ru_bytes", "load_s3_ru", "s3_uri", "decode_executor",
+    "fetch_s3_ru", "decode_s3_ru", "decode_fetched", "register_s3_etag",
+]
 
 # ----------------------------------------------------------------------
-def _load_geojson(body: bytes) -> pd.DataFrame:
+def _load_geojson(body: bytes | memoryview) -> pd.DataFrame:
     """GeoJSON → DataFrame"""
-    gjson = json.loads(body.decode("utf-8"))
+    gjson = json.loads(str(body, "utf-8"))
     rows: List[Dict] = []
     for feat in gjson["features"]:
         lon, lat, *alt = feat["geometry"]["coordinates"]
@@ -60,105 +86,464 @@ def _load_geojson(body: bytes) -> pd.DataFrame:
     return pd.DataFrame(rows)
 
 
-def _load_gzip_observation(ru_bytes: bytes) -> pd.DataFrame:
-    """gzip 観測 RU → DataFrame"""
-    fp = io.BytesIO(ru_bytes)
-    ru = RU()
-    ru.load(fp)  # ヘッダ検出 → gzip 展開 → 構造化
+def _apply_scale(key: str, values: np.ndarray) -> np.ndarray:
+    """variables_map.json の scale / offset を適用（例: 327 → 32.7）"""
+    meta = VARIABLES_MAP.get(key, {})
+    with np.errstate(invalid="ignore"):
+        # int16 の abs() 桁あふれを避けるため float64 で計算
+        return values.astype(np.float64) * float(meta.get("scale", 1)) + float(meta.get("offset", 0))
 
-    hdr: Header = ru.get_header()
-    root = ru.get_root()
 
-    # --- 観測レコードへ変換 -------------------------------------------
-    # 仕様: root 構造体 直下に 'observation_date' Struct + 'point_data' Array[]
-    recs: List[Dict] = []
-    obs_time_struct = root.get_ref("observation_date")
-    dt = obs_time_struct.get_time().replace(tzinfo=None)  # naive UTC
-    pt_arr = root.get_ref("point_data")
-
-    for pt in pt_arr:
-        rec: Dict = {
-            "time": dt,
-            # announced (header) を各レコードに付与 ---------------
-            "announced": pd.to_datetime(hdr["announced"], utc=True)
-            if "announced" in hdr
-            else dt,
-        }
-        for key in pt.keys():
-            v = pt[key]
-
-            if isinstance(v, numbers.Number):
-                # ---------- 欠測コード判定 ----------
-                if abs(v) >= 32000:           # 32000 系は欠測
-                    rec[key] = np.nan
-                    continue
-
-                # ---------- スケール補正 ----------
-                meta = VARIABLES_MAP.get(key, {})
-                scale  = float(meta.get("scale", 1))
-                offset = float(meta.get("offset", 0))
-                val = v * scale + offset      # 例: 327 → 32.7
-
-                # ---------- 気温の物理範囲チェック ----------
-                if key == "AIRTMP" and not (-80 <= val <= 70):
-                    rec[key] = np.nan          # 異常値も欠測扱い
-                else:
-                    rec[key] = round(val, 3)
-            else:
-                # 文字列・欠損はそのまま
-                rec[key] = v
+def _missing_mask(key: str, values: np.ndarray, scaled: np.ndarray | None = None) -> np.ndarray:
+    """
+    数値列 1 本の欠測判定（欠測コード・物理範囲外・NaN）
+    スケール補正後の値は物理範囲のある変数でだけ要る（scaled を渡せば使い回す）
+    """
+    with np.errstate(invalid="ignore"):
+        # ---------- 欠測コード判定（32000 系・NaN は欠測） ----------
+        missing = ~(np.abs(values.astype(np.float64)) < MISSING_THRESHOLD)
+
+        # ---------- 物理範囲チェック ----------
+        if key in PHYSICAL_RANGES:
+            lo, hi = PHYSICAL_RANGES[key]
+            if scaled is None:
+                scaled = _apply_scale(key, values)
+            missing |= ~((lo <= scaled) & (scaled <= hi))
+    return missing
+
 
-        recs.append(rec)
+def _scale_column(key: str, values: np.ndarray) -> np.ndarray:
+    """数値列 1 本に欠測判定・スケール補正・物理範囲チェックを列単位で適用"""
+    vals = _apply_scale(key, values)
+    vals[_missing_mask(key, values, vals)] = np.nan
+    return np.round(vals, 3)
 
-    df = pd.DataFrame(recs)
+
+def _points_to_frame(
+    columns: Dict[str, list], dt, announced, wanted: set | None = None
+) -> Tuple[pd.DataFrame, np.ndarray | None]:
+    """
+    point_data の列（1 バッチ分）→ (DataFrame, 欠測でない数値を 1 つでも持つ行のマスク)
+    wanted を指定するとその列だけを DataFrame にする
+    （それ以外の数値列は欠測判定だけを行い、スケール補正も DataFrame 化もしない）
+    """
+    if not columns:
+        return pd.DataFrame(), None
+
+    data: Dict[str, object] = {}
+    present = None
+    for key, col in columns.items():
+        # 固定長なら NumPy 列、可変長を含めば Python list
+        arr = col if isinstance(col, np.ndarray) else np.asarray(col)
+        keep = wanted is None or key in wanted
+        if arr.dtype.kind in "iuf":
+            if keep:
+                data[key] = _scale_column(key, arr)
+                valid = ~np.isnan(data[key])
+            else:
+                valid = ~_missing_mask(key, arr)
+            present = valid if present is None else present | valid
+        elif keep:
+            # 文字列はそのまま
+            data[key] = col
+
+    n = len(next(iter(columns.values())))
+    # time / announced (header) は全レコード共通の値をブロードキャスト（ns 精度に揃える）
+    times = {
+        "time": pd.Timestamp(dt).as_unit("ns"),
+        "announced": pd.Timestamp(announced).as_unit("ns"),
+    }
+    return pd.DataFrame({**times, **data}, index=pd.RangeIndex(n)), present
+
+
+def _load_gzip_observation(
+    src: bytes | BufferIO, columns: List[str] | None = None
+) -> pd.DataFrame:
+    """gzip 観測 RU（バイト列 or MappedFile）→ DataFrame（columns 指定時はその列だけデコード）"""
+    fp = src if isinstance(src, BufferIO) else BufferIO(src)
+    fp.seek(0)
+    ru = RU()
+    # 欠測行（全数値列が欠測）の判定には全数値メンバが要るので、射影時も生の値だけは読む
+    # （スケール補正・DataFrame 化は要求列だけ。文字列メンバは飛ばせる）
+    decode_cols = wanted = None
+    if columns is not None:
+        hdr, _ = parse_header(fp.view, strict=False)
+        decode_cols = list(dict.fromkeys([*columns, *_numeric_members(hdr["format"])]))
+        wanted = set(columns)
+
+    # --- 観測レコードへ変換 -------------------------------------------
+    # 仕様: root 構造体 直下に 'observation_date' Struct + 'point_data' Array[]
+    # gzip を逐次展開しながら RECORD_BATCH_SIZE 件ずつデコード（ピークメモリをバッチ単位に抑える）
+    frames: List[pd.DataFrame] = []
+    masks: List[np.ndarray] = []
+    batches = ru.iter_records(
+        fp, "point_data", batch_size=RECORD_BATCH_SIZE, columnar=True, columns=decode_cols
+    )
+    for batch in batches:
+        hdr: Header = ru.get_header()
+        dt = values_to_time(ru.get_values()["observation_date"])  # naive UTC
+        announced = pd.to_datetime(hdr["announced"], utc=True) if "announced" in hdr else dt
+        frame, present = _points_to_frame(batch, dt, announced, wanted)
+        frames.append(frame)
+        masks.append(present if present is not None else np.ones(len(frame), dtype=bool))
+
+    df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
     # announced を naive UTC に統一
     if "announced" in df.columns:
         df["announced"] = pd.to_datetime(df["announced"], utc=True).dt.tz_localize(None)
 
-    # --- 欠測行を除外 -------------------------------------------
-    numeric_cols = [c for c in df.columns if df[c].dtype.kind in "fiu"]
-    df = df.dropna(subset=numeric_cols, how="all")  # 全数値列が NaN の行だけ除去
-
+    # --- 欠測行を除外（全数値列が欠測の行だけ。元の行番号は index に残す） ---
+    if masks:
+        df = df[np.concatenate(masks)]
     return df
 
 
+@lru_cache(maxsize=64)
+def _numeric_members(fmt: str) -> Tuple[str, ...]:
+    """point_data レコードの数値メンバ名（フォーマット文字列単位で覚える）"""
+    root, _ = parse_format(fmt)
+    array = next((m for m in root.members if m.name == "point_data"), None)
+    if array is None or not array.member.is_struct():
+        return ()
+
+    def walk(struct, prefix: str) -> Iterator[str]:
+        for m in struct.members:
+            if m.is_struct():
+                yield from walk(m, f"{prefix}{m.name}.")
+            elif m.type in NUMPY_SCALAR_FORMAT:
+                yield prefix + m.name
+    return tuple(walk(array.member, ""))
+
+
 # ----------------------------------------------------------------------
-def load_ru(path: str | Path) -> pd.DataFrame:
+def _split_ru(data: bytes | memoryview, name: str = "RU") -> tuple[Header, bytes | memoryview]:
+    """
+    RU バイト列をヘッダと本体に分割（\x04\x1a の検索は 1 回だけ）
+    memoryview を渡すと本体もコピーせずに memoryview のまま返す
+    """
+    if data[:3] != b"WN\n":
+        raise ValueError("Not an RU file")
+    try:
+        hdr, offset = parse_header(data, strict=False)
+    except RuntimeError as e:
+        logger.error(f"Invalid RU header in {name}: {e}")
+        raise ValueError(f"invalid RU header: {e}") from e
+    return hdr, data[offset:]
+
+
+def load_ru(path: str | Path, columns: List[str] | None = None) -> pd.DataFrame:
     """
     RU ファイルを DataFrame にロード（フォーマット自動判定）
+    columns を指定すると観測データはその列だけをデコードする
+    （time / announced は常に付与。GeoJSON は全列）
+    デコード結果はパス + mtime + サイズ単位でプロセス内キャッシュを共有し、
+    S3 由来のファイルは (S3 キー, ETag) 単位の Parquet ディスクキャッシュも使う
+    path に s3://bucket/key を渡すとローカルファイルを介さずに取得する（load_s3_ru）
     """
-    data = Path(path).read_bytes()
+    if str(path).startswith(S3_SCHEME):
+        bucket, key = _split_s3_uri(str(path))
+        return load_s3_ru(bucket, key, columns=columns)
+
+    cache = get_frame_cache()
+    key = frame_key(path, columns)
+    df = cache.get(key)
+    if df is None:
+        df = _load_persisted(path, columns, s3_object_of(path))
+        cache.put(key, df)
+    return df
 
-    # 1) ヘッダ抽出
-    if not data.startswith(b"WN\n"):
-        raise ValueError("Not an RU file")
 
-    # header_end = b"\x04\x1a" の直前までがヘッダ
-    end_idx = data.find(b"\x04\x1a")
-    if end_idx == -1:
-        raise ValueError("invalid RU header")
-    header_part = data[: end_idx + 2].decode("ascii", errors="replace")
-
-    # compress_type 判定
-    compress = None
-    for line in header_part.splitlines():
-        if line.startswith("compress_type="):
-            compress = line.split("=", 1)[1]
-            break
-    hdr_format = None
-    for line in header_part.splitlines():
-        if line.startswith("format="):
-            hdr_format = line.split("=", 1)[1]
-            break
-
-    body = data[end_idx + 2 :]
+def load_ru_many(
+    paths: Iterable[str | Path],
+    columns: List[str] | None = None,
+    max_workers: int | None = None,
+    executor: Executor | None = None,
+) -> pd.DataFrame:
+    """
+    複数の RU ファイルを並列にデコードして 1 つの DataFrame に連結（入力順 = 時系列順を維持）
+    ・メモリキャッシュにあるファイルはそのまま使い、残りだけを executor に投げる
+    ・s3:// の取得は共有スレッドプールで並行に行い、デコードは同じく executor に投げる
+    ・executor 省略時は Settings.ru_decode_workers 個のプロセスプール（デコードは CPU バウンド）
+    """
+    return pd.concat(list(iter_ru_many(paths, columns, max_workers, executor)), ignore_index=True)
+
+
+def iter_ru_many(
+    paths: Iterable[str | Path],
+    columns: List[str] | None = None,
+    max_workers: int | None = None,
+    executor: Executor | None = None,
+    depth: int | None = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    load_ru_many の逐次版: 入力順に 1 ファイルずつ DataFrame を返す
+    先頭を消費している間も後続のデコードを進めるが、実行中は depth 個
+    （既定は Settings.ru_pipeline_depth とワーカー数の大きい方）までに抑える
+    """
+    paths = list(paths)
+    cache = get_frame_cache()
+    pool = executor or (decode_executor(max_workers) if len(paths) > 1 else None)
+    if depth is None:
+        depth = max(get_settings().ru_pipeline_depth, max_workers or decode_workers())
+
+    def submit(path):
+        # s3:// はメモリキャッシュ（fetch 時にデコード済みのはず）だけをここで引き、
+        # 外れたら取得スレッドへ回してデコードは pool で行う
+        if str(path).startswith(S3_SCHEME):
+            bucket, key = _split_s3_uri(str(path))
+            etag = _listed_etag(bucket, key)
+            df = cache.get(object_key(bucket, key, etag, columns)) if etag is not None else None
+            if df is None and pool is not None:
+                return None, _s3_fetch_pool().submit(
+                    load_s3_ru, bucket, key, etag, columns, executor=pool
+                )
+            return None, df
+        key = frame_key(path, columns)
+        df = cache.get(key)
+        if df is None and pool is not None:
+            return key, pool.submit(_load_persisted, str(path), columns, s3_object_of(path))
+        return key, df
+
+    pending = deque(submit(p) for p in paths[:depth] if pool is not None)
+    for i, path in enumerate(paths):
+        if pool is None:
+            yield load_ru(path, columns)
+            continue
+        key, item = pending.popleft()
+        if i + depth < len(paths):
+            pending.append(submit(paths[i + depth]))
+        if isinstance(item, Future):
+            item = item.result()
+            if key is not None:         # s3:// は load_s3_ru がキャッシュに登録済み
+                cache.put(key, item)
+        yield item
+
+
+def decode_workers() -> int:
+    """並列デコードのワーカー数（Settings.ru_decode_workers、0 なら CPU 数）"""
+    return get_settings().ru_decode_workers or os.cpu_count() or 1
+
+
+def decode_executor(max_workers: int | None = None) -> Executor | None:
+    """並列デコード用の共有プロセスプール（ワーカー 1 なら None = 呼び出し元でデコード）"""
+    workers = max_workers or decode_workers()
+    return _decode_pool(workers) if workers > 1 else None
+
+
+@lru_cache(maxsize=None)
+def _decode_pool(workers: int) -> ProcessPoolExecutor:
+    """ワーカー数ごとに共有するプロセスプール（fork はスレッド併用時に危険なので spawn）"""
+    return ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+@lru_cache(maxsize=1)
+def _s3_fetch_pool() -> ThreadPoolExecutor:
+    """iter_ru_many が s3:// を取得するスレッドプール（I/O 待ちなので Settings.s3_download_concurrency 本）"""
+    return ThreadPoolExecutor(get_settings().s3_download_concurrency, thread_name_prefix="ru-s3")
+
+
+def _load_persisted(
+    path: str | Path, columns: List[str] | None = None, obj: Tuple[str, str] | None = None
+) -> pd.DataFrame:
+    """
+    S3 由来（obj = (S3 キー, ETag)）なら Parquet ディスクキャッシュを読み、無ければデコードして書き出す
+    プロセスプールのワーカーからも呼ばれるので登録情報は引数で受け取る
+    """
+    disk = get_parquet_cache() if obj is not None else None
+    if disk is None:
+        return _decode_ru(path, columns)
+
+    df = disk.get(obj, columns)
+    if df is None:
+        df = _decode_ru(path, columns)
+        disk.put(obj, df, columns)
+    return df
+
+
+def _decode_ru(path: str | Path, columns: List[str] | None = None) -> pd.DataFrame:
+    """RU ファイルを mmap してデコード（キャッシュ無し）"""
+    # ファイルは mmap で 1 回だけマップし、ヒープへの全体コピーを作らない
+    with MappedFile(path) as src:
+        return _decode_source(src, str(path), columns)
+
+
+def _decode_source(src: BufferIO, name: str, columns: List[str] | None = None) -> pd.DataFrame:
+    """バッファ上の RU をデコード（フォーマット自動判定）"""
+    # 1) ヘッダ抽出
+    hdr, body = _split_ru(src.view, name)
+    hdr_format = hdr["format"]
+    compress = hdr["compress_type"]
 
     if hdr_format == "GJSON":
-        return _load_geojson(body)
+        df = _load_geojson(body)
     elif compress == "gzip":
-        return _load_gzip_observation(data)
+        df = _load_gzip_observation(src, columns)
     else:
         raise NotImplementedError(f"unsupported RU format: {hdr_format}, compress={compress}")
+    del body  # マッピングへの参照を外してから unmap
+    return df
+
+
+def load_ru_bytes(data: bytes, columns: List[str] | None = None, name: str = "RU") -> pd.DataFrame:
+    """メモリ上の RU（get_object の Body など）を一時ファイル無しでデコード"""
+    src = BufferIO(data)
+    try:
+        return _decode_source(src, name, columns)
+    finally:
+        src.view.release()
+
+
+# ----------------------------------------------------------------------
+# S3 から直接デコード
+# ----------------------------------------------------------------------
+S3_SCHEME = "s3://"
+
+# 実行中の get_object / デコード（同時に来た同じ要求は 1 回にまとめる）
+_IN_FLIGHT = SingleFlight()
+
+# 一覧（list_objects_v2）で分かった ETag: (bucket, key) → ETag（LRU）
+# s3:// URI だけを受け取った load_s3_ru が、一覧したばかりのキーに head_object を投げないため
+_LISTED_ETAGS: "OrderedDict[tuple[str, str], str]" = OrderedDict()
+_LISTED_ETAGS_LOCK = threading.Lock()
+LISTED_ETAG_CACHE_SIZE = 65536
+
+
+def s3_uri(bucket: str, key: str) -> str:
+    return f"{S3_SCHEME}{bucket}/{key}"
+
+
+def register_s3_etag(bucket: str, key: str, etag: str) -> None:
+    """一覧で得たオブジェクトの ETag を登録（s3_loader が一覧時に呼ぶ）"""
+    with _LISTED_ETAGS_LOCK:
+        _LISTED_ETAGS[(bucket, key)] = etag.strip('"')
+        _LISTED_ETAGS.move_to_end((bucket, key))
+        while len(_LISTED_ETAGS) > LISTED_ETAG_CACHE_SIZE:
+            _LISTED_ETAGS.popitem(last=False)
+
+
+def _listed_etag(bucket: str, key: str) -> str | None:
+    with _LISTED_ETAGS_LOCK:
+        return _LISTED_ETAGS.get((bucket, key))
+
+
+def _split_s3_uri(uri: str) -> tuple[str, str]:
+    bucket, _, key = uri[len(S3_SCHEME):].partition("/")
+    return bucket, key
+
+
+def load_s3_ru(
+    bucket: str,
+    key: str,
+    etag: str | None = None,
+    columns: List[str] | None = None,
+    persist: bool | None = None,
+    s3=None,
+    executor: Executor | None = None,
+) -> pd.DataFrame:
+    """
+    S3 の RU オブジェクトを DataFrame に（ローカルの一時ファイルを作らない）
+    メモリキャッシュ → Parquet キャッシュ → ダウンロードキャッシュ → get_object の順に探す
+    persist=True（既定は Settings.s3_persist_downloads）なら取得した本体をダウンロードキャッシュにも保存
+    etag 省略時は一覧で登録済みの ETag（register_s3_etag）、それも無ければ head_object で調べる
+    executor を渡すとデコードだけをそこで行う
+    """
+    s3 = s3 or get_object_store(region_name=AWS_DEFAULT_REGION, **CLIENT_KWARGS)
+    etag = etag or _listed_etag(bucket, key)
+    if etag is None:
+        etag = s3.head_object(Bucket=bucket, Key=key)["ETag"]
+
+    found = fetch_s3_ru(bucket, key, etag, columns, persist, s3)
+    if isinstance(found, pd.DataFrame):
+        return found
+    return decode_s3_ru(bucket, key, etag, found, columns, executor)
+
+
+def fetch_s3_ru(
+    bucket: str,
+    key: str,
+    etag: str,
+    columns: List[str] | None = None,
+    persist: bool | None = None,
+    s3=None,
+) -> pd.DataFrame | Path | bytes:
+    """
+    load_s3_ru の取得段（デコードはしない）
+    キャッシュにあれば DataFrame、ダウンロードキャッシュにあればそのパス、無ければ get_object の本体
+    """
+    etag = etag.strip('"')
+    df = get_frame_cache().get(object_key(bucket, key, etag, columns))
+    if df is not None:
+        return df
+
+    disk = get_parquet_cache()
+    df = disk.get((key, etag), columns) if disk is not None else None
+    if df is not None:
+        get_frame_cache().put(object_key(bucket, key, etag, columns), df)
+        return df
+
+    cached = get_download_cache().get(bucket, key, etag)
+    if cached is not None:
+        return cached
+    # 同じオブジェクトを同時に取りに来たら 1 回の get_object を待ち合わせる（bytes は共有して良い）
+    data, _ = _IN_FLIGHT.do(("get", bucket, key, etag), _get_body, s3, bucket, key, etag, persist)
+    return data
+
+
+def _get_body(s3, bucket: str, key: str, etag: str, persist: bool | None) -> bytes:
+    data = s3.get_object(Bucket=bucket, Key=key)["Body"].read()
+    if persist if persist is not None else get_settings().s3_persist_downloads:
+        get_download_cache().store(bucket, key, etag, data)
+    return data
+
+
+def decode_s3_ru(
+    bucket: str,
+    key: str,
+    etag: str,
+    found: Path | bytes,
+    columns: List[str] | None = None,
+    executor: Executor | None = None,
+) -> pd.DataFrame:
+    """
+    load_s3_ru のデコード段: fetch_s3_ru の結果をデコードして両キャッシュに登録
+    executor を渡すとデコードだけをそこで行う（呼び出し元のスレッドは完了を待つ）
+    同じオブジェクト・列のデコードが実行中なら、その結果を共有する
+    """
+    etag = etag.strip('"')
+    cols = tuple(sorted(set(columns))) if columns is not None else None
+    df, shared = _IN_FLIGHT.do(
+        ("decode", bucket, key, etag, cols), _decode_s3_once, bucket, key, etag, found, columns, executor
+    )
+    return df.copy() if shared else df
+
+
+def _decode_s3_once(bucket, key, etag, found, columns, executor) -> pd.DataFrame:
+    # 待ち合わせに間に合わなかった同じ要求は、直前に登録された結果を使う
+    df = get_frame_cache().get(object_key(bucket, key, etag, columns))
+    if df is not None:
+        return df
+    name = s3_uri(bucket, key)
+    if executor is not None:
+        df = executor.submit(decode_fetched, found, columns, name).result()
+    else:
+        df = decode_fetched(found, columns, name)
+    _cache_s3_frame(bucket, key, etag, columns, df)
+    return df
+
+
+def decode_fetched(src: Path | bytes, columns: List[str] | None = None, name: str = "RU") -> pd.DataFrame:
+    """fetch_s3_ru の結果（パス or 本体）をデコード（プロセスプールのワーカーからも呼ばれる）"""
+    if isinstance(src, Path):
+        return _decode_ru(src, columns)
+    return load_ru_bytes(src, columns, name)
+
+
+def _cache_s3_frame(bucket: str, key: str, etag: str, columns: List[str] | None, df: pd.DataFrame) -> None:
+    """デコード結果を Parquet キャッシュとメモリキャッシュに登録"""
+    disk = get_parquet_cache()
+    if disk is not None:
+        disk.put((key, etag), df, columns)
+    get_frame_cache().put(object_key(bucket, key, etag, columns), df)
 
 
 def _tagid_to_latlon(tag_id: str) -> tuple[float, float]:
@@ -166,8 +551,10 @@ def _tagid_to_latlon(tag_id: str) -> tuple[float, float]:
     tag_idから緯度経度を取得する関数
     テストではmonkeypatchで差し替える想定
     """
-    from app.utils.country_resolver import find_metadata_by_tag
-    meta = find_metadata_by_tag(tag_id)
+    from app.services.data_loader import get_metadata_registry
+    meta = get_metadata_registry().by_tag(tag_id)
+    if meta is None:
+        raise ValueError(f"metadata.json に TagID がありません: {tag_id}")
     loc_df = load_ru(meta["location_metadata"]["local_path"])
     return loc_df["lat"].mean(), loc_df["lon"].mean()
 
@@ -228,6 +615,21 @@ def resolve_variable(alias: str) -> str:
     return alias
 
 
+def requested_columns(parsed: Dict | None) -> List[str] | None:
+    """
+    ParsedParams（vars / x / y）から RU デコード対象の変数コードを求める
+    指定が無ければ None（全列デコード）
+    """
+    if not parsed:
+        return None
+    names = list(parsed.get("vars") or []) + [parsed.get("x"), parsed.get("y")]
+    codes = [resolve_variable(n) for n in names if n]
+    if not codes:
+        return None
+    # 地点 ID・緯度経度は結合／地図描画に必要なので常に残す（存在しない名前は無視される）
+    return list(dict.fromkeys(codes + list(KEY_COLUMNS)))
+
+
 def load_geojson(tag_id: str) -> dict:
     """
     tag_idに対応するGeoJSONデータを取得する関数
@@ -238,12 +640,7 @@ def load_geojson(tag_id: str) -> dict:
     test_file = project_root / "tests" / "data" / tag_id / "location.json"
     if test_file.exists():
         logger.debug(f"Loading local GeoJSON: {test_file}")
-        data = test_file.read_bytes()
-        end_idx = data.find(b"\x04\x1a")
-        if end_idx == -1:
-            logger.error(f"Invalid RU header in {test_file}")
-            raise ValueError("Invalid RU header")
-        body = data[end_idx + 2 :]
+        _, body = _split_ru(test_file.read_bytes(), str(test_file))
         try:
             return json.loads(body.decode("utf-8"))
         except json.JSONDecodeError as e:
@@ -251,16 +648,11 @@ def load_geojson(tag_id: str) -> dict:
             raise ValueError(f"Failed to parse GeoJSON: {e}")
     
     logger.debug(f"Fetching GeoJSON from S3: {tag_id}/location.json")
-    s3 = boto3.client("s3", region_name=AWS_DEFAULT_REGION, **CLIENT_KWARGS)
+    s3 = get_object_store(region_name=AWS_DEFAULT_REGION, **CLIENT_KWARGS)
     key = f"{tag_id}/location.json"
     try:
         resp = s3.get_object(Bucket=S3_BUCKET, Key=key)
-        data = resp["Body"].read()
-        end_idx = data.find(b"\x04\x1a")
-        if end_idx == -1:
-            logger.error(f"Invalid RU header in S3 object: {key}")
-            raise ValueError("Invalid RU header")
-        body = data[end_idx + 2 :]
+        _, body = _split_ru(resp["Body"].read(), f"S3 object: {key}")
         return json.loads(body.decode("utf-8"))
     except s3.exceptions.NoSuchKey:
         logger.error(f"GeoJSON not found in S3: {key}")
@@ -0,0 +1,66 @@
+# backend/app/utils/single_flight.py
+"""
+single_flight.py – 同一キーの同時実行をまとめる（Go の singleflight 相当）
+・同じキーの処理が実行中なら新たに始めず、その完了を待って結果（例外も）を共有する
+・完了したキーはすぐに忘れる（結果のキャッシュはしない。キャッシュは呼び出し側の責務）
+・リクエストごとにイベントループが別なので、スレッド間で待ち合わせる
+"""
+
+from __future__ import annotations
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+import threading
+
+__all__ = ["SingleFlight"]
+
+
+class SingleFlight:
+    """キー単位で実行中の処理を共有する（スレッドセーフ）"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self.executed = 0
+        self.shared = 0
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Tuple[Any, bool]:
+        """
+        fn(*args, **kwargs) を実行して (結果, 共有したか) を返す
+        共有した結果は他の呼び出し元と同じオブジェクトなので、変更するならコピーすること
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                self.executed += 1
+            else:
+                self.shared += 1
+        if not leader:
+            return future.result(), True
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            self._forget(key)
+            future.set_exception(e)
+            raise
+        self._forget(key)
+        future.set_result(result)
+        return result, False
+
+    def _forget(self, key: Hashable) -> None:
+        with self._lock:
+            self._calls.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "in_flight": len(self._calls),
+                "executed": self.executed,
+                "shared": self.shared,
+            }
@@ -0,0 +1,68 @@
+# bench_fetch.py
+"""
+fetch 経路（一覧 → 取得 → デコード）をネットワーク無しで計測する
+LocalObjectStore に tests/data/sample.ru を {tag_id}/yyyy/mm/dd/{timestamp}.{uuid} で複製して使う
+
+    python bench_fetch.py --files 144 --latency-ms 30 --bandwidth-mbps 200
+    python -m cProfile -s cumtime bench_fetch.py --files 144   # プロファイル
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+SAMPLE = Path(__file__).parent / "tests" / "data" / "sample.ru"
+TAG_ID = "441000205"
+BUCKET = "bench"
+
+
+def seed(root: Path, start: datetime, files: int, step_min: int) -> None:
+    """start から step_min 分おきに files 個の RU を置く（日付を跨げば日毎のプレフィックスに分かれる）"""
+    body = SAMPLE.read_bytes()
+    for i in range(files):
+        dt = start + timedelta(minutes=step_min * i)
+        day = root / BUCKET / TAG_ID / f"{dt:%Y/%m/%d}"
+        day.mkdir(parents=True, exist_ok=True)
+        (day / f"{dt:%Y%m%d%H%M%S}.{uuid.uuid4()}").write_bytes(body)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=144)
+    parser.add_argument("--step-min", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--bandwidth-mbps", type=float, default=0)
+    parser.add_argument("--repeat", type=int, default=2, help="2 回目以降はキャッシュの効果を見る")
+    args = parser.parse_args()
+
+    work = Path(tempfile.mkdtemp(prefix="bench_fetch_"))
+    # 設定は get_settings() の初回呼び出しで確定するので import 前に環境変数で渡す
+    os.environ.update({
+        "S3_BACKEND": "local",
+        "S3_LOCAL_ROOT": str(work / "s3"),
+        "S3_LOCAL_LATENCY_MS": str(args.latency_ms),
+        "S3_LOCAL_BANDWIDTH_MBPS": str(args.bandwidth_mbps),
+        "S3_DOWNLOAD_CACHE_DIR": str(work / "dl"),
+        "RU_PARQUET_CACHE_DIR": str(work / "parquet"),
+    })
+    from app.agent.tools.s3_loader import day_prefixes, fetch_frames_from_s3
+
+    start = datetime(2025, 4, 28, 0, 0)
+    end = start + timedelta(minutes=args.step_min * (args.files - 1))
+    seed(work / "s3", start, args.files, args.step_min)
+    prefixes = day_prefixes(TAG_ID, start, end)
+
+    for n in range(args.repeat):
+        t0 = time.perf_counter()
+        frames = asyncio.run(fetch_frames_from_s3(BUCKET, prefixes, start, end))
+        elapsed = time.perf_counter() - t0
+        rows = sum(len(df) for df in frames.values())
+        print(f"run {n + 1}: {len(frames)} files, {rows} rows, {elapsed:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,4 +12,66 @@ def sample_obs_ru() -> Path:
 @pytest.fixture
 def sample_geojson() -> Path:
     """テスト用地点GeoJSONファイル"""
-    return TEST_ROOT / "data" / "441000205" / "location.json"
\ No newline at end of file
+    return TEST_ROOT / "data" / "441000205" / "location.json"
+
+@pytest.fixture
+def fixed_obs_ru() -> bytes:
+    """固定長 point_data（STR を含まない）の gzip 観測 RU バイト列"""
+    import datetime
+    import io
+    from app.agent.tools.RU import RU, Header
+
+    hdr = Header()
+    hdr.announced = datetime.datetime(2025, 4, 28, 9, 20, 0)
+    hdr.created = datetime.datetime(2025, 4, 28, 9, 30, 0)
+    hdr.compress_type = "gzip"
+    hdr.global_id = "0200"
+    hdr.category = "6000"
+    hdr.data_id = "41000025"
+    hdr.data_name = "TEST_OBS_FIXED"
+    hdr.format = (
+        "observation_date:[year:INT16,month:INT8,day:INT8,hour:INT8,min:INT8,sec:INT8],"
+        "point_count:INT32,"
+        "point_data:{point_count}[LCLID:<8>NSTR,AIRTMP:INT16,RHUM:INT16,"
+        "WNDSPD_MD:INT16,ARPRSS:INT32,LAT:FLOAT32]"
+    )
+    hdr.header_comment = "TEST_OBS_FIXED"
+    hdr.header_version = "1.0"
+    hdr.revision = "1"
+
+    ru = RU(hdr)
+    root = ru.get_root()
+    root.get_ref("observation_date").set_time(datetime.datetime(2025, 4, 28, 9, 20, 0))
+    n = 500
+    root["point_count"] = n
+    pt_arr = root.get_ref("point_data")
+    ru._set_array_size("point_count", n)
+    pt_arr.resize(n)
+    for i in range(n):
+        pt = pt_arr.get_ref(i)
+        pt["LCLID"] = f"{6200 + i:05d}"
+        pt["AIRTMP"] = 32767 if i % 50 == 0 else i % 300 - 100   # 欠測を混ぜる
+        pt["RHUM"] = 500 + i % 400
+        pt["WNDSPD_MD"] = i % 150
+        pt["ARPRSS"] = 10130 + i % 20
+        pt["LAT"] = 50.0 + i / 1000
+    fp = io.BytesIO()
+    ru.save(fp)
+    return fp.getvalue()
+
+@pytest.fixture
+def ru_caches(tmp_path, monkeypatch):
+    """
+    ru_utils の S3 取得に使うキャッシュをテスト専用に差し替え、ダウンロードキャッシュを返す
+    （メモリキャッシュは空から、Parquet キャッシュは無効、ダウンロードキャッシュは tmp_path 配下）
+    """
+    from app.utils import ru_utils
+    from app.utils.download_cache import DownloadCache
+    from app.utils.frame_cache import FrameCache
+
+    frames = FrameCache(1 << 30)
+    downloads = DownloadCache(tmp_path / "s3_cache", max_bytes=1 << 30)
+    monkeypatch.setattr(ru_utils, "get_frame_cache", lambda: frames)
+    monkeypatch.setattr(ru_utils, "get_parquet_cache", lambda: None)
+    monkeypatch.setattr(ru_utils, "get_download_cache", lambda: downloads)
+    return downloads
@@ -0,0 +1,19 @@
+# backend/tests/test_aws_clients.py
+from concurrent.futures import ThreadPoolExecutor
+
+from app.config import get_settings
+from app.utils.aws_clients import clear_clients, get_client
+
+
+def test_clients_are_shared_and_pooled():
+    clear_clients()
+    with ThreadPoolExecutor(8) as pool:
+        clients = list(pool.map(lambda _: get_client("s3", region_name="ap-northeast-1"), range(16)))
+    assert all(c is clients[0] for c in clients)
+    assert get_client("s3", region_name="us-east-1") is not clients[0]
+
+    config = clients[0].meta.config
+    assert config.max_pool_connections == get_settings().aws_max_pool_connections
+    assert config.retries["mode"] == "adaptive"
+    assert config.tcp_keepalive is True
+    clear_clients()
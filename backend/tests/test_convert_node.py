@@ -48,3 +48,21 @@ def test_convert_csv_content():
 
     # AIRTMP 列（気温コード）が存在する
     assert "AIRTMP" in df.columns
+
+# --------------------------------------------------
+# 4) 逐次書き出しの CSV が連結してから書いた場合と一致
+# --------------------------------------------------
+def test_convert_csv_stream_matches_concat(tmp_path):
+    from app.agent.tools.convert_node import _write_csv_stream
+    from app.utils.ru_utils import load_ru_many
+
+    csv_path = convert_node.func([str(SAMPLE), str(SAMPLE)], "csv")[0]
+    expected = tmp_path / "expected.csv"
+    load_ru_many([SAMPLE, SAMPLE]).to_csv(expected, index=False)
+    assert Path(csv_path).read_text() == expected.read_text()
+
+    # 途中で型が変わる場合は連結の結果で書き直す
+    frames = [pd.DataFrame({"a": [1, 2]}), pd.DataFrame({"a": [0.5]}), pd.DataFrame({"b": [3]})]
+    out = tmp_path / "mixed.csv"
+    _write_csv_stream(iter(frames), str(out))
+    pd.testing.assert_frame_equal(pd.read_csv(out), pd.concat(frames, ignore_index=True))
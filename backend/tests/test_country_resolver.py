@@ -13,3 +13,33 @@ def test_country_resolver(monkeypatch):
     tags = find_tag_ids_by_country(name)
     # metadata.json 内に 1 件以上ある想定
     assert tags and isinstance(tags[0], str)
+
+
+def test_offline_aliases(monkeypatch):
+    def no_llm(prompt):
+        raise AssertionError("LLM must not be called")
+
+    monkeypatch.setattr("app.utils.country_resolver.invoke_claude", no_llm)
+    for raw, expected in [
+        ("オランダ", "Netherlands"), ("ねざーらんど", "Netherlands"), ("Holland", "Netherlands"),
+        ("独", "Germany"), ("ドイツ連邦共和国", "Germany"), ("ＤＥ", "Germany"),
+        ("デンマーク国", "Denmark"), ("Netherland", "Netherlands"), ("germny", "Germany"),
+    ]:
+        assert resolve_country_name(raw) == expected, raw
+
+    assert find_tag_ids_by_country("独") == find_tag_ids_by_country("Germany")
+    assert len(find_tag_ids_by_country("germany")) == 2
+    assert find_tag_ids_by_country("Atlantis") == []
+
+
+def test_llm_fallback_is_cached(monkeypatch):
+    calls = []
+
+    def fake(prompt):
+        calls.append(prompt)
+        return "The Netherlands"
+
+    monkeypatch.setattr("app.utils.country_resolver.invoke_claude", fake)
+    assert resolve_country_name("ネーデルランツ王立連合") == "Netherlands"
+    assert resolve_country_name("ネーデルランツ王立連合") == "Netherlands"
+    assert len(calls) == 1
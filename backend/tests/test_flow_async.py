@@ -0,0 +1,70 @@
+# backend/tests/test_flow_async.py
+import asyncio
+import time
+from pathlib import Path
+
+from app.agent import flow
+from app.agent.tools.s3_fetcher import LoadRuFilesTool
+from app.utils.ru_utils import load_ru_many
+
+STATE = {"parsed": {"tag_id": "441000205", "start_dt": "2025-04-28T09:00:00", "vars": ["AIRTMP"]}}
+SAMPLE = Path(__file__).parent / "data" / "sample.ru"
+
+
+async def _slow_arun(self, tag_id, start_dt, end_dt=None, columns=None, in_memory=None):
+    await asyncio.sleep(0.3)
+    return [f"s3://bucket/{tag_id}/{start_dt}"]
+
+
+def test_graph_ainvoke_awaits_arun_on_one_loop(monkeypatch):
+    awaited = []
+
+    async def arun(self, tag_id, start_dt, end_dt=None, columns=None, in_memory=None):
+        awaited.append(tag_id)
+        await asyncio.sleep(0.3)
+        return [str(SAMPLE)]
+
+    def no_sync(self, **kwargs):
+        raise AssertionError("ainvoke must not use the sync _run")
+
+    monkeypatch.setattr(LoadRuFilesTool, "_arun", arun)
+    monkeypatch.setattr(LoadRuFilesTool, "_run", no_sync)
+    decoded = []
+
+    def counting(files, **kwargs):
+        decoded.append(files)
+        return load_ru_many(files, **kwargs)
+
+    monkeypatch.setattr(flow, "load_ru_many", counting)
+
+    async def burst():
+        # interpret（規則で解釈、LLM 無し）→ fetch（_arun を await）→ decode → …
+        return await asyncio.gather(
+            *(flow.graph.ainvoke({"input": "441000205 2025-04-28 09:00"}) for _ in range(5))
+        )
+
+    t0 = time.perf_counter()
+    results = asyncio.run(burst())
+    # 5 件の取得がイベントループ上で重なる（直列なら 1.5 秒）
+    assert time.perf_counter() - t0 < 1.0
+    assert awaited == ["441000205"] * 5
+    # 取得したファイルは decode まで流れる
+    assert all(r["parsed"]["tag_id"] == "441000205" for r in results)
+    assert decoded == [[str(SAMPLE)]] * 5
+
+
+def test_graph_entry_points():
+    assert flow.route_start({"input": "x"}) == "interpret"
+    assert flow.route_start({"parsed": {"tag_id": "441000205"}}) == "fetch"
+    assert flow.route_start({"parsed": {}, "files": ["a.ru"]}) == "decode"
+    assert asyncio.run(flow.afetch_node({"parsed": {}})) == {"files": ["Error: insufficient keys"]}
+
+
+def test_sync_run_inside_running_loop(monkeypatch):
+    monkeypatch.setattr(LoadRuFilesTool, "_arun", _slow_arun)
+
+    async def call_sync():
+        # langserve 配下など、ループ実行中に同期版が呼ばれても失敗しない
+        return flow.fetch_node(STATE)
+
+    assert asyncio.run(call_sync())["files"] == ["s3://bucket/441000205/2025-04-28T09:00:00"]
@@ -0,0 +1,89 @@
+# backend/tests/test_flow_dataset.py
+import matplotlib
+matplotlib.use("Agg")
+
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from app.agent import flow
+from app.agent.tools import convert_node, viz_node
+from app.utils.dataset_store import DatasetStore, get_dataset_store
+from app.utils.ru_utils import load_ru_many
+
+SAMPLE = Path(__file__).parent / "data" / "sample.ru"
+
+
+@pytest.fixture(autouse=True)
+def _chart_dir(tmp_path, monkeypatch):
+    """グラフ画像はテスト毎の一時ディレクトリへ（ツリーに残さない）"""
+    monkeypatch.setattr(viz_node, "_TMP", tmp_path)
+
+
+@pytest.fixture
+def decode_calls(monkeypatch):
+    """グラフ内のデコード回数を数え、decode ノード以外でのデコードを禁止する"""
+    calls = []
+
+    def counting(files, columns=None, **kwargs):
+        df = load_ru_many(files, columns=columns, **kwargs)
+        calls.append((list(files), df))
+        return df
+
+    def forbidden(*args, **kwargs):
+        raise AssertionError("decoded outside the decode node")
+
+    monkeypatch.setattr(flow, "load_ru_many", counting)
+    monkeypatch.setattr(convert_node, "load_ru_many", forbidden)
+    monkeypatch.setattr(convert_node, "iter_ru_many", forbidden)
+    monkeypatch.setattr(viz_node, "load_ru_many", forbidden)
+    return calls
+
+
+def test_graph_decodes_once_and_releases_dataset(decode_calls):
+    parsed = {"format": "csv", "chart": "bar", "x": "announced", "y": "AIRTMP"}
+    store = get_dataset_store()
+    before = len(store)
+    res = flow.graph.invoke({"files": [str(SAMPLE), str(SAMPLE)], "parsed": parsed})
+    assert [files for files, _ in decode_calls] == [[str(SAMPLE), str(SAMPLE)]]
+    assert res["images"] and Path(res["images"][0]).exists()
+
+    expected = load_ru_many([SAMPLE, SAMPLE], columns=flow.requested_columns(parsed))
+    pd.testing.assert_frame_equal(decode_calls[0][1], expected)
+    assert pd.read_csv(res["files"][0]).shape == expected.shape
+    # finish ノードで手放す（実行毎に置き場へ残さない）
+    assert res["dataset"] is None and len(store) == before
+
+
+def test_fallback_receives_copy_of_shared_dataset(decode_calls, monkeypatch, tmp_path):
+    received = {}
+
+    def stub(ctx):
+        received.update(ctx)
+        path = tmp_path / "fallback.csv"
+        ctx["df"].to_csv(path, index=False)
+        ctx["df"].drop(columns=["AIRTMP"], inplace=True)   # 生成コードの破壊的な変更
+        return {"files": [str(path)]}
+
+    monkeypatch.setattr(flow, "fallback_node", stub)
+    state = flow.decode_node({"files": [str(SAMPLE)], "parsed": {"format": "csv"}})
+    shared = get_dataset_store().get(state["dataset"])
+    res = flow.run_fallback_node({**state, "parsed": {"format": "csv"}, "error": "boom"})
+
+    assert received["format"] == "csv" and received["df"] is not shared
+    assert len(pd.read_csv(res["files"][0])) == len(shared)
+    assert "AIRTMP" in shared.columns
+    assert flow.run_fallback_node({"parsed": {}, "error": "boom"}) == {"error": "boom"}
+    get_dataset_store().release(state["dataset"])
+
+
+def test_store_evicts_oldest_but_keeps_newest():
+    df = pd.DataFrame({"a": range(100)})
+    size = int(df.memory_usage(deep=True, index=True).sum())
+    store = DatasetStore(max_bytes=size * 2)
+    handles = [store.put(df) for _ in range(3)]
+    assert store.get(handles[0]) is None and store.get(handles[2]) is df
+    big = store.put(pd.concat([df] * 5))
+    assert store.get(big) is not None and len(store) == 1
+    store.release(big)
+    assert store.stats()["bytes"] == 0 and store.get(None) is None
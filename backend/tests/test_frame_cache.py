@@ -0,0 +1,45 @@
+# backend/tests/test_frame_cache.py
+import os
+
+import pandas as pd
+from app.utils.frame_cache import FrameCache, get_frame_cache
+from app.utils.ru_utils import load_ru
+
+
+def test_lru_eviction_by_bytes():
+    df = pd.DataFrame({"a": range(100)})
+    size = int(df.memory_usage(deep=True, index=True).sum())
+    cache = FrameCache(max_bytes=size * 2)
+
+    cache.put("x", df)
+    cache.put("y", df)
+    assert cache.get("x") is not None          # x を最新に
+    cache.put("z", df)                         # 最古の y が追い出される
+    assert cache.get("y") is None
+    assert cache.stats() == {
+        "entries": 2, "bytes": size * 2, "max_bytes": size * 2,
+        "hits": 1, "misses": 1, "evictions": 1,
+    }
+
+    # 受け取ったフレームを書き換えてもキャッシュは汚れない
+    got = cache.get("x")
+    got["b"] = 1
+    assert list(cache.get("x").columns) == ["a"]
+
+
+def test_load_ru_shares_cache(tmp_path, sample_obs_ru):
+    path = tmp_path / "obs.ru"
+    path.write_bytes(sample_obs_ru.read_bytes())
+    cache = get_frame_cache()
+    cache.clear()
+    hits, misses = cache.hits, cache.misses
+
+    first = load_ru(path)
+    pd.testing.assert_frame_equal(load_ru(path), first)
+    assert (cache.hits - hits, cache.misses - misses) == (1, 1)
+
+    # mtime が変われば再デコード
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    load_ru(path)
+    assert cache.misses - misses == 2
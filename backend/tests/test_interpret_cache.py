@@ -0,0 +1,105 @@
+# backend/tests/test_interpret_cache.py
+from app.utils.interpret_cache import InterpretCache, normalize_query
+
+QUERY = "TagID 441000205 の  {start} から {end} までの気温を CSV で"
+
+
+def _llm(calls):
+    def interpret(text):
+        calls.append(text)
+        key, dts, tags = normalize_query(text)
+        return {
+            "tag_id": tags[0],
+            "start_dt": dts[0].strftime("%Y-%m-%dT%H:%M:%S"),
+            "end_dt": dts[1].strftime("%Y-%m-%d %H:%M:%S"),
+            "format": "csv",
+            "vars": ["AIRTMP"],
+        }
+    return interpret
+
+
+def test_normalize_abstracts_slots():
+    key, dts, tags = normalize_query("ＴａｇＩＤ 441000205   の 2025/04/28 09:00 から 2025年4月28日12時")
+    assert key == "tagid <tag0> の <dt0> から <dt1>"
+    assert [d.hour for d in dts] == [9, 12] and tags == ["441000205"]
+
+
+def test_hit_refills_slots():
+    cache, calls = InterpretCache(16, 3600), []
+    first = cache.get_or_interpret(
+        QUERY.format(start="2025-04-28 09:00", end="2025-04-28 12:00"), _llm(calls)
+    )
+    # 空白・大小文字と日時・TagID だけが違う同じ定型文
+    again = cache.get_or_interpret(
+        "tagid 441000999 の {s} から {e} までの気温を csv で".format(s="2025-05-01 00:00", e="2025-05-01 06:30"),
+        _llm(calls),
+    )
+    assert len(calls) == 1
+    assert first["start_dt"] == "2025-04-28T09:00:00"
+    assert again == {
+        "tag_id": "441000999", "start_dt": "2025-05-01T00:00:00", "end_dt": "2025-05-01 06:30:00",
+        "format": "csv", "vars": ["AIRTMP"],
+    }
+    assert cache.stats()["hit_rate"] == 0.5
+
+
+def test_relative_and_unanchored_datetimes():
+    cache = InterpretCache(16, 3600)
+    # 入力の日時からのずれは保つ
+    assert cache.put("2025-04-28 09:00 から 3 時間", {"start_dt": "2025-04-28T09:00:00", "end_dt": "2025-04-28T12:00:00"})
+    assert cache.get("2025-06-01 00:00 から 3 時間")["end_dt"] == "2025-06-01T03:00:00"
+    # 「昨日」を LLM が解決した結果は保存しない
+    assert not cache.put("昨日の気温", {"start_dt": "2025-04-27T00:00:00"})
+    assert not cache.put("オランダの気温", {"tag_id": "441000205"})
+    assert not cache.put("壊れた応答", {})
+    assert cache.stats()["uncacheable"] == 2
+
+
+def test_non_string_slot_fields_are_uncacheable():
+    cache = InterpretCache(16, 3600)
+    # 数値や複数の TagID はスロットから埋め直せないので、次の入力に前回の値を返さない
+    assert not cache.put("TagID 441000205 の気温", {"tag_id": 441000205})
+    assert not cache.put("TagID 441000205 と 441000206 の気温", {"tag_id": ["441000205", "441000206"]})
+    assert not cache.put("2025-04-28 09:00 の気温", {"start_dt": ["2025-04-28T09:00:00"]})
+    assert cache.get("TagID 441000999 の気温") is None
+    assert cache.stats()["uncacheable"] == 3
+    # 値が無い（None）の項目は雛形にできる
+    assert cache.put("気温", {"tag_id": None, "vars": ["AIRTMP"]})
+
+
+def test_ttl_lru_and_persistence(tmp_path, monkeypatch):
+    path = tmp_path / "interpret.json"
+    cache = InterpretCache(2, 3600, path)
+    for i in range(3):
+        cache.put(f"query {i} 2025-04-28 09:00", {"start_dt": "2025-04-28T09:00:00", "format": str(i)})
+    assert cache.get("query 0 2025-04-28 09:00") is None and cache.evictions == 1
+
+    # 再起動後も使える
+    reloaded = InterpretCache(2, 3600, path)
+    assert reloaded.get("query 2 2025-05-01 10:00") == {"start_dt": "2025-05-01T10:00:00", "format": "2"}
+
+    import app.utils.interpret_cache as mod
+    now = mod.time.time()
+    monkeypatch.setattr(mod.time, "time", lambda: now + 7200)
+    assert reloaded.get("query 2 2025-05-01 10:00") is None
+    assert InterpretCache(2, 3600, path).stats()["entries"] == 0
+
+
+def test_interpret_node_skips_llm_on_hit(monkeypatch):
+    import json
+    from app.agent import flow
+
+    calls = []
+
+    def fake_claude(prompt):
+        calls.append(prompt)
+        return json.dumps({"tag_id": "441000205", "start_dt": "2025-04-28T09:00:00", "format": "csv"})
+
+    cache = InterpretCache(16, 3600)
+    monkeypatch.setattr(flow, "invoke_claude", fake_claude)
+    monkeypatch.setattr(flow, "get_interpret_cache", lambda: cache)
+
+    flow.interpret_node({"input": "441000205 の 2025-04-28 09:00 の観測を CSV で"})
+    res = flow.interpret_node({"input": "441000777 の 2025-04-29 18:00 の観測を CSV で"})
+    assert len(calls) == 1
+    assert res["parsed"]["tag_id"] == "441000777" and res["parsed"]["start_dt"] == "2025-04-29T18:00:00"
@@ -0,0 +1,60 @@
+# backend/tests/test_metadata_registry.py
+import json
+import os
+
+from app.services.data_loader import MetadataRegistry, find_by_tag
+
+ROWS = [
+    {"TagID": "100000001", "country": "Germany", "organization": "DWD", "observation_type": "AWS"},
+    {"TagID": "100000002", "country": "Germany", "organization": "DWD", "observation_type": "SYNOP"},
+    {"TagID": "100000003", "country": "Denmark", "organization": "DMI", "observation_type": "AWS"},
+]
+
+
+def _write(path, rows, bump_ns=0):
+    path.write_text(json.dumps(rows), encoding="utf-8")
+    if bump_ns:
+        st = path.stat()
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + bump_ns))
+
+
+def test_indexes(tmp_path):
+    path = tmp_path / "metadata.json"
+    _write(path, ROWS)
+    reg = MetadataRegistry(path, reload_sec=-1)
+    assert reg.by_tag("100000003")["organization"] == "DMI"
+    assert reg.by_tag("999999999") is None
+    assert reg.tag_ids_by_country("GERMANY") == ["100000001", "100000002"]
+    assert [r["TagID"] for r in reg.by_organization("dmi")] == ["100000003"]
+    assert len(reg.by_observation_type("aws")) == 2
+    assert len(reg) == 3
+
+
+def test_reloads_on_mtime_change(tmp_path):
+    path = tmp_path / "metadata.json"
+    _write(path, ROWS[:1])
+    reg = MetadataRegistry(path, reload_sec=0)
+    assert reg.by_tag("100000002") is None
+
+    _write(path, ROWS, bump_ns=10**9)
+    assert reg.by_tag("100000002")["observation_type"] == "SYNOP"
+    assert reg.reloads == 1
+
+    # 壊れた書き換えは無視して直前の版を使い続ける
+    path.write_text("[{", encoding="utf-8")
+    os.utime(path, ns=(0, path.stat().st_mtime_ns + 2 * 10**9))
+    assert len(reg) == 3
+    assert reg.reloads == 1
+
+
+def test_reload_interval(tmp_path):
+    path = tmp_path / "metadata.json"
+    _write(path, ROWS[:1])
+    reg = MetadataRegistry(path, reload_sec=3600)
+    _write(path, ROWS, bump_ns=10**9)
+    assert len(reg) == 1                       # 間隔内は stat もしない
+
+
+def test_find_by_tag_uses_file_key():
+    # metadata.json のキーは "TagID"
+    assert find_by_tag("441000205")["country"] == "Germany"
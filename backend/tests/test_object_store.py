@@ -0,0 +1,72 @@
+# backend/tests/test_object_store.py
+import asyncio
+import time
+from datetime import datetime
+
+import pytest
+from app.agent.tools import s3_loader
+from app.utils import ru_utils
+from app.utils.object_store import LocalObjectStore, NoSuchKey
+
+PREFIX = "441000205/2025/04/28/"
+
+
+@pytest.fixture
+def store(tmp_path, sample_obs_ru):
+    root = tmp_path / "s3"
+    day = root / "bucket" / PREFIX
+    day.mkdir(parents=True)
+    for m in (0, 10, 20, 30, 40):
+        (day / f"2025042809{m:02d}00.ea2008d2").write_bytes(sample_obs_ru.read_bytes())
+    (root / "bucket" / "441000205" / "location.json").write_text("{}")
+    return LocalObjectStore(root, page_size=2)
+
+
+def test_listing_pages_like_s3(store):
+    keys, token = [], None
+    while True:
+        kwargs = {"ContinuationToken": token} if token else {}
+        page = store.list_objects_v2(Bucket="bucket", Prefix=PREFIX, **kwargs)
+        keys += [obj["Key"] for obj in page["Contents"]]
+        if not page["IsTruncated"]:
+            break
+        token = page["NextContinuationToken"]
+    assert keys == sorted(keys) and len(keys) == 5 and all(k.startswith(PREFIX) for k in keys)
+    assert "Contents" not in store.list_objects_v2(Bucket="bucket", Prefix="441000205/2025/04/29/")
+
+
+def test_objects_and_errors(store, sample_obs_ru):
+    key = PREFIX + "20250428090000.ea2008d2"
+    obj = store.get_object(Bucket="bucket", Key=key)
+    assert obj["Body"].read() == sample_obs_ru.read_bytes()
+    assert obj["ETag"] == store.head_object(Bucket="bucket", Key=key)["ETag"]
+    with pytest.raises(store.exceptions.NoSuchKey):
+        store.get_object(Bucket="bucket", Key=PREFIX + "missing")
+    with pytest.raises(ValueError):
+        store.get_object(Bucket="bucket", Key="../../etc/passwd")
+    assert issubclass(NoSuchKey, store.exceptions.ClientError)
+
+
+def test_latency_and_bandwidth(store, sample_obs_ru, tmp_path):
+    size = len(sample_obs_ru.read_bytes())
+    slow = LocalObjectStore(store.root, latency_sec=0.05, bandwidth_bps=size / 0.2)
+    t0 = time.perf_counter()
+    slow.download_file("bucket", PREFIX + "20250428090000.ea2008d2", str(tmp_path / "x"))
+    assert time.perf_counter() - t0 >= 0.25
+    assert (tmp_path / "x").read_bytes() == sample_obs_ru.read_bytes()
+
+
+def test_fetch_path_runs_offline(store, sample_obs_ru, ru_caches, monkeypatch):
+    s3_loader.clear_manifest_cache()
+    monkeypatch.setattr(s3_loader, "get_object_store", lambda *a, **k: store)
+    monkeypatch.setattr(s3_loader, "get_download_cache", lambda: ru_caches)
+
+    start, end = datetime(2025, 4, 28, 9, 5), datetime(2025, 4, 28, 9, 30)
+    frames = asyncio.run(s3_loader.fetch_frames_from_s3("bucket", [PREFIX], start, end, persist=False))
+    assert [uri.rsplit("/", 1)[-1][8:12] for uri in frames] == ["0910", "0920", "0930"]
+    expected = ru_utils.load_ru(sample_obs_ru)
+    assert all(df.equals(expected) for df in frames.values())
+
+    files = asyncio.run(s3_loader.load_from_s3("bucket", [PREFIX], start, end))
+    assert len(files) == 3
+    s3_loader.clear_manifest_cache()
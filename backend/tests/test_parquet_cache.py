@@ -0,0 +1,53 @@
+# backend/tests/test_parquet_cache.py
+import pandas as pd
+from app.utils import ru_utils
+from app.utils.frame_cache import get_frame_cache
+from app.utils.parquet_cache import ParquetCache, register_s3_object, s3_object_of
+
+
+def test_s3_objects_persist_as_parquet(tmp_path, monkeypatch, sample_obs_ru):
+    path = tmp_path / "20250428092000.obs"
+    path.write_bytes(sample_obs_ru.read_bytes())
+    register_s3_object(path, "441000205/2025/04/28/20250428092000.obs", '"abc"')
+    assert s3_object_of(path) == ("441000205/2025/04/28/20250428092000.obs", "abc")
+
+    disk = ParquetCache(tmp_path / "cache", max_bytes=1 << 30)
+    monkeypatch.setattr(ru_utils, "get_parquet_cache", lambda: disk)
+    get_frame_cache().clear()
+    expected = ru_utils.load_ru(path)
+    assert disk.misses == 1 and disk.bytes > 0
+
+    # 再起動相当: メモリキャッシュも空、新しいインスタンスで同じディレクトリを使う
+    get_frame_cache().clear()
+    restarted = ParquetCache(tmp_path / "cache", max_bytes=1 << 30)
+    assert restarted.bytes == disk.bytes
+    monkeypatch.setattr(ru_utils, "get_parquet_cache", lambda: restarted)
+    pd.testing.assert_frame_equal(ru_utils.load_ru(path), expected)
+    assert restarted.hits == 1
+
+    # ETag が変われば別エントリ
+    register_s3_object(path, "441000205/2025/04/28/20250428092000.obs", '"def"')
+    assert restarted.get(s3_object_of(path)) is None
+
+
+def test_eviction_keeps_total_under_cap(tmp_path):
+    df = pd.DataFrame({"a": range(1000)})
+    cache = ParquetCache(tmp_path, max_bytes=1 << 30)
+    cache.put(("k0", "e"), df)
+    one = cache.bytes
+
+    cache = ParquetCache(tmp_path, max_bytes=one * 2)
+    cache.put(("k1", "e"), df)
+    cache.put(("k2", "e"), df)             # 最古の k0 が消える
+    assert cache.evictions == 1 and cache.bytes <= one * 2
+    assert cache.get(("k0", "e")) is None
+    assert cache.get(("k2", "e")) is not None
+
+
+def test_overwrite_does_not_double_count(tmp_path):
+    df = pd.DataFrame({"a": range(1000)})
+    cache = ParquetCache(tmp_path, max_bytes=1 << 30)
+    cache.put(("k0", "e"), df)
+    one = cache.bytes
+    cache.put(("k0", "e"), df)             # 同じ名前への上書き
+    assert cache.bytes == one == ParquetCache(tmp_path, max_bytes=1 << 30).bytes
@@ -0,0 +1,40 @@
+# backend/tests/test_query_parser.py
+import pytest
+from app.utils.query_parser import parse_structured_query
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("441000205 2025-04-17 15:00 to 16:00 csv",
+     {"tag_id": "441000205", "start_dt": "2025-04-17T15:00:00", "end_dt": "2025-04-17T16:00:00", "format": "csv"}),
+    ("441000205 2025-04-17T15:00:00 JSON AIRTMP, 気温",
+     {"tag_id": "441000205", "start_dt": "2025-04-17T15:00:00", "format": "json", "vars": ["AIRTMP"]}),
+    ("４４１０００２０５　2025/04/17 15:00 〜 2025/04/18 03:00 bar x=announced y=AIRTMP",
+     {"tag_id": "441000205", "start_dt": "2025-04-17T15:00:00", "end_dt": "2025-04-18T03:00:00",
+      "chart": "bar", "x": "announced", "y": "AIRTMP"}),
+])
+def test_structured_queries(query, expected):
+    assert parse_structured_query(query) == expected
+
+
+@pytest.mark.parametrize("query", [
+    "オランダの 2025-04-17 15:00 の気温",              # TagID 無し（国名は LLM で）
+    "show me 441000205 2025-04-17 15:00 csv",           # 説明できない語
+    "441000205 2025-04-17 csv",                          # 日付だけ
+    "441000205 2025-04-17 16:00 to 15:00 csv",           # 逆順の範囲
+    "441000205 441000206 2025-04-17 15:00 csv",          # TagID が複数
+    "441000205 2025-04-17 15:00 csv json",               # 形式が複数
+    "441000205 2025-04-17 15:00 scatter x=UNKNOWN",      # 未知の列
+])
+def test_low_confidence_falls_back(query):
+    assert parse_structured_query(query) is None
+
+
+def test_interpret_node_skips_llm(monkeypatch):
+    from app.agent import flow
+
+    def no_llm(prompt):
+        raise AssertionError("LLM must not be called")
+
+    monkeypatch.setattr(flow, "invoke_claude", no_llm)
+    res = flow.interpret_node({"input": "441000205 2025-04-17 15:00 to 16:00 csv"})
+    assert res["parsed"]["end_dt"] == "2025-04-17T16:00:00"
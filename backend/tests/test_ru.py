@@ -0,0 +1,160 @@
+# backend/tests/test_ru.py
+import copy
+import io
+
+import numpy as np
+from app.agent.tools.RU import RU, Header, MappedFile, compile_format, parse_header
+
+
+def _load(data: bytes, **kwargs) -> RU:
+    ru = RU()
+    ru.load(io.BytesIO(data), **kwargs)
+    return ru
+
+def test_columnar_matches_generic(fixed_obs_ru):
+    generic = _load(fixed_obs_ru).get_root().get_ref("point_data")
+    columnar = _load(fixed_obs_ru, columnar=True).get_root().get_ref("point_data")
+
+    assert columnar.is_columnar() and not generic.is_columnar()
+    assert len(columnar) == len(generic) == 500
+
+    cols = columnar.get_columns()
+    expected = generic.get_columns()
+    assert list(cols) == list(expected)
+    for key in ("AIRTMP", "RHUM", "WNDSPD_MD", "ARPRSS"):
+        assert isinstance(cols[key], np.ndarray) and cols[key].dtype.isnative
+        assert cols[key].tolist() == expected[key]
+    np.testing.assert_allclose(cols["LAT"], expected["LAT"])
+    # 固定長文字列は木構造のデコードと同じく NUL 詰めのまま
+    assert cols["LCLID"] == expected["LCLID"] and cols["LCLID"][0] == "06200\x00\x00\x00"
+
+def test_columnar_falls_back_for_variable_length(sample_obs_ru):
+    pt_arr = _load(sample_obs_ru.read_bytes(), columnar=True).get_root().get_ref("point_data")
+    # STR（可変長）を含む struct は従来の逐次デコード
+    assert not pt_arr.is_columnar()
+    assert len(pt_arr.get_columns()["AIRTMP"]) == len(pt_arr) > 0
+
+def test_compiled_matches_tree(sample_obs_ru, fixed_obs_ru):
+    for data in (sample_obs_ru.read_bytes(), fixed_obs_ru):
+        tree = _load(data).get_root()
+        values = RU().load_values(io.BytesIO(data))
+
+        assert values["point_count"] == tree["point_count"]
+        assert values["observation_date"]["year"] == tree.get_ref("observation_date")["year"]
+        assert values["point_data"] == tree.get_ref("point_data").get_columns()
+        # 列指向（NumPy）でも文字列は同じ値
+        columnar = RU().load_values(io.BytesIO(data), columnar=True)["point_data"]
+        assert columnar["LCLID"] == values["point_data"]["LCLID"]
+
+def test_compiled_format_is_memoized(fixed_obs_ru):
+    compile_format.cache_clear()
+    for _ in range(3):
+        values = RU().load_values(io.BytesIO(fixed_obs_ru), columnar=True)
+    info = compile_format.cache_info()
+    assert info.misses == 1 and info.hits == 2
+    assert isinstance(values["point_data"]["AIRTMP"], np.ndarray)
+
+def test_iter_records_streams_small_chunks(sample_obs_ru, fixed_obs_ru):
+    for data in (sample_obs_ru.read_bytes(), fixed_obs_ru):
+        expected = RU().load_values(io.BytesIO(data))["point_data"]
+
+        ru = RU()
+        records = list(ru.iter_records(io.BytesIO(data), "point_data", chunk_size=64))
+        assert ru.get_values()["point_count"] == len(records)
+        assert [r["AIRTMP"] for r in records] == expected["AIRTMP"]
+
+        batches = list(RU().iter_records(io.BytesIO(data), batch_size=32, chunk_size=64))
+        assert max(len(b["RHUM"]) for b in batches) == 32
+        assert sum((list(b["RHUM"]) for b in batches), []) == expected["RHUM"]
+
+def test_iter_records_bzip2(sample_obs_ru):
+    ru = RU()
+    ru.load(io.BytesIO(sample_obs_ru.read_bytes()))
+    ru.get_header()["compress_type"] = "bzip2"
+    fp = io.BytesIO()
+    ru.save(fp)
+
+    records = list(RU().iter_records(io.BytesIO(fp.getvalue()), chunk_size=128))
+    assert len(records) == ru.get_root()["point_count"]
+
+def test_parse_header_buffer_and_stream(sample_obs_ru):
+    data = sample_obs_ru.read_bytes()
+    offset = data.find(b"\x04\x1a") + 2
+
+    for buf in (data, bytearray(data), memoryview(data)):
+        hdr, body_offset = parse_header(buf)
+        assert body_offset == offset
+        assert hdr["compress_type"] == "gzip" and hdr["data_size"] == len(data) - offset
+
+    # seekable I/O はヘッダ直後に位置付けられる
+    fp = io.BytesIO(data)
+    Header().load(fp)
+    assert fp.tell() == offset
+
+    # 非 seek ストリームは従来どおり 1 バイトずつ
+    class _Stream(io.RawIOBase):
+        def __init__(self, b): self._fp = io.BytesIO(b)
+        def readable(self): return True
+        def seekable(self): return False
+        def read(self, n=-1): return self._fp.read(n)
+
+    ru = RU()
+    ru.load(_Stream(data))
+    assert ru.get_root()["point_count"] == 70
+
+def test_projection_decodes_requested_columns(sample_obs_ru, fixed_obs_ru):
+    for data in (sample_obs_ru.read_bytes(), fixed_obs_ru):
+        full = RU()
+        full.load(io.BytesIO(data))
+        points = full.get_root()["point_data"]
+
+        for columnar in (False, True):
+            batches = list(RU().iter_records(
+                io.BytesIO(data), batch_size=64, columnar=columnar,
+                columns=["AIRTMP", "RHUM", "NOT_IN_FORMAT"],
+            ))
+            cols = {k: np.concatenate([np.asarray(b[k]) for b in batches]) for k in batches[0]}
+            assert set(cols) == {"AIRTMP", "RHUM"}
+            assert cols["AIRTMP"].tolist() == [p["AIRTMP"] for p in points]
+
+def test_mapped_file_decodes_in_place(tmp_path, fixed_obs_ru):
+    # 非圧縮ボディは mmap 上でそのままデコード
+    ru = _load(fixed_obs_ru)
+    ru.get_header().compress_type = ""
+    fp = io.BytesIO()
+    ru.save(fp)
+    path = tmp_path / "plain.ru"
+    path.write_bytes(fp.getvalue())
+
+    expected = RU().load_values(io.BytesIO(fp.getvalue()), columnar=True)["point_data"]
+    with MappedFile(path) as src:
+        values = RU().load_values(src, columnar=True)["point_data"]
+        src.seek(0)
+        tree = RU()
+        tree.load(src)
+    for key, col in expected.items():
+        assert np.array_equal(values[key], col)
+    assert [p["LCLID"] for p in tree.get_root()["point_data"]] == expected["LCLID"]
+
+    # '+' 配列（サイズ無し）もコピー無しで末尾まで読む
+    hdr = copy.deepcopy(ru.get_header())
+    hdr.format = "count:INT8,items:+[id:INT16,name:STR]"
+    plus = RU(hdr)
+    plus.get_root()["count"] = 3
+    items = plus.get_root().get_ref("items")
+    items.resize(3)
+    for i in range(3):
+        items.get_ref(i)["id"] = i * 100
+        items.get_ref(i)["name"] = "地点%d" % i
+    fp = io.BytesIO()
+    plus.save(fp)
+    path = tmp_path / "plus.ru"
+    path.write_bytes(fp.getvalue())
+    with MappedFile(path) as src:
+        loaded = RU()
+        loaded.load(src)
+        src.seek(0)
+        values = RU().load_values(src)
+    assert [(p["id"], p["name"]) for p in loaded.get_root()["items"]] == \
+        [(i * 100, "地点%d" % i) for i in range(3)]
+    assert values["items"]["name"] == ["地点0", "地点1", "地点2"]
@@ -1,7 +1,8 @@
 # backend/tests/test_ru_utils.py
+import numpy as np
 import pandas as pd
 import pytest
-from app.utils.ru_utils import load_ru, load_geojson
+from app.utils.ru_utils import load_ru, load_ru_many, load_geojson, requested_columns
 
 def test_load_geojson(sample_geojson):
     geojson = load_geojson("441000205")
@@ -15,4 +16,54 @@ def test_load_gzip_obs(sample_obs_ru):
     # 時刻＋代表的な変数列
     assert {"time", "AIRTMP", "WNDSPD_MD"}.issubset(df.columns)
     # スケール適用後、気温が plausible 範囲にあること
-    assert df["AIRTMP"].dropna().between(-50, 60).all()
\ No newline at end of file
+    assert df["AIRTMP"].dropna().between(-50, 60).all()
+
+def test_load_ru_projection(tmp_path, sample_obs_ru, fixed_obs_ru):
+    cols = requested_columns({"vars": ["気温"], "x": None, "y": "RHUM"})
+    assert cols[:2] == ["AIRTMP", "RHUM"] and "LCLID" in cols
+    assert requested_columns({"vars": []}) is None
+
+    full = load_ru(sample_obs_ru)
+    df = load_ru(sample_obs_ru, columns=cols)
+    assert set(df.columns) == {"time", "announced", "LCLID", "AIRTMP", "RHUM"}
+    # 射影しても欠測判定は全列基準（要求列が全て欠測の地点も落とさない）
+    assert len(df) == len(full)
+    pd.testing.assert_frame_equal(df, full[list(df.columns)])
+
+    # AIRTMP だけが欠測の地点（i % 50 == 0）も、他の数値列が有効なので残る
+    path = tmp_path / "fixed.ru"
+    path.write_bytes(fixed_obs_ru)
+    df = load_ru(path, columns=["AIRTMP"])
+    assert list(df.columns) == ["time", "announced", "AIRTMP"]
+    assert len(df) == 500 and df["AIRTMP"].isna().sum() == 10
+    pd.testing.assert_frame_equal(df, load_ru(path)[list(df.columns)])
+
+def test_load_gzip_obs_scaling(tmp_path, fixed_obs_ru):
+    path = tmp_path / "fixed.ru"
+    path.write_bytes(fixed_obs_ru)
+    df = load_ru(path)
+
+    assert len(df) == 500 and df["LCLID"].iloc[1] == "06201\x00\x00\x00"
+    # 32767 は欠測、それ以外はスケール補正（0.1）後の値
+    airtmp = [np.nan if i % 50 == 0 else round((i % 300 - 100) * 0.1, 3) for i in range(500)]
+    np.testing.assert_allclose(df["AIRTMP"].to_numpy(), airtmp)
+    assert df["ARPRSS"].dtype == np.float64 and df["time"].dtype == "datetime64[ns]"
+    assert (df["announced"] == pd.Timestamp("2025-04-28 09:20:00")).all()
+
+def test_load_ru_many_keeps_order(tmp_path, sample_obs_ru, fixed_obs_ru):
+    from concurrent.futures import ThreadPoolExecutor
+    from app.utils.frame_cache import get_frame_cache
+
+    paths = []
+    for i in range(4):
+        p = tmp_path / f"2025042809{i}000.obs"
+        p.write_bytes(fixed_obs_ru if i % 2 else sample_obs_ru.read_bytes())
+        paths.append(p)
+    expected = pd.concat([load_ru(p) for p in paths], ignore_index=True)
+
+    # プロセスプール（既定）とスレッドプール（差し替え）で同じ結果
+    get_frame_cache().clear()
+    pd.testing.assert_frame_equal(load_ru_many(paths, max_workers=2), expected)
+    get_frame_cache().clear()
+    with ThreadPoolExecutor(2) as pool:
+        pd.testing.assert_frame_equal(load_ru_many(paths, executor=pool), expected)
@@ -0,0 +1,270 @@
+# backend/tests/test_s3_loader.py
+import asyncio
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+import pytest
+from app.agent.tools import s3_loader
+from app.utils import ru_utils
+
+
+@pytest.fixture(autouse=True)
+def _fresh_caches(ru_caches, monkeypatch):
+    s3_loader.clear_manifest_cache()
+    monkeypatch.setattr(s3_loader, "get_download_cache", lambda: ru_caches)
+    yield ru_caches
+    s3_loader.clear_manifest_cache()
+
+
+def _names(files):
+    """キャッシュ上のパス → 元のファイル名"""
+    return [f.rsplit("/", 1)[-1].split("-", 1)[1] for f in files]
+
+
+class _Body:
+    def __init__(self, data):
+        self._data = data
+
+    def read(self):
+        return self._data
+
+
+class _FakeS3:
+    """list_objects_v2 / download_file / get_object / head_object だけを持つ S3 クライアントのスタブ"""
+
+    def __init__(self, keys, fail=(), body=b""):
+        self.keys = keys
+        self.fail = set(fail)
+        self.body = body
+        self.list_calls = 0
+        self.downloads = 0
+        self.get_calls = 0
+        self.head_calls = 0
+        self.get_threads = []
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def list_objects_v2(self, Bucket, Prefix, ContinuationToken=None):
+        self.list_calls += 1
+        # 1 ページ 3 件でページング
+        objs = [{"Key": k, "ETag": f'"{i}"'} for i, k in enumerate(self.keys) if k.startswith(Prefix)]
+        start = int(ContinuationToken or 0)
+        page = {"Contents": objs[start:start + 3], "IsTruncated": start + 3 < len(objs)}
+        if page["IsTruncated"]:
+            page["NextContinuationToken"] = str(start + 3)
+        return page
+
+    def download_file(self, bucket, key, local_path):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(0.05)
+        with self._lock:
+            self.active -= 1
+        if key in self.fail:
+            raise RuntimeError("boom")
+        self.downloads += 1
+        with open(local_path, "wb") as f:
+            f.write(key.encode())
+
+    def get_object(self, Bucket, Key):
+        with self._lock:
+            self.get_calls += 1
+            self.get_threads.append(threading.current_thread())
+        return {"Body": _Body(self.body)}
+
+    def head_object(self, Bucket, Key):
+        with self._lock:
+            self.head_calls += 1
+        return {"ETag": f'"{self.keys.index(Key)}"'}
+
+
+def test_downloads_run_concurrently_in_order(tmp_path, monkeypatch):
+    keys = [f"441000205/2025/04/28/202504280{h}0000.x" for h in range(8)]
+    fake = _FakeS3(keys, fail=[keys[3]])
+    monkeypatch.setattr(s3_loader, "get_object_store", lambda *a, **k: fake)
+
+    files = asyncio.run(s3_loader.load_from_s3(
+        "bucket", "441000205/2025/04/28/",
+        datetime(2025, 4, 28, 0), datetime(2025, 4, 28, 9), concurrency=4,
+    ))
+
+    # 失敗した 1 件だけ欠け、順序は一覧のまま
+    assert _names(files) == [k.split("/")[-1] for i, k in enumerate(keys) if i != 3]
+    assert 1 < fake.peak <= 4
+
+
+def test_range_across_midnight_lists_every_day(tmp_path, monkeypatch):
+    keys = [f"441000205/2025/04/28/2025042823{m:02d}00.x" for m in range(0, 60, 10)]
+    keys += [f"441000205/2025/04/29/2025042900{m:02d}00.x" for m in range(0, 60, 10)]
+    fake = _FakeS3(keys)
+    monkeypatch.setattr(s3_loader, "get_object_store", lambda *a, **k: fake)
+
+    start, end = datetime(2025, 4, 28, 23, 30), datetime(2025, 4, 29, 0, 20)
+    prefixes = s3_loader.day_prefixes("441000205", start, end)
+    assert prefixes == ["441000205/2025/04/28/", "441000205/2025/04/29/"]
+    assert s3_loader.day_prefixes("441000205", datetime(2025, 4, 29, 0, 10)) == prefixes
+
+    files = asyncio.run(s3_loader.load_from_s3("bucket", prefixes, start, end))
+    assert [n[8:12] for n in _names(files)] == ["2330", "2340", "2350", "0000", "0010", "0020"]
+
+
+def test_manifest_picks_nearest_and_skips_listing(tmp_path, monkeypatch):
+    keys = [f"441000205/2025/04/28/2025042809{m:02d}00.x" for m in (0, 10, 20, 30)]
+    fake = _FakeS3(list(reversed(keys)))
+    monkeypatch.setattr(s3_loader, "get_object_store", lambda *a, **k: fake)
+    prefixes = ["441000205/2025/04/28/"]
+
+    # 先頭ではなく最も近い 09:20
+    files = asyncio.run(s3_loader.load_from_s3("bucket", prefixes, datetime(2025, 4, 28, 9, 22)))
+    assert _names(files) == ["20250428092000.x"]
+    calls = fake.list_calls
+
+    # 過去日の一覧は再利用（list_objects_v2 を呼ばない）
+    files = asyncio.run(s3_loader.load_from_s3(
+        "bucket", prefixes, datetime(2025, 4, 28, 9, 5), datetime(2025, 4, 28, 9, 30)
+    ))
+    assert _names(files) == ["20250428091000.x", "20250428092000.x", "20250428093000.x"]
+    assert fake.list_calls == calls
+    assert asyncio.run(s3_loader.load_from_s3("bucket", prefixes, datetime(2025, 4, 28, 10, 31))) == \
+        ["Error: No matching files"]
+
+
+def test_download_cache_skips_network(monkeypatch, _fresh_caches):
+    keys = [f"441000205/2025/04/28/2025042809{m:02d}00.x" for m in (0, 10)]
+    fake = _FakeS3(keys)
+    monkeypatch.setattr(s3_loader, "get_object_store", lambda *a, **k: fake)
+    args = ("bucket", ["441000205/2025/04/28/"], datetime(2025, 4, 28, 9), datetime(2025, 4, 28, 9, 10))
+
+    first = asyncio.run(s3_loader.load_from_s3(*args))
+    assert fake.downloads == 2
+    assert asyncio.run(s3_loader.load_from_s3(*args)) == first
+    assert fake.downloads == 2 and _fresh_caches.hits == 2
+    assert open(first[0], "rb").read() == keys[0].encode()
+
+    # ETag が変われば別パスに取り直す
+    assert _fresh_caches.path_for("bucket", keys[0], '"new"') != _fresh_caches.path_for("bucket", keys[0], '"0"')
+
+
+def test_fetch_frames_decodes_in_memory(monkeypatch, _fresh_caches, sample_obs_ru):
+    keys = [f"441000205/2025/04/28/2025042809{m:02d}00.x" for m in (0, 10)]
+    fake = _FakeS3(keys, body=sample_obs_ru.read_bytes())
+    monkeypatch.setattr(s3_loader, "get_object_store", lambda *a, **k: fake)
+
+    frames = asyncio.run(s3_loader.fetch_frames_from_s3(
+        "bucket", ["441000205/2025/04/28/"], datetime(2025, 4, 28, 9), datetime(2025, 4, 28, 9, 10),
+        persist=False,
+    ))
+    expected = ru_utils.load_ru(sample_obs_ru)
+    assert list(frames) == [f"s3://bucket/{k}" for k in keys]
+    for df in frames.values():
+        assert df.equals(expected)
+    # 一時ファイルもダウンロードキャッシュも作らない
+    assert fake.downloads == 0 and _fresh_caches.stats()["bytes"] == 0
+
+    # s3:// URI の再読込は一覧の ETag でメモリキャッシュから（head_object も get_object も呼ばない）
+    monkeypatch.setattr(ru_utils, "get_object_store", lambda *a, **k: fake)
+    again = ru_utils.load_ru_many(list(frames))
+    assert fake.get_calls == 2 and fake.head_calls == 0
+    assert len(again) == 2 * len(expected)
+
+    # メモリキャッシュから消えていても、取得は呼び出し元のスレッドでは行わない
+    from concurrent.futures import ThreadPoolExecutor
+    ru_utils.get_frame_cache().clear()
+    with ThreadPoolExecutor(2) as pool:
+        again = ru_utils.load_ru_many(list(frames), executor=pool)
+    assert fake.get_calls == 4 and fake.head_calls == 0
+    assert threading.main_thread() not in fake.get_threads
+    assert again.equals(pd.concat([expected, expected], ignore_index=True))
+
+
+def test_pipeline_is_bounded(monkeypatch, sample_obs_ru):
+    from concurrent.futures import ThreadPoolExecutor
+
+    keys = [f"441000205/2025/04/28/2025042809{m:02d}00.x" for m in range(12)]
+    fake = _FakeS3(keys, body=sample_obs_ru.read_bytes())
+    monkeypatch.setattr(s3_loader, "get_object_store", lambda *a, **k: fake)
+    monkeypatch.setattr(s3_loader, "decode_workers", lambda: 1)
+
+    async def consume():
+        seen = []
+        with ThreadPoolExecutor(1) as decoder:
+            async for i, uri, df in s3_loader.stream_frames_from_s3(
+                "bucket", ["441000205/2025/04/28/"], datetime(2025, 4, 28, 9), datetime(2025, 4, 28, 9, 59),
+                concurrency=2, persist=False, executor=decoder, depth=1,
+            ):
+                if not seen:
+                    # 消費が止まっている間、取得は 各段のキュー + 作業中の分 までしか進まない
+                    await asyncio.sleep(0.3)
+                    assert fake.get_calls <= 6
+                seen.append((i, uri, len(df)))
+        return seen
+
+    seen = asyncio.run(consume())
+    assert sorted(i for i, _, _ in seen) == list(range(12))
+    assert {uri for _, uri, _ in seen} == {f"s3://bucket/{k}" for k in keys}
+
+
+def test_closing_stream_early_does_not_wait_for_fetches(monkeypatch, sample_obs_ru):
+    from concurrent.futures import ThreadPoolExecutor
+
+    keys = [f"441000205/2025/04/28/2025042809{m:02d}00.x" for m in range(6)]
+
+    class SlowGet(_FakeS3):
+        def get_object(self, Bucket, Key):
+            if Key != keys[0]:
+                time.sleep(1.0)              # 最初の 1 件以外は取得中のまま打ち切られる
+            return super().get_object(Bucket, Key)
+
+    fake = SlowGet(keys, body=sample_obs_ru.read_bytes())
+    monkeypatch.setattr(s3_loader, "get_object_store", lambda *a, **k: fake)
+    monkeypatch.setattr(s3_loader, "decode_workers", lambda: 1)
+
+    async def first_then_close(decoder):
+        stream = s3_loader.stream_frames_from_s3(
+            "bucket", ["441000205/2025/04/28/"], datetime(2025, 4, 28, 9), datetime(2025, 4, 28, 9, 59),
+            concurrency=3, persist=False, executor=decoder,
+        )
+        first = await stream.__anext__()
+        t0 = time.perf_counter()
+        await stream.aclose()
+        return first, time.perf_counter() - t0
+
+    with ThreadPoolExecutor(1) as decoder:
+        (i, uri, df), elapsed = asyncio.run(first_then_close(decoder))
+    assert i == 0 and uri == f"s3://bucket/{keys[0]}" and len(df)
+    # 取得中の 2 件（約 1 秒）を待たずに閉じる
+    assert elapsed < 0.5
+
+
+def test_burst_of_identical_requests_hits_s3_once(monkeypatch, _fresh_caches):
+    keys = [f"441000205/2025/04/28/2025042809{m:02d}00.x" for m in (0, 10, 20)]
+
+    class SlowList(_FakeS3):
+        def list_objects_v2(self, **kwargs):
+            time.sleep(0.2)
+            return super().list_objects_v2(**kwargs)
+
+    fake = SlowList(keys)
+    monkeypatch.setattr(s3_loader, "get_object_store", lambda *a, **k: fake)
+    args = ("bucket", ["441000205/2025/04/28/"], datetime(2025, 4, 28, 9), datetime(2025, 4, 28, 9, 20))
+
+    # 各リクエストは別スレッド・別イベントループ（API サーバーと同じ）
+    barrier = threading.Barrier(6)
+    results = []
+
+    def request():
+        barrier.wait()
+        results.append(asyncio.run(s3_loader.load_from_s3(*args)))
+
+    threads = [threading.Thread(target=request) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(results) == 6 and all(r == results[0] for r in results)
+    assert fake.list_calls == 1 and fake.downloads == len(keys)
@@ -0,0 +1,59 @@
+# backend/tests/test_single_flight.py
+import threading
+import time
+
+import pytest
+from app.utils.single_flight import SingleFlight
+
+
+def _burst(n, target):
+    barrier = threading.Barrier(n)
+    results = [None] * n
+
+    def run(i):
+        barrier.wait()
+        try:
+            results[i] = target()
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+
+    def work():
+        calls.append(1)
+        time.sleep(0.2)
+        return object()
+
+    results = _burst(8, lambda: flight.do("k", work))
+    assert len(calls) == 1
+    assert len({id(value) for value, _ in results}) == 1
+    assert sorted(shared for _, shared in results) == [False] + [True] * 7
+    assert flight.stats() == {"in_flight": 0, "executed": 1, "shared": 7}
+
+    # 完了したキーは覚えていない（次の呼び出しは再実行）
+    flight.do("k", work)
+    assert len(calls) == 2
+
+
+def test_errors_are_shared_and_forgotten():
+    flight = SingleFlight()
+
+    def fail():
+        time.sleep(0.2)
+        raise RuntimeError("boom")
+
+    results = _burst(4, lambda: flight.do("k", fail))
+    assert all(isinstance(e, RuntimeError) for e in results)
+    assert flight.executed == 1 and len(flight) == 0
+    with pytest.raises(RuntimeError):
+        flight.do("k", fail)